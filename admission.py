@@ -0,0 +1,109 @@
+import time
+import threading
+from typing import Dict, Optional
+
+from metrics import ADMISSION_REJECTED, DEADLINE_EXCEEDED
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before its work is done."""
+
+
+class AdmissionRejected(Exception):
+    """Raised when the converter is saturated and too many requests are already waiting for it."""
+
+
+class Deadline:
+    """The time a request's work has to be finished by; no seconds (or 0) means none."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, never negative; None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def wall_clock(self) -> Optional[float]:
+        """The deadline as a time.time() value, for other processes."""
+        remaining = self.remaining()
+        return None if remaining is None else time.time() + remaining
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def exceeded(self, stage: str) -> DeadlineExceeded:
+        DEADLINE_EXCEEDED.inc(stage=stage)
+        return DeadlineExceeded(f"Request deadline of {self.seconds:g}s exceeded before {stage} finished")
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded if the deadline has passed; called before each stage of the pipeline."""
+        if self.expired:
+            raise self.exceeded(stage)
+
+
+NO_DEADLINE = Deadline()
+
+
+class AdmissionControl:
+    """
+    Lets at most `concurrency` conversions run at once, so a burst of
+    requests is served a few at a time at full speed instead of all of them
+    sharing the CPU and finishing late together.
+
+    Callers beyond that wait for a slot until their deadline. When
+    `max_waiting` callers are already waiting, a caller with a deadline is
+    rejected at once; callers without one (the job queue workers) always
+    wait, since their own queue is bounded already.
+    """
+
+    def __init__(self, concurrency: int, max_waiting: int):
+        self.concurrency = max(1, concurrency)
+        self.max_waiting = max(0, max_waiting)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+
+    def acquire(self, deadline: Deadline = NO_DEADLINE):
+        """Take a conversion slot; raises AdmissionRejected or DeadlineExceeded."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if deadline.expires_at is not None and self._waiting >= self.max_waiting:
+                    self._rejected += 1
+                    ADMISSION_REJECTED.inc()
+                    raise AdmissionRejected(
+                        f"Converter busy: {self._running} conversions running and {self._waiting} waiting"
+                    )
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=deadline.remaining())
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise deadline.exceeded("admission")
+        with self._lock:
+            self._running += 1
+            self._admitted += 1
+
+    def release(self):
+        with self._lock:
+            self._running -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'concurrency': self.concurrency,
+                'max_waiting': self.max_waiting,
+                'running': self._running,
+                'waiting': self._waiting,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+            }
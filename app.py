@@ -1,15 +1,50 @@
 import os
-from flask import Flask, request, send_file, jsonify
+import json
+import time
+import uuid
+import shutil
+import logging
+import argparse
+import contextlib
+import contextvars
+import tarfile
+import zipfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from importlib.metadata import version as package_version
+from flask import Flask, Response, g, request, send_file, jsonify
 from werkzeug.utils import secure_filename
-from marker.converters.pdf import PdfConverter
-from marker.models import create_model_dict
-from marker.output import text_from_rendered
 from datetime import datetime
-from extract_tables import extract_tables
-from json_to_excel import json_to_excel
-from io import BytesIO
+from extract_tables import extract_individual_tables_from_file, parse_table_blocks, without_member_totals, EXTRACTOR_VERSION
+from layout_profiles import default_registry
+from json_to_excel import json_to_excel, members_to_workbook
+from output_formats import get_format, UnknownFormatError
+from markdown_input import extract_markdown_files, list_markdown_files, is_archive, ByteBudget, MarkdownLimitError
+from job_queue import JobQueue, QueueFullError, JOB_DONE
+from converter_pool import count_pdf_pages
+from converter_service import extract_pages
+from model_loader import ModelLoader, DEFAULT_WARMUP_PDF
+from admission import AdmissionControl, AdmissionRejected, Deadline, DeadlineExceeded, NO_DEADLINE
+from result_cache import ResultCache, sha256_file
+from artifact_store import ArtifactStore
+from claim_index import ClaimIndex
+from incremental import IncrementalStore, page_fingerprints, parse_blocks_incremental
+from metrics import REGISTRY, REQUEST_SECONDS, StageTrace
+from log_config import configure_logging, request_id_var
+from uploads import (SpoolingRequest, sweep_stale_uploads, start_upload_sweeper, MEMORY_SPOOL_DIR, SPOOL_PREFIX,
+                     BATCH_STAGING_PREFIX, MARKDOWN_STAGING_PREFIX, PAGES_STAGING_PREFIX)
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Compile the payer layout profiles now so a broken profile fails startup
+# rather than the first request
+layout_registry = default_registry()
 
 app = Flask(__name__)
+# Stream uploads straight into a tmpfs-backed spool file instead of werkzeug's
+# temp file followed by a copy into temp_uploads
+app.request_class = SpoolingRequest
 
 # Configure upload folder
 UPLOAD_FOLDER = 'temp_uploads'
@@ -17,72 +52,823 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_BYTES', str(256 * 1024 * 1024)))
+# Uploads up to this size stay in memory (tmpfs); larger ones are streamed to UPLOAD_FOLDER
+app.config['SPOOL_MEMORY_LIMIT'] = int(os.environ.get('SPOOL_MEMORY_LIMIT', str(32 * 1024 * 1024)))
+app.config['SPOOL_MEMORY_DIR'] = os.environ.get('SPOOL_MEMORY_DIR', MEMORY_SPOOL_DIR)
+# Spooled files older than this are removed by the background sweeper
+app.config['UPLOAD_MAX_AGE_SECONDS'] = float(os.environ.get('UPLOAD_MAX_AGE_SECONDS', '3600'))
+
+# Asynchronous job queue settings
+app.config['JOB_DATA_DIR'] = os.environ.get('JOB_DATA_DIR', 'job_data')
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', '1'))
+app.config['JOB_MAX_PENDING'] = int(os.environ.get('JOB_MAX_PENDING', '16'))
+# Finished jobs and their results are deleted this long after they finish (0 keeps them)
+app.config['JOB_MAX_AGE_SECONDS'] = float(os.environ.get('JOB_MAX_AGE_SECONDS', str(7 * 24 * 3600)))
+
+# Batch endpoint settings
+app.config['BATCH_MAX_FILES'] = int(os.environ.get('BATCH_MAX_FILES', '100'))
+# Largest total size of the PDFs unpacked from a batch's zip files
+app.config['BATCH_MAX_UNZIPPED_BYTES'] = int(os.environ.get('BATCH_MAX_UNZIPPED_BYTES', str(1024 * 1024 * 1024)))
+
+# Largest markdown document accepted by /markdown, after decompression
+app.config['MARKDOWN_MAX_BYTES'] = int(os.environ.get('MARKDOWN_MAX_BYTES', str(256 * 1024 * 1024)))
+# Largest total of all markdown in one /markdown request, after decompression
+app.config['MARKDOWN_MAX_TOTAL_BYTES'] = int(os.environ.get('MARKDOWN_MAX_TOTAL_BYTES', str(1024 * 1024 * 1024)))
+
+# Result cache settings; CACHE_MAX_BYTES=0 disables the cache
+app.config['CACHE_DIR'] = os.environ.get('CACHE_DIR', 'result_cache')
+app.config['CACHE_MAX_BYTES'] = int(os.environ.get('CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+app.config['CACHE_MAX_AGE_SECONDS'] = float(os.environ.get('CACHE_MAX_AGE_SECONDS', str(30 * 24 * 3600)))
+app.config['CACHE_STORE_EXCEL'] = os.environ.get('CACHE_STORE_EXCEL', '1') == '1'
+
+# Rendered markdown of every converted PDF is kept here for replay.py; empty disables it
+app.config['ARTIFACT_DIR'] = os.environ.get('ARTIFACT_DIR', 'artifacts')
+
+# Page fingerprints and parser snapshots for re-extracting reissued
+# remittances page by page; empty disables it. When more than
+# INCREMENTAL_MAX_CHANGED_FRACTION of a PDF's pages are new it is converted whole.
+app.config['INCREMENTAL_DIR'] = os.environ.get('INCREMENTAL_DIR', '')
+app.config['INCREMENTAL_MAX_CHANGED_FRACTION'] = float(os.environ.get('INCREMENTAL_MAX_CHANGED_FRACTION', '0.5'))
+app.config['INCREMENTAL_MAX_AGE_SECONDS'] = float(os.environ.get('INCREMENTAL_MAX_AGE_SECONDS', str(90 * 24 * 3600)))
+
+# Every extracted claim is upserted into this SQLite index, deduplicated
+# across pages and documents; empty disables it
+app.config['CLAIM_INDEX_PATH'] = os.environ.get('CLAIM_INDEX_PATH', os.path.join('claim_index', 'claims.sqlite3'))
+
+# Add a Server-Timing header with per-stage durations to every response
+app.config['TIMING_HEADER'] = os.environ.get('TIMING_HEADER', '0') == '1'
+
+# Number of forked converter processes; 0 converts on the request thread
+app.config['CONVERTER_PROCESSES'] = int(os.environ.get('CONVERTER_PROCESSES', '0'))
+# Convert PDFs as page ranges across the converter processes; 0 disables it
+# and a negative value splits the pages evenly over the processes
+app.config['PAGES_PER_CHUNK'] = int(os.environ.get('PAGES_PER_CHUNK', '0'))
+
+# Without converter processes, convert concurrent PDFs together as one
+# document of up to this many pages, waiting up to CONVERTER_BATCH_WAIT_MS
+# for more to arrive; 0 converts one PDF at a time
+app.config['CONVERTER_BATCH_PAGES'] = int(os.environ.get('CONVERTER_BATCH_PAGES', '0'))
+app.config['CONVERTER_BATCH_WAIT_MS'] = float(os.environ.get('CONVERTER_BATCH_WAIT_MS', '50'))
+# Check every Nth micro-batch against one-at-a-time conversion (the first
+# one always); a difference turns batching off. 0 disables the check
+app.config['CONVERTER_BATCH_VERIFY_EVERY'] = int(os.environ.get('CONVERTER_BATCH_VERIFY_EVERY', '10'))
+
+# Load the models (and fork the converter processes) on a background thread
+# at startup; /readyz reports when they are loaded and warmed up. With
+# PRELOAD_MODELS=0 the first conversion loads them instead.
+app.config['PRELOAD_MODELS'] = os.environ.get('PRELOAD_MODELS', '1') == '1'
+# One-page PDF converted once after loading; empty disables the warm-up
+app.config['WARMUP_PDF'] = os.environ.get('WARMUP_PDF', DEFAULT_WARMUP_PDF)
+
+# Conversions allowed to run at once (default: one per converter process, or
+# enough to fill micro-batches); up to ADMISSION_MAX_WAITING more requests
+# wait for a slot and the rest get a 503
+app.config['ADMISSION_CONCURRENCY'] = int(os.environ.get(
+    'ADMISSION_CONCURRENCY',
+    str(app.config['CONVERTER_PROCESSES'] or (8 if app.config['CONVERTER_BATCH_PAGES'] else 1))
+))
+app.config['ADMISSION_MAX_WAITING'] = int(os.environ.get('ADMISSION_MAX_WAITING', '8'))
+app.config['ADMISSION_RETRY_AFTER'] = int(os.environ.get('ADMISSION_RETRY_AFTER', '10'))
+# Requests still working after this many seconds are abandoned with a 504; 0 disables it
+app.config['REQUEST_TIMEOUT_SECONDS'] = float(os.environ.get('REQUEST_TIMEOUT_SECONDS', '600'))
 
-# Initialize PDF converter
-converter = PdfConverter(
-    artifact_dict=create_model_dict(),
+model_loader = ModelLoader(
+    app.config['CONVERTER_PROCESSES'],
+    warmup_pdf=app.config['WARMUP_PDF'],
+    batch_pages=app.config['CONVERTER_BATCH_PAGES'],
+    batch_wait_seconds=app.config['CONVERTER_BATCH_WAIT_MS'] / 1000,
+    batch_verify_every=app.config['CONVERTER_BATCH_VERIFY_EVERY'],
 )
+if app.config['PRELOAD_MODELS']:
+    model_loader.start_background()
 
-def process_pdf(pdf_path):
-    """Process PDF and return the extracted data"""
-    rendered = converter(pdf_path)
-    text, _, images = text_from_rendered(rendered)
-    
-    # Here you would add your specific processing logic
-    # For now, we'll just return the text
-    return text
+admission = AdmissionControl(app.config['ADMISSION_CONCURRENCY'], app.config['ADMISSION_MAX_WAITING'])
 
-@app.route('/webhook', methods=['POST'])
-def webhook():
+@contextlib.contextmanager
+def conversion_slot(trace, deadline):
+    """Hold an admission control slot and yield the loaded models."""
+    with trace.stage('admission'):
+        admission.acquire(deadline)
+    try:
+        models = model_loader.load()
+        deadline.check('convert')
+        yield models
+    finally:
+        admission.release()
+
+def process_pdf(pdf_path, trace=None, deadline=NO_DEADLINE):
+    """
+    Convert a PDF to markdown once admission control gives it a slot, in
+    the converter processes or on the converter service thread. A
+    conversion still queued at the deadline is dropped; a running one
+    always finishes.
+    """
+    trace = trace or StageTrace()
+    with conversion_slot(trace, deadline) as models:
+        chunk_pages = app.config['PAGES_PER_CHUNK']
+        with trace.stage('convert') as stage:
+            trace.count(stage, pages=count_pdf_pages(pdf_path))
+            try:
+                if models.pool is None:
+                    return models.service.convert(pdf_path, timeout=deadline.remaining())
+                if chunk_pages:
+                    return models.pool.convert_pages(pdf_path, chunk_pages if chunk_pages > 0 else None,
+                                                     timeout=deadline.remaining())
+                return models.pool.convert(pdf_path, timeout=deadline.remaining())
+            except FutureTimeoutError:
+                raise deadline.exceeded('convert') from None
+
+def process_pdf_pages(pdf_path, page_indexes, trace=None, deadline=NO_DEADLINE):
+    """
+    Convert only the given pages of a PDF, each as a one-page PDF of its
+    own, and return their markdown in the same order. The pages share one
+    admission slot and are spread over the converter processes, or batched
+    together by the converter service.
+    """
+    trace = trace or StageTrace()
+    with conversion_slot(trace, deadline) as models:
+        converter = models.service if models.pool is None else models.pool
+        with trace.stage('convert') as stage, \
+                tempfile.TemporaryDirectory(dir=app.config['UPLOAD_FOLDER'], prefix=PAGES_STAGING_PREFIX) as pages_dir:
+            trace.count(stage, pages=len(page_indexes))
+            expires_at = deadline.wall_clock()
+            futures = [converter.submit(path, expires_at=expires_at)
+                       for path in extract_pages(pdf_path, page_indexes, pages_dir)]
+            try:
+                return [future.result(timeout=deadline.remaining()) for future in futures]
+            except FutureTimeoutError:
+                raise deadline.exceeded('convert') from None
+            finally:
+                for future in futures:
+                    future.cancel()
+
+MARKER_VERSION = package_version('marker-pdf')
+PIPELINE_VERSION = f"extractor-{EXTRACTOR_VERSION}/layouts-{layout_registry.fingerprint}/marker-{MARKER_VERSION}"
+
+result_cache = None
+if app.config['CACHE_MAX_BYTES'] > 0:
+    result_cache = ResultCache(
+        app.config['CACHE_DIR'],
+        version=PIPELINE_VERSION,
+        max_bytes=app.config['CACHE_MAX_BYTES'],
+        max_age_seconds=app.config['CACHE_MAX_AGE_SECONDS'],
+    )
+
+artifact_store = ArtifactStore(app.config['ARTIFACT_DIR']) if app.config['ARTIFACT_DIR'] else None
+
+incremental_store = None
+if app.config['INCREMENTAL_DIR']:
+    incremental_store = IncrementalStore(
+        os.path.join(app.config['INCREMENTAL_DIR'], 'incremental.sqlite3'), version=PIPELINE_VERSION
+    )
+    incremental_store.prune(app.config['INCREMENTAL_MAX_AGE_SECONDS'])
+
+def convert_incrementally(pdf_path, trace, deadline=NO_DEADLINE):
+    """
+    Convert only the pages of a PDF the incremental store has not seen
+    before and put the markdown together with the stored markdown of the
+    others. A PDF with mostly new pages is converted whole, and its pages
+    are remembered when its markdown splits into one block per page.
+    """
+    with trace.stage('fingerprint') as stage:
+        fingerprints = page_fingerprints(pdf_path)
+        known = incremental_store.get_pages(fingerprints)
+        changed = [i for i, fingerprint in enumerate(fingerprints) if fingerprint not in known]
+        trace.count(stage, pages=len(fingerprints), reused=len(fingerprints) - len(changed))
+
+    if not fingerprints or len(changed) > len(fingerprints) * app.config['INCREMENTAL_MAX_CHANGED_FRACTION']:
+        markdown = process_pdf(pdf_path, trace, deadline)
+        blocks = extract_individual_tables_from_file(markdown)
+        if len(blocks) == len(fingerprints):
+            incremental_store.put_pages(zip(fingerprints, blocks))
+        else:
+            logger.info("%d page blocks in the markdown of %d pages; not remembering its pages",
+                        len(blocks), len(fingerprints))
+        return markdown
+
+    pages = dict(known)
+    if changed:
+        converted = process_pdf_pages(pdf_path, changed, trace, deadline)
+        new_pages = [(fingerprints[i], markdown.strip()) for i, markdown in zip(changed, converted)]
+        incremental_store.put_pages(new_pages)
+        pages.update(new_pages)
+    return "\n\n".join(pages[fingerprint] for fingerprint in fingerprints)
+
+def store_markdown(pdf_path, markdown, content_sha256, trace, source_name=None, convert_seconds=None, replace=True):
+    """
+    Keep the rendered markdown in the artifact store so parser changes can be
+    replayed without converting again. A failure here never fails the request.
+    """
+    if artifact_store is None:
+        return
+    with trace.stage('artifact'):
+        try:
+            if not replace and content_sha256 in artifact_store:
+                return
+            artifact_store.put(
+                content_sha256, markdown,
+                pages=count_pdf_pages(pdf_path),
+                converter=f"marker-pdf {MARKER_VERSION}",
+                extractor_version=EXTRACTOR_VERSION,
+                source=source_name,
+                convert_seconds=None if convert_seconds is None else round(convert_seconds, 3),
+            )
+        except Exception as e:
+            logger.warning("Could not store markdown of %s: %s - %s", content_sha256, type(e).__name__, e)
+
+def cache_result(cache_key, markdown, members, excel_bytes, convert_seconds):
+    """Store a conversion in the result cache. A failure here never fails the request."""
+    try:
+        result_cache.put(
+            cache_key, markdown, members,
+            excel_bytes=excel_bytes if app.config['CACHE_STORE_EXCEL'] else None,
+            convert_seconds=convert_seconds,
+        )
+    except Exception as e:
+        logger.warning("Could not cache result %s: %s - %s", cache_key, type(e).__name__, e)
+
+claim_index = ClaimIndex(app.config['CLAIM_INDEX_PATH']) if app.config['CLAIM_INDEX_PATH'] else None
+
+def index_claims(documents, trace):
+    """
+    Upsert the claims of (PDF SHA-256, members, source name) documents into
+    the claim index in one transaction. A failure here never fails the request.
+    """
+    if claim_index is None or not documents:
+        return
+    with trace.stage('index') as stage:
+        try:
+            counts = claim_index.add_documents(documents)
+            trace.count(stage, claims=counts['claims'], duplicates=counts['duplicates'])
+        except Exception as e:
+            logger.warning("Could not index claims of %d documents: %s - %s", len(documents), type(e).__name__, e)
+
+# Response bodies are handed to the server in slices of this size; werkzeug's file wrapper reads 8 KiB at a time
+RESPONSE_CHUNK_BYTES = 1024 * 1024
+
+def result_response(result_bytes, mimetype, download_name):
+    """
+    Attachment response for a result built in memory. The length is known
+    up front, so the connection can be kept alive, and the body is written
+    in large slices instead of 8 KiB reads from a BytesIO copy.
+    """
+    def body():
+        for start in range(0, len(result_bytes), RESPONSE_CHUNK_BYTES):
+            yield result_bytes[start:start + RESPONSE_CHUNK_BYTES]
+    response = Response(body(), mimetype=mimetype, direct_passthrough=True)
+    response.content_length = len(result_bytes)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response
+
+def build_excel_bytes(members, trace):
+    with trace.stage('excel') as stage:
+        trace.count(stage, members=len(members))
+        _, excel_bytes = json_to_excel(members)
+    return excel_bytes
+
+def parse_markdown(markdown, trace, capture_totals=False):
+    with trace.stage('split') as stage:
+        table_blocks = extract_individual_tables_from_file(markdown)
+        trace.count(stage, pages=len(table_blocks))
+    with trace.stage('parse') as stage:
+        if incremental_store is not None:
+            members, reused = parse_blocks_incremental(table_blocks, incremental_store, capture_totals=capture_totals)
+            trace.count(stage, reused=reused)
+        else:
+            members = parse_table_blocks(table_blocks, capture_totals=capture_totals)
+        trace.count(
+            stage,
+            lines=sum(block.count('\n') + 1 for block in table_blocks),
+            members=len(members),
+            claims=sum(len(m.get('claims', [])) for m in members),
+        )
+    return members
+
+def run_pipeline(pdf_path, content_sha256=None, build_excel=True, trace=None, source_name=None, capture_totals=False,
+                 deadline=NO_DEADLINE, index=True):
+    """
+    Convert a PDF and return the parsed members and the Excel bytes (None
+    unless build_excel). Stage timings go to the process metrics and to
+    `trace` when one is given. With capture_totals the members also carry
+    their "Member Totals :" amounts; the cache keeps the plain members.
+    Unless `index` is False the claims go into the claim index.
+    Raises DeadlineExceeded when `deadline` passes, after caching whatever
+    was converted by then.
+    """
+    trace = trace or StageTrace()
+    cache_key = None
+    if result_cache is not None:
+        with trace.stage('cache_lookup'):
+            content_sha256 = content_sha256 or sha256_file(pdf_path)
+            cache_key = result_cache.key_for_digest(content_sha256)
+            cached = result_cache.get(cache_key, want_excel=True)
+        if cached is not None:
+            # Fills the artifact store for PDFs converted before it was enabled
+            store_markdown(pdf_path, cached['markdown'], content_sha256, trace, source_name, replace=False)
+            members = cached['members']
+            if index:
+                index_claims([(content_sha256, members, source_name)], trace)
+            if capture_totals:
+                # The totals are not cached; parsing the cached markdown again takes milliseconds
+                members = parse_markdown(cached['markdown'], trace, capture_totals=True)
+            excel_bytes = cached['excel_bytes']
+            if excel_bytes is None and build_excel:
+                excel_bytes = build_excel_bytes(members, trace)
+            return members, excel_bytes
+
+    convert_start = time.perf_counter()
+    if incremental_store is not None:
+        extracted_text = convert_incrementally(pdf_path, trace, deadline)
+    else:
+        extracted_text = process_pdf(pdf_path, trace, deadline)
+    convert_seconds = time.perf_counter() - convert_start
+    if artifact_store is not None:
+        store_markdown(pdf_path, extracted_text, content_sha256 or sha256_file(pdf_path), trace,
+                       source_name, convert_seconds)
+    members = parse_markdown(extracted_text, trace, capture_totals)
+    plain_members = without_member_totals(members) if capture_totals else members
+    if index and claim_index is not None:
+        index_claims([(content_sha256 or sha256_file(pdf_path), plain_members, source_name)], trace)
+    excel_bytes = None
+    if build_excel and not deadline.expired:
+        excel_bytes = build_excel_bytes(plain_members, trace)
+
+    # Cached even when the deadline has passed, so a retry of the request is a cache hit
+    if cache_key is not None:
+        cache_result(cache_key, extracted_text, plain_members, excel_bytes, convert_seconds)
+    deadline.check('parse')
+    return members, excel_bytes
+
+# Anything left behind by a crash is removed at startup and periodically afterwards
+upload_sweep_dirs = [(app.config['UPLOAD_FOLDER'], None), (app.config['SPOOL_MEMORY_DIR'], SPOOL_PREFIX)]
+sweep_stale_uploads(upload_sweep_dirs, app.config['UPLOAD_MAX_AGE_SECONDS'])
+start_upload_sweeper(upload_sweep_dirs, app.config['UPLOAD_MAX_AGE_SECONDS'], interval_seconds=600)
+
+job_queue = JobQueue(
+    run_pipeline,
+    app.config['JOB_DATA_DIR'],
+    workers=app.config['JOB_WORKERS'],
+    max_pending=app.config['JOB_MAX_PENDING'],
+    max_age_seconds=app.config['JOB_MAX_AGE_SECONDS'],
+).start()
+
+@app.before_request
+def start_request_trace():
+    g.trace = StageTrace()
+    g.request_start = time.perf_counter()
+    # Reuse the caller's id so log lines can be joined across services
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_id_token = request_id_var.set(g.request_id)
+    g.deadline = Deadline(app.config['REQUEST_TIMEOUT_SECONDS'])
+
+@app.after_request
+def record_request_metrics(response):
+    if request.url_rule is not None and request.endpoint not in ('metrics', 'healthz', 'readyz'):
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - g.request_start,
+            endpoint=request.url_rule.rule, method=request.method, status=response.status_code,
+        )
+    if app.config['TIMING_HEADER'] and g.trace.stages:
+        response.headers['Server-Timing'] = g.trace.server_timing()
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def clear_request_id(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    return jsonify({'error': str(e)}), 503, {'Retry-After': str(app.config['ADMISSION_RETRY_AFTER'])}
+
+@app.errorhandler(DeadlineExceeded)
+def deadline_exceeded(e):
+    logger.warning("%s", e)
+    return jsonify({'error': str(e)}), 504
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: the models are loaded and warmed up (always ready when they load lazily)."""
+    status = model_loader.status()
+    if model_loader.ready or not app.config['PRELOAD_MODELS']:
+        return jsonify({'status': 'ready', **status})
+    return jsonify({'status': 'starting' if status['error'] is None else 'failed', **status}), 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def validate_pdf_upload():
+    """Return (file, None) for a valid PDF upload or (None, error response)"""
     if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
+        return None, (jsonify({'error': 'No file part'}), 400)
     
     file = request.files['file']
     if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
+        return None, (jsonify({'error': 'No selected file'}), 400)
     
     if not file.filename.lower().endswith('.pdf'):
-        return jsonify({'error': 'File must be a PDF'}), 400
+        return None, (jsonify({'error': 'File must be a PDF'}), 400)
+    return file, None
+
+@app.route('/webhook', methods=['POST'])
+def webhook():
+    file, error_response = validate_pdf_upload()
+    if error_response:
+        return error_response
+
+    try:
+        output_format = get_format(request.args.get('format', 'xlsx'))
+    except UnknownFormatError as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
-        # Save the uploaded file temporarily
-        filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        temp_filename = f"{timestamp}_{filename}"
-        pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], temp_filename)
-        file.save(pdf_path)
-
-        # Process the PDF
-        extracted_text = process_pdf(pdf_path)
-        table_strings = extract_tables(extracted_text)
-        
-        # Get DataFrame and Excel bytes from json_to_excel
-        _, excel_bytes = json_to_excel(table_strings)
-        
-        if excel_bytes is None:
-            return jsonify({'error': 'Failed to create Excel file'}), 500
-
-        # Clean up the PDF file
-        os.remove(pdf_path)
-
-        # Create BytesIO object from the Excel bytes
-        excel_buffer = BytesIO(excel_bytes)
-        excel_buffer.seek(0)
-
-        # Send the Excel file back to the client
+
+        # The upload was streamed into a spool file while the request was
+        # parsed; it is removed when the request is torn down.
+        upload = file.stream
+        if output_format.name == 'xlsx':
+            # The workbook is built once by the pipeline and shared with the cache
+            _, result_bytes = run_pipeline(upload.path, content_sha256=upload.sha256, trace=g.trace,
+                                           source_name=file.filename, deadline=g.deadline)
+            if result_bytes is None:
+                return jsonify({'error': 'Failed to create Excel file'}), 500
+        else:
+            members, _ = run_pipeline(upload.path, content_sha256=upload.sha256, build_excel=False, trace=g.trace,
+                                      source_name=file.filename, capture_totals=output_format.capture_totals,
+                                      deadline=g.deadline)
+            g.deadline.check(output_format.name)
+            with g.trace.stage(output_format.name) as stage:
+                g.trace.count(stage, members=len(members))
+                result_bytes = output_format.serialize(members)
+
+        # Send the result file back to the client
+        return result_response(result_bytes, output_format.mimetype,
+                               f'extracted_data_{timestamp}.{output_format.extension}')
+
+    except (AdmissionRejected, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.exception("Processing %s failed", file.filename)
+        return jsonify({'error': str(e)}), 500
+
+class BatchTooLargeError(Exception):
+    """Raised when a batch has more PDFs, or unzips to more bytes, than the batch limits allow."""
+
+def is_batch_pdf(info):
+    base_name = os.path.basename(info.filename)
+    return not info.is_dir() and base_name.lower().endswith('.pdf') and not info.filename.startswith('__MACOSX/')
+
+def collect_batch_pdfs(staging_dir):
+    """
+    Return [(source name, pdf path, sha256 or None)] for every PDF in the
+    request: multipart `files`/`file` fields, PDFs inside uploaded zip files,
+    or a raw zip request body. Zip files are checked against BATCH_MAX_FILES
+    and BATCH_MAX_UNZIPPED_BYTES before anything is unpacked, and unpacking
+    stops once the bytes actually written pass the limit.
+    """
+    sources = []
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    archives = []
+    for upload in uploads:
+        name = upload.filename or ''
+        if name.lower().endswith('.pdf'):
+            sources.append((name, upload.stream.path, upload.stream.sha256))
+        elif name.lower().endswith('.zip'):
+            archives.append(upload.stream.path)
+    if not uploads and request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+        body_path = os.path.join(staging_dir, 'body.zip')
+        with open(body_path, 'wb') as body_file:
+            shutil.copyfileobj(request.stream, body_file)
+        archives.append(body_path)
+
+    max_files = app.config['BATCH_MAX_FILES']
+    max_bytes = app.config['BATCH_MAX_UNZIPPED_BYTES']
+    members = []
+    for archive_path in archives:
+        with zipfile.ZipFile(archive_path) as archive:
+            members.append([info for info in archive.infolist() if is_batch_pdf(info)])
+    if len(sources) + sum(len(infos) for infos in members) > max_files:
+        raise BatchTooLargeError(f"At most {max_files} files per batch")
+    if sum(info.file_size for infos in members for info in infos) > max_bytes:
+        raise BatchTooLargeError(f"Zip files unpack to more than {max_bytes} bytes")
+
+    # The sizes in the zip directory are only claims; the bytes written are counted too
+    unzipped = 0
+    for archive_path, infos in zip(archives, members):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in infos:
+                base_name = os.path.basename(info.filename)
+                pdf_path = os.path.join(staging_dir, f"{len(sources)}_{secure_filename(base_name) or 'file.pdf'}")
+                with archive.open(info) as src, open(pdf_path, 'wb') as dst:
+                    for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                        unzipped += len(chunk)
+                        if unzipped > max_bytes:
+                            raise BatchTooLargeError(f"Zip files unpack to more than {max_bytes} bytes")
+                        dst.write(chunk)
+                sources.append((info.filename, pdf_path, None))
+    return sources
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """
+    Process many PDFs in one request and return one workbook (a sheet per file
+    plus a combined sheet) or, with ?format=json, one concatenated JSON.
+    Failed files are reported alongside the results instead of failing the batch.
+    """
+    result_format = request.args.get('format', 'xlsx').lower()
+    if result_format not in ('xlsx', 'json'):
+        return jsonify({'error': "format must be 'xlsx' or 'json'"}), 400
+
+    with tempfile.TemporaryDirectory(dir=app.config['UPLOAD_FOLDER'], prefix=BATCH_STAGING_PREFIX) as staging_dir:
+        try:
+            sources = collect_batch_pdfs(staging_dir)
+        except zipfile.BadZipFile:
+            return jsonify({'error': 'Invalid zip archive'}), 400
+        except BatchTooLargeError as e:
+            return jsonify({'error': str(e)}), 413
+        if not sources:
+            return jsonify({'error': 'No PDF files in request'}), 400
+        if len(sources) > app.config['BATCH_MAX_FILES']:
+            return jsonify({'error': f"At most {app.config['BATCH_MAX_FILES']} files per batch"}), 413
+
+        deadline = g.deadline
+
+        def process_source(source):
+            name, pdf_path, content_sha256 = source
+            try:
+                content_sha256 = content_sha256 or sha256_file(pdf_path)
+                members, _ = run_pipeline(pdf_path, content_sha256=content_sha256, build_excel=False, source_name=name,
+                                          deadline=deadline, index=False)
+                return name, content_sha256, members, None
+            except Exception as e:
+                logger.warning("Batch file %s failed: %s - %s", name, type(e).__name__, e)
+                return name, content_sha256, None, f"{type(e).__name__}: {e}"
+
+        # As many files at once as admission control lets convert: one per
+        # converter process, or enough to fill the converter service's batches
+        concurrency = app.config['ADMISSION_CONCURRENCY']
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Run each file in a copy of this request's context so its log lines keep the request id
+            futures = [executor.submit(contextvars.copy_context().run, process_source, source) for source in sources]
+            outcomes = [future.result() for future in futures]
+
+    # The whole batch goes into the claim index in one transaction
+    index_claims([(sha256, members, name) for name, sha256, members, error in outcomes if error is None], g.trace)
+    results = [(name, members) for name, _, members, error in outcomes if error is None]
+    errors = [{'Source File': name, 'Error': error} for name, _, _, error in outcomes if error is not None]
+
+    if result_format == 'json':
+        combined = [
+            {'Source File': name, **member}
+            for name, members in results
+            for member in members
+        ]
+        return jsonify({'files': len(sources), 'succeeded': len(results), 'members': combined, 'errors': errors})
+
+    excel_bytes = members_to_workbook(results, errors)
+    return result_response(
+        excel_bytes,
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        f"extracted_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    )
+
+def collect_markdown_uploads(staging_dir):
+    """
+    Return [(upload name, path)] for the `file`/`files` uploads of the
+    request or, without uploads, for the raw request body.
+    """
+    uploads = [
+        (upload.filename, upload.stream.path)
+        for upload in request.files.getlist('files') + request.files.getlist('file')
+        if upload.filename
+    ]
+    if uploads or request.files:
+        return uploads
+    body_path = os.path.join(staging_dir, 'body')
+    with open(body_path, 'wb') as body_file:
+        shutil.copyfileobj(request.stream, body_file)
+    if os.path.getsize(body_path) == 0:
+        return []
+    return [('document.md', body_path)]
+
+@app.route('/markdown', methods=['POST'])
+def markdown():
+    """
+    Run only the text half of the pipeline on marker markdown, skipping PDF
+    conversion: a markdown upload or body returns ?format= like /webhook; a
+    zip, tar or gzip archive of markdown files, or several uploads, returns
+    a workbook with a sheet per file or, with ?format=json, one JSON like /batch.
+    """
+    with tempfile.TemporaryDirectory(dir=app.config['UPLOAD_FOLDER'], prefix=MARKDOWN_STAGING_PREFIX) as staging_dir:
+        uploads = collect_markdown_uploads(staging_dir)
+        if not uploads:
+            return jsonify({'error': 'No markdown in request'}), 400
+        single = len(uploads) == 1 and not is_archive(uploads[0][1])
+        try:
+            output_format = get_format(request.args.get('format', 'xlsx'))
+        except UnknownFormatError as e:
+            return jsonify({'error': str(e)}), 400
+        if not single and output_format.name not in ('xlsx', 'json'):
+            return jsonify({'error': "format must be 'xlsx' or 'json' for several documents"}), 400
+
+        # The limits are checked against the archive listings before any document is read
+        max_files = app.config['BATCH_MAX_FILES']
+        max_total_bytes = app.config['MARKDOWN_MAX_TOTAL_BYTES']
+        try:
+            listed = [entry for upload_name, path in uploads for entry in list_markdown_files(path, upload_name)]
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+            return jsonify({'error': f'Invalid archive: {e}'}), 400
+        if len(listed) > max_files:
+            return jsonify({'error': f"At most {max_files} files per request"}), 413
+        if max_total_bytes and sum(size or 0 for _, size in listed) > max_total_bytes:
+            return jsonify({'error': f"Markdown is larger than {max_total_bytes} bytes uncompressed in total"}), 413
+
+        results, errors = [], []
+        budget = ByteBudget(max_total_bytes)
+        with g.trace.stage('parse') as stage:
+            try:
+                for upload_name, path in uploads:
+                    file_results, file_errors = extract_markdown_files(
+                        path, upload_name, max_bytes=app.config['MARKDOWN_MAX_BYTES'],
+                        capture_totals=output_format.capture_totals, budget=budget
+                    )
+                    results.extend(file_results)
+                    errors.extend(file_errors)
+            except MarkdownLimitError as e:
+                return jsonify({'error': str(e)}), 413
+            except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+                return jsonify({'error': f'Invalid archive: {e}'}), 400
+            g.trace.count(
+                stage,
+                members=sum(len(members) for _, members in results),
+                claims=sum(len(m.get('claims', [])) for _, members in results for m in members),
+            )
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if single:
+        if errors:
+            return jsonify({'error': errors[0]['Error']}), 400
+        members = results[0][1]
+        with g.trace.stage(output_format.name) as stage:
+            g.trace.count(stage, members=len(members))
+            result_bytes = output_format.serialize(members)
+        return result_response(result_bytes, output_format.mimetype,
+                               f'extracted_data_{timestamp}.{output_format.extension}')
+
+    if not results and not errors:
+        return jsonify({'error': 'No markdown files in request'}), 400
+    if output_format.name == 'json':
+        combined = [
+            {'Source File': name, **member}
+            for name, members in results
+            for member in members
+        ]
+        return jsonify({'files': len(results) + len(errors), 'succeeded': len(results), 'members': combined, 'errors': errors})
+
+    with g.trace.stage('excel') as stage:
+        g.trace.count(stage, members=sum(len(members) for _, members in results))
+        excel_bytes = members_to_workbook(results, errors)
+    return result_response(
+        excel_bytes,
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        f"extracted_markdown_{timestamp}.xlsx"
+    )
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **result_cache.stats()})
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    return jsonify(admission.stats())
+
+@app.route('/incremental/stats', methods=['GET'])
+def incremental_stats():
+    if incremental_store is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **incremental_store.stats()})
+
+CLAIM_QUERY_PARAMS = ('limit', 'after', 'group_by', 'sum')
+
+@app.route('/claims', methods=['GET'])
+def query_claims():
+    """
+    Indexed claims matching the CLAIM_FILTERS in the query string, a page
+    at a time: ?proc=G9012&received_from=2025-01-01&limit=100&after=<next>.
+    With group_by=member or month, the claim count and sum (net_paid by
+    default, or ?sum=<amount column>) per group instead.
+    """
+    if claim_index is None:
+        return jsonify({'error': 'Claim index is disabled'}), 404
+    # Everything but the paging and grouping parameters is a filter, so a misspelt one is a 400, not ignored
+    filters = {name: value for name, value in request.args.items() if name not in CLAIM_QUERY_PARAMS}
+    try:
+        limit = int(request.args.get('limit', 100))
+        group_by = request.args.get('group_by')
+        if group_by:
+            groups, next_after = claim_index.summarize(group_by, filters, request.args.get('sum', 'net_paid'),
+                                                       request.args.get('after'), limit)
+            return jsonify({'filters': filters, 'group_by': group_by, 'groups': groups, 'next': next_after})
+        claims, next_after = claim_index.query(filters, int(request.args.get('after', 0)), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'filters': filters, 'claims': claims, 'next': next_after})
+
+@app.route('/claims/members/<path:member_no>', methods=['GET'])
+def member_claims(member_no):
+    """Every indexed claim of a member, across all documents, with the documents each came from."""
+    if claim_index is None:
+        return jsonify({'error': 'Claim index is disabled'}), 404
+    claims = claim_index.claims_for_member(member_no)
+    return jsonify({'member': member_no, 'claims': claims})
+
+@app.route('/claims/stats', methods=['GET'])
+def claim_index_stats():
+    if claim_index is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **claim_index.stats()})
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    file, error_response = validate_pdf_upload()
+    if error_response:
+        return error_response
+
+    try:
+        job_id = job_queue.submit(file.stream, secure_filename(file.filename))
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '30'}
+    except Exception as e:
+        logger.exception("Submitting job for %s failed", file.filename)
+        return jsonify({'error': str(e)}), 500
+
+    logger.info("Queued job %s for %s", job_id, file.filename)
+    return jsonify({'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202, {'Location': f'/jobs/{job_id}'}
+
+@app.route('/jobs/stats', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == JOB_DONE:
+        job['result_url'] = f'/jobs/{job_id}/result'
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != JOB_DONE:
+        return jsonify({'error': f"Job is {job['status']}", 'status': job['status']}), 409
+
+    try:
+        output_format = get_format(request.args.get('format', 'xlsx'))
+    except UnknownFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    # Jobs store members parsed without their "Member Totals :" amounts, which these formats check against
+    if output_format.capture_totals:
+        return jsonify({'error': f"Format {output_format.name} is not available for jobs; use /webhook"}), 400
+
+    if output_format.name == 'json':
+        return send_file(job_queue.result_path(job_id, 'json'), mimetype='application/json')
+
+    base_name = os.path.splitext(job['filename'])[0]
+    download_name = f'extracted_data_{base_name}.{output_format.extension}'
+    if output_format.name == 'xlsx':
         return send_file(
-            excel_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            job_queue.result_path(job_id, 'xlsx'),
+            mimetype=output_format.mimetype,
             as_attachment=True,
-            download_name=f'extracted_data_{timestamp}.xlsx'
+            download_name=download_name
         )
 
-    except Exception as e:
-        # Clean up in case of error
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
-        return jsonify({'error': str(e)}), 500
+    # Other formats are rendered from the stored JSON result on request
+    with open(job_queue.result_path(job_id, 'json'), encoding='utf-8') as json_file:
+        members = json.load(json_file)
+    return result_response(output_format.serialize(members), output_format.mimetype, download_name)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs under gunicorn with gunicorn.conf.py
+    parser = argparse.ArgumentParser(description="Run the extractor on Flask's development server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--debug', action='store_true', help="Flask debug mode (the reloader stays off, it would load the models twice)")
+    args = parser.parse_args()
+    app.run(host=args.host, port=args.port, debug=args.debug, use_reloader=False, threaded=True)
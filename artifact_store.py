@@ -0,0 +1,95 @@
+import os
+import gzip
+import json
+import time
+import uuid
+from typing import Dict, Iterator, Optional
+
+MARKDOWN_SUFFIX = ".md.gz"
+META_SUFFIX = ".json"
+
+
+class ArtifactStore:
+    """
+    Permanent on-disk store of the markdown marker rendered for each PDF.
+
+    Documents are keyed on the SHA-256 of the PDF bytes and sharded by the
+    first two hex digits: `<root>/ab/<sha256>.md.gz` holds the gzip-compressed
+    markdown and `<root>/ab/<sha256>.json` its metadata (page count,
+    converter and extractor versions, source name, conversion time). Unlike
+    the result cache nothing is evicted and the key does not include the
+    parser version, so `replay.py` can re-run the current parser over every
+    document ever converted without converting it again. Converting a
+    document again (e.g. after a marker upgrade) replaces its markdown.
+    """
+
+    def __init__(self, root: str, compresslevel: int = 6):
+        self.root = root
+        self.compresslevel = compresslevel
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, sha256: str, suffix: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256 + suffix)
+
+    def __contains__(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256, META_SUFFIX))
+
+    def put(self, sha256: str, markdown: str, **meta) -> Dict:
+        """Store `markdown` for the PDF with digest `sha256`; extra keyword arguments go into the metadata."""
+        shard_dir = os.path.dirname(self._path(sha256, META_SUFFIX))
+        os.makedirs(shard_dir, exist_ok=True)
+        suffix = f".{uuid.uuid4().hex}.tmp"
+        markdown_path = self._path(sha256, MARKDOWN_SUFFIX)
+        meta_path = self._path(sha256, META_SUFFIX)
+        encoded = markdown.encode("utf-8")
+        try:
+            with gzip.open(markdown_path + suffix, "wb", compresslevel=self.compresslevel) as f:
+                f.write(encoded)
+            meta = {
+                "sha256": sha256,
+                **meta,
+                "markdown_bytes": len(encoded),
+                "stored_bytes": os.path.getsize(markdown_path + suffix),
+                "stored_at": time.time(),
+            }
+            with open(meta_path + suffix, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            # The metadata file marks a complete document, so it is moved last.
+            os.replace(markdown_path + suffix, markdown_path)
+            os.replace(meta_path + suffix, meta_path)
+        finally:
+            for leftover in (markdown_path + suffix, meta_path + suffix):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        return meta
+
+    def get_meta(self, sha256: str) -> Optional[Dict]:
+        try:
+            with open(self._path(sha256, META_SUFFIX), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def open_markdown(self, sha256: str):
+        """Text file object over the decompressed markdown, for streaming into `iter_members`."""
+        return gzip.open(self._path(sha256, MARKDOWN_SUFFIX), "rt", encoding="utf-8", newline="\n")
+
+    def get_markdown(self, sha256: str) -> str:
+        with self.open_markdown(sha256) as f:
+            return f.read()
+
+    def iter_digests(self) -> Iterator[str]:
+        """Digests of every complete document, in sorted order."""
+        for shard in sorted(os.listdir(self.root)):
+            shard_dir = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue
+            for name in sorted(os.listdir(shard_dir)):
+                if name.endswith(META_SUFFIX):
+                    yield name[:-len(META_SUFFIX)]
+
+    def iter_meta(self) -> Iterator[Dict]:
+        for sha256 in self.iter_digests():
+            meta = self.get_meta(sha256)
+            if meta is not None:
+                yield meta
@@ -0,0 +1,255 @@
+"""
+Offline batch driver: extract every remittance PDF or pre-rendered markdown
+file under the given paths without going through the HTTP service.
+
+    python batch_extract.py archive/2023 "archive/2024/*.pdf" -o out --workers 8 --formats json,xlsx,csv
+
+Outputs mirror the input layout under the output directory: paths below
+a directory argument, or below the part of a glob pattern before its first
+wildcard, are kept, and two inputs that would write the same output are
+refused before anything runs. Outputs are written while the markdown is
+parsed, one member at a time, so memory use does not grow with the size of
+a remittance. Every finished file is appended to a
+manifest (JSON Lines), and re-running the same command skips files already
+recorded as done, so an interrupted run resumes where it stopped. Use --force
+to reprocess everything.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Tuple
+
+from extract_tables import StreamingTableParser, iter_members, EXTRACTOR_VERSION
+from log_config import configure_logging
+from json_to_excel import JsonArrayWriter, JsonLinesWriter, ExcelStreamWriter, CsvWriter, write_members
+
+INPUT_EXTENSIONS = (".pdf", ".md")
+OUTPUT_FORMATS = ("json", "jsonl", "xlsx", "csv")
+
+
+def glob_root(pattern: str) -> str:
+    """The directory a glob pattern's matches are relative to: its path up to the first wildcard."""
+    parts = os.path.normpath(pattern).split(os.sep)
+    root = []
+    for part in parts:
+        if glob.has_magic(part):
+            break
+        root.append(part)
+    else:
+        # A plain file name: its outputs go straight into the output directory
+        root = root[:-1]
+    if root == [""]:
+        return os.sep
+    return os.path.abspath(os.sep.join(root) or os.curdir)
+
+
+def collect_inputs(paths: List[str]) -> List[Tuple[str, str]]:
+    """Return sorted (absolute source path, output-relative path) pairs for every input."""
+    found = {}
+    for path in paths:
+        if os.path.isdir(path):
+            root = os.path.abspath(path)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.lower().endswith(INPUT_EXTENSIONS):
+                        source = os.path.join(dirpath, filename)
+                        found.setdefault(source, os.path.relpath(source, root))
+        else:
+            root = glob_root(path)
+            for match in glob.glob(path, recursive=True):
+                if os.path.isfile(match) and match.lower().endswith(INPUT_EXTENSIONS):
+                    source = os.path.abspath(match)
+                    found.setdefault(source, os.path.relpath(source, root))
+    return sorted(found.items())
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Dict]:
+    done = {}
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a truncated last line.
+                continue
+            if entry.get("status") == "done":
+                done[entry["source"]] = entry
+            else:
+                done.pop(entry["source"], None)
+    return done
+
+
+def source_fingerprint(source: str) -> Dict:
+    stat = os.stat(source)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def write_outputs(members: Iterable[Dict], output_base: str, formats: List[str]) -> Tuple[List[str], Dict]:
+    """Stream `members` into every requested output in one pass; returns (paths, summary)."""
+    os.makedirs(os.path.dirname(output_base), exist_ok=True)
+    writer_classes = {"json": JsonArrayWriter, "jsonl": JsonLinesWriter, "xlsx": ExcelStreamWriter, "csv": CsvWriter}
+    outputs = [f"{output_base}.{fmt}" for fmt in formats]
+    writers = [writer_classes[fmt](path) for fmt, path in zip(formats, outputs)]
+    summary = {"members": 0, "claims": 0}
+
+    def counted():
+        for member in members:
+            summary["members"] += 1
+            summary["claims"] += len(member.get("claims", []))
+            yield member
+
+    write_members(counted(), writers)
+    return outputs, summary
+
+
+def process_markdown_file(source: str, output_base: str, formats: List[str]) -> Dict:
+    start = time.perf_counter()
+    parser = StreamingTableParser()
+    with open(source, encoding="utf-8") as f:
+        outputs, summary = write_outputs(iter_members(f, parser), output_base, formats)
+    return {
+        "pages": parser.blocks,
+        "outputs": outputs,
+        "seconds": round(time.perf_counter() - start, 3),
+        **summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Directories, files or glob patterns of .pdf/.md files")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for markdown parsing and PDF conversion")
+    parser.add_argument("--formats", default="json,xlsx", help=f"Comma-separated subset of {','.join(OUTPUT_FORMATS)}")
+    parser.add_argument("--manifest", help="Manifest path (default: <output-dir>/manifest.jsonl)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and reprocess every file")
+    parser.add_argument("--artifact-dir", help="Also keep the rendered markdown of every PDF in this artifact store")
+    args = parser.parse_args()
+    # Progress goes to stdout; parser warnings go to stderr as plain text unless LOG_FORMAT says otherwise
+    configure_logging(log_format=os.environ.get("LOG_FORMAT", "text"))
+
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    unknown = set(formats) - set(OUTPUT_FORMATS)
+    if unknown:
+        parser.error(f"Unknown formats: {', '.join(sorted(unknown))}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.jsonl")
+    completed = {} if args.force else load_manifest(manifest_path)
+
+    inputs = []
+    sources_by_base = {}
+    for source, relative in collect_inputs(args.inputs):
+        output_base = os.path.join(os.path.abspath(args.output_dir), os.path.splitext(relative)[0])
+        # x.pdf and x.md, or the same name reached through two arguments, would overwrite each other
+        if output_base in sources_by_base:
+            parser.error(f"{sources_by_base[output_base]} and {source} would both be written to {output_base}.*")
+        sources_by_base[output_base] = source
+        inputs.append((source, output_base))
+
+    todo = []
+    skipped = 0
+    for source, output_base in inputs:
+        fingerprint = source_fingerprint(source)
+        previous = completed.get(source)
+        if previous and previous.get("size") == fingerprint["size"] and previous.get("mtime") == fingerprint["mtime"]:
+            skipped += 1
+            continue
+        todo.append((source, output_base, fingerprint))
+
+    print(f"{len(todo)} file(s) to process, {skipped} already done according to {manifest_path}")
+    if not todo:
+        return
+
+    totals = {"files": 0, "failed": 0, "pages": 0, "members": 0, "claims": 0}
+    run_start = time.perf_counter()
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        def record(source, fingerprint, result=None, error=None):
+            entry = {"source": source, **fingerprint, "finished_at": time.time()}
+            if error is None:
+                entry.update(status="done", **result)
+                totals["files"] += 1
+                for key in ("pages", "members", "claims"):
+                    totals[key] += result[key]
+            else:
+                entry.update(status="failed", error=error)
+                totals["failed"] += 1
+                print(f"FAILED {source}: {error}")
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+
+        markdown_jobs = [job for job in todo if job[0].lower().endswith(".md")]
+        pdf_jobs = [job for job in todo if job[0].lower().endswith(".pdf")]
+
+        if markdown_jobs:
+            with ProcessPoolExecutor(max_workers=args.workers) as executor:
+                futures = {
+                    executor.submit(process_markdown_file, source, output_base, formats): (source, fingerprint)
+                    for source, output_base, fingerprint in markdown_jobs
+                }
+                for future in as_completed(futures):
+                    source, fingerprint = futures[future]
+                    try:
+                        record(source, fingerprint, result=future.result())
+                    except Exception as e:
+                        record(source, fingerprint, error=f"{type(e).__name__}: {e}")
+
+        if pdf_jobs:
+            # Only PDF inputs need marker; load the models once and fork the
+            # converter processes from here so they share them.
+            from importlib.metadata import version as package_version
+            from marker.models import create_model_dict
+            from converter_pool import ConverterPool, count_pdf_pages
+            from artifact_store import ArtifactStore
+            from result_cache import sha256_file
+
+            store = ArtifactStore(args.artifact_dir) if args.artifact_dir else None
+            pool = ConverterPool(create_model_dict(), args.workers).start()
+            try:
+                futures = {
+                    pool.submit(source): (source, output_base, fingerprint, time.perf_counter())
+                    for source, output_base, fingerprint in pdf_jobs
+                }
+                for future in as_completed(futures):
+                    source, output_base, fingerprint, submitted = futures[future]
+                    try:
+                        markdown = future.result()
+                        pages = count_pdf_pages(source)
+                        if store is not None:
+                            store.put(sha256_file(source), markdown, pages=pages,
+                                      converter=f"marker-pdf {package_version('marker-pdf')}",
+                                      extractor_version=EXTRACTOR_VERSION, source=source)
+                        outputs, summary = write_outputs(iter_members(markdown), output_base, formats)
+                        record(source, fingerprint, result={
+                            "pages": pages,
+                            "outputs": outputs,
+                            # The pool does not report when a conversion starts, so this includes the wait for a process
+                            "elapsed_seconds": round(time.perf_counter() - submitted, 3),
+                            **summary,
+                        })
+                    except Exception as e:
+                        record(source, fingerprint, error=f"{type(e).__name__}: {e}")
+            finally:
+                pool.close()
+
+    elapsed = time.perf_counter() - run_start
+    print(f"\nProcessed {totals['files']} file(s), {totals['failed']} failed, in {elapsed:.1f}s")
+    print(f"{totals['pages']} pages ({totals['pages'] / elapsed:.2f} pages/s), "
+          f"{totals['members']} members, {totals['claims']} claims ({totals['claims'] / elapsed:.1f} claims/s)")
+    if totals["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
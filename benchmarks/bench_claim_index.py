@@ -0,0 +1,106 @@
+"""
+Bulk upsert and member lookup speed of the claim index.
+
+    python benchmarks/bench_claim_index.py --members 20000 --documents 200 --members-per-document 500
+    python benchmarks/bench_claim_index.py --documents 20 --xlsx
+
+Every document is a random sample of one pool of synthetic members, so
+documents overlap the way re-sent remittances do, and every fifth one is
+an exact resend of an earlier one. All documents are indexed in one
+transaction and, into a second index, one transaction per document. Then
+claims_for_member is timed for random members. With --xlsx the documents
+are also written as workbooks and one member is looked up by reading them
+all back with pandas, which is what the index replaces.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from claim_index import ClaimIndex
+from extract_tables import output_member_no
+from synthetic_remittance import generate_members
+
+
+def make_documents(pool, documents, per_document, seed):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(documents):
+        if i % 5 == 4:
+            docs.append((f"resend-{i}", docs[rng.randrange(len(docs))][1], None))
+        else:
+            docs.append((f"doc-{i}", rng.sample(pool, min(per_document, len(pool))), None))
+    return docs
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=20000, help="Size of the member pool")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--members-per-document", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--xlsx", action="store_true", help="Also time a lookup over workbooks")
+    args = parser.parse_args()
+
+    pool = generate_members(args.members, seed=args.seed)
+    docs = make_documents(pool, args.documents, args.members_per_document, args.seed)
+    claims_read = sum(len(m["claims"]) for _, members, _ in docs for m in members)
+
+    with tempfile.TemporaryDirectory(prefix="bench_claim_index_") as tmp:
+        index = ClaimIndex(os.path.join(tmp, "bulk.sqlite3"))
+        start = time.perf_counter()
+        counts = index.add_documents(docs)
+        bulk_seconds = time.perf_counter() - start
+
+        per_document = ClaimIndex(os.path.join(tmp, "per_document.sqlite3"))
+        start = time.perf_counter()
+        for doc in docs:
+            per_document.add_document(*doc)
+        per_document_seconds = time.perf_counter() - start
+        per_document.close()
+
+        stats = index.stats()
+        print(f"{len(docs)} documents, {claims_read} claims read, {stats['claims']} unique, "
+              f"{counts['duplicates']} duplicates collapsed")
+        print(f"one transaction:         {bulk_seconds:.2f} s ({claims_read / bulk_seconds:,.0f} claims/s)")
+        print(f"transaction per document: {per_document_seconds:.2f} s ({claims_read / per_document_seconds:,.0f} claims/s)")
+
+        rng = random.Random(args.seed)
+        member_ids = [rng.choice(pool)["Member #"] for _ in range(args.lookups)]
+        timings, found = [], 0
+        for member_id in member_ids:
+            start = time.perf_counter()
+            found += len(index.claims_for_member(member_id))
+            timings.append(time.perf_counter() - start)
+        print(f"claims_for_member: p50 {percentile(timings, 0.5) * 1000:.2f} ms, "
+              f"p99 {percentile(timings, 0.99) * 1000:.2f} ms, {found / len(member_ids):.1f} claims per member")
+        index.close()
+
+        if args.xlsx:
+            import pandas as pd
+            from json_to_excel import json_to_excel
+
+            paths = []
+            for name, members, _ in docs:
+                path = os.path.join(tmp, f"{name}.xlsx")
+                json_to_excel(members, path, verbose=False)
+                paths.append(path)
+            member_id = output_member_no(docs[0][1][0]["Member #"])
+            start = time.perf_counter()
+            rows = sum(int((pd.read_excel(path, dtype=str)["Member #"] == member_id).sum()) for path in paths)
+            print(f"same lookup over {len(paths)} workbooks: {(time.perf_counter() - start) * 1000:.0f} ms "
+                  f"({rows} rows, duplicates included)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Speed of filtered, paginated and aggregated claim queries on a large index.
+
+    python benchmarks/bench_claim_queries.py --claims 1000000
+    python benchmarks/bench_claim_queries.py --index /tmp/claims.sqlite3 --claims 1000000 --pandas
+
+Fills an index with about `--claims` synthetic claims (kept with --index,
+and reused if that file is already full enough), then times every
+CLAIM_FILTERS query, deep pagination and the Net Paid totals per member
+and per month. With --pandas, the same monthly total is computed by
+loading the claims table into pandas, which is what the queries avoid.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from claim_index import ClaimIndex
+from synthetic_remittance import generate_members
+
+MEMBERS_PER_DOCUMENT = 2000
+
+
+def fill(index, claims, seed):
+    documents = 0
+    while index.stats()["claims"] < claims:
+        members = generate_members(MEMBERS_PER_DOCUMENT, seed=seed + documents)
+        index.add_document(f"doc-{seed + documents}", members)
+        documents += 1
+    return documents
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return result, timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=1000000)
+    parser.add_argument("--index", help="Index file to fill and keep (default: a temporary one)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pandas", action="store_true", help="Also time the monthly total in pandas")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_claim_queries_") as tmp:
+        index = ClaimIndex(args.index or os.path.join(tmp, "claims.sqlite3"))
+        start = time.perf_counter()
+        documents = fill(index, args.claims, args.seed)
+        stats = index.stats()
+        print(f"{stats['claims']} claims of {stats['members']} members "
+              f"({documents} documents added in {time.perf_counter() - start:.1f} s)")
+
+        sample, _ = index.query({}, after=random.Random(args.seed).randrange(stats["claims"]), limit=1)
+        claim = sample[0]
+        last_page = index._db.execute("SELECT MAX(id) FROM claims").fetchone()[0] - 150
+        cases = [
+            ("member", lambda: index.query({"member": claim["Member #"]})),
+            ("patient prefix", lambda: index.query({"patient": claim["Patient Name"][:4].lower()})),
+            ("claim #", lambda: index.query({"claim": claim["Claim #"]})),
+            ("proc + mod", lambda: index.query({"proc": claim["Proc"], "mod": claim.get("Mod", "")})),
+            ("received, one day", lambda: index.query({"received_from": claim["Received Date"],
+                                                      "received_to": claim["Received Date"]})),
+            ("no filter, deep page", lambda: index.query({}, after=last_page)),
+            ("net paid by member", lambda: index.summarize("member", {})),
+            ("net paid by month", lambda: index.summarize("month", {})),
+            ("by month, one proc", lambda: index.summarize("month", {"proc": claim["Proc"]})),
+            ("by member, received Q1", lambda: index.summarize("member", {"received_from": "2025-01-01",
+                                                                          "received_to": "2025-03-31"})),
+        ]
+        print(f"{'query':>24} {'rows':>6} {'p50 ms':>8}")
+        for name, function in cases:
+            (rows, _), seconds = timed(function, args.repeat)
+            print(f"{name:>24} {len(rows):>6} {seconds * 1000:>8.2f}")
+
+        if args.pandas:
+            import pandas as pd
+
+            start = time.perf_counter()
+            frame = pd.read_sql_query("SELECT * FROM claims", index._db)
+            months = pd.to_datetime(frame["received_date"], format="%m/%d/%Y").dt.strftime("%Y-%m")
+            amounts = pd.to_numeric(frame["net_paid"].str.replace(",", ""), errors="coerce")
+            totals = amounts.groupby(months).agg(["count", "sum"])
+            print(f"{'by month in pandas':>24} {len(totals):>6} {(time.perf_counter() - start) * 1000:>8.2f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
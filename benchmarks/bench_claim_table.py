@@ -0,0 +1,56 @@
+"""
+Memory and DataFrame build time: list of member dicts vs ClaimTable.
+
+    python benchmarks/bench_claim_table.py --members 20000
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from extract_tables import iter_members
+from json_to_excel import flatten_records
+from claim_table import ClaimTable
+from synthetic_remittance import generate_markdown
+
+
+def traced(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    markdown = generate_markdown(args.members, seed=args.seed)
+    members, members_bytes, _, _ = traced(lambda: list(iter_members(markdown)))
+    table, table_bytes, _, _ = traced(lambda: ClaimTable.from_members(iter_members(markdown)))
+    claims = table.n_claims
+    print(f"{table.n_members} members, {claims} claims")
+    print(f"  list of dicts   {members_bytes / 2**20:8.1f} MiB ({members_bytes / claims:.0f} B/claim)")
+    print(f"  ClaimTable      {table_bytes / 2**20:8.1f} MiB ({table_bytes / claims:.0f} B/claim)")
+
+    _, _, dicts_peak, dicts_seconds = traced(lambda: pd.DataFrame(flatten_records(members, verbose=False)))
+    _, _, text_peak, text_seconds = traced(lambda: table.to_dataframe(numeric=False))
+    _, _, numeric_peak, numeric_seconds = traced(lambda: table.to_dataframe())
+    print("DataFrame build (time, peak traced memory):")
+    print(f"  flatten_records + DataFrame   {dicts_seconds * 1000:7.1f} ms {dicts_peak / 2**20:8.1f} MiB")
+    print(f"  ClaimTable, text amounts      {text_seconds * 1000:7.1f} ms {text_peak / 2**20:8.1f} MiB")
+    print(f"  ClaimTable, numeric amounts   {numeric_seconds * 1000:7.1f} ms {numeric_peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
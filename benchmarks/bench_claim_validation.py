@@ -0,0 +1,119 @@
+"""
+Validation of the financial columns: claim_validation vs a per-cell Python loop.
+
+    python benchmarks/bench_claim_validation.py --members 20000
+
+The members are parsed with capture_totals, so every member's claims are
+reconciled against its "Member Totals :" row (the synthetic remittance prints
+exact totals, so no mismatch is expected). The reference converts every cell
+with float()/strptime and sums the totals member by member; both must flag
+the same rows. The DataFrame build that validate_members starts with is
+timed on its own, since it is the same work the plain xlsx format does.
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from extract_tables import iter_members, StreamingTableParser, NUMERIC_FINANCIAL_HEADERS, MEMBER_TOTALS_KEY
+from json_to_excel import members_to_dataframe
+from claim_validation import (
+    validate_members, validate_claim_frame, validation_summary,
+    NUMERIC_HEADERS, DATE_HEADERS, DATE_FORMAT, TOLERANCE, FLAG_COLUMNS
+)
+from synthetic_remittance import generate_markdown
+
+
+def _amount(text):
+    text = (text or "").strip().replace(",", "").replace("$", "")
+    if not text:
+        return None
+    negative = text.startswith("(") and text.endswith(")") or text.endswith("-")
+    text = text.strip("()").rstrip("-")
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def python_reference(members):
+    """Flags of every claim row, converting one cell at a time."""
+    flags = []
+    for member in members:
+        claims = member.get("claims") or [{}]
+        totals = member.get(MEMBER_TOTALS_KEY)
+        mismatch = False
+        if totals:
+            for header in NUMERIC_FINANCIAL_HEADERS:
+                total = _amount(totals.get(header))
+                if total is not None:
+                    summed = sum(_amount(claim.get(header)) or 0.0 for claim in claims)
+                    mismatch = mismatch or abs(summed - total) > TOLERANCE
+        for claim in claims:
+            values = {header: _amount(claim.get(header)) for header in NUMERIC_HEADERS}
+            for header in DATE_HEADERS:
+                if claim.get(header):
+                    try:
+                        datetime.strptime(claim[header].strip(), DATE_FORMAT)
+                    except ValueError:
+                        pass
+            billed, allowed, paid = (values["Amount Billed"], values["Amount Allowed"], values["Net Paid"])
+            flags.append((
+                allowed is not None and billed is not None and abs(allowed) - abs(billed) > TOLERANCE,
+                paid is not None and allowed is not None and abs(paid) - abs(allowed) > TOLERANCE,
+                mismatch,
+            ))
+    return np.array(flags, dtype=bool).reshape(-1, len(FLAG_COLUMNS))
+
+
+def best_of(repeat, function):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    markdown = generate_markdown(args.members, seed=args.seed)
+    members = list(iter_members(markdown, StreamingTableParser(capture_totals=True)))
+
+    build_seconds, text_frame = best_of(args.repeat, lambda: members_to_dataframe(members, verbose=False))
+    member_index = np.repeat(np.arange(len(members)), [max(len(m.get("claims") or []), 1) for m in members])
+    member_totals = [m.get(MEMBER_TOTALS_KEY) for m in members]
+    vector_seconds, frame = best_of(
+        args.repeat, lambda: validate_claim_frame(text_frame.copy(), member_index, member_totals)
+    )
+    total_seconds, _ = best_of(args.repeat, lambda: validate_members(members))
+    python_seconds, reference = best_of(args.repeat, lambda: python_reference(members))
+    rows = len(frame)
+
+    print(f"{len(members)} members, {rows} claim rows")
+    print(f"{'':<18} {'best ms':>10} {'rows/s':>12}")
+    print(f"{'per-cell python':<18} {python_seconds * 1000:>10.1f} {rows / python_seconds:>12,.0f}")
+    print(f"{'vectorized':<18} {vector_seconds * 1000:>10.1f} {rows / vector_seconds:>12,.0f}")
+    print(f"{'  + frame build':<18} {total_seconds * 1000:>10.1f} {rows / total_seconds:>12,.0f}"
+          f"   (members_to_dataframe alone {build_seconds * 1000:.1f} ms)")
+    print(f"speedup {python_seconds / vector_seconds:.1f}x")
+    print(validation_summary(frame))
+
+    if not np.array_equal(frame[FLAG_COLUMNS].to_numpy(dtype=bool), reference):
+        print("error: flags differ from the per-cell reference", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Throughput and memory of the forked converter pool as the process count grows.
+
+    python benchmarks/bench_converter_pool.py --pdf sample.pdf --processes 1 2 4 8 --documents 16
+
+For every process count the same PDF is submitted `--documents` times at once.
+RSS double-counts the copy-on-write model pages every child shares with the
+parent, so PSS (proportional set size, from /proc/<pid>/smaps_rollup) is
+reported as well; PSS is what actually has to fit in the memory budget.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converter_pool import ConverterPool
+
+
+def read_memory_kb(pid):
+    """Return (rss_kb, pss_kb) for a process, or (0, 0) if it is gone."""
+    rss_kb, pss_kb = 0, 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    rss_kb = int(line.split()[1])
+                elif line.startswith("Pss:"):
+                    pss_kb = int(line.split()[1])
+    except FileNotFoundError:
+        pass
+    return rss_kb, pss_kb
+
+
+def run(artifact_dict, pdf_path, processes, documents):
+    pool = ConverterPool(artifact_dict, processes).start()
+    try:
+        # Warm every process once so model first-use costs are not in the timing.
+        wait([pool.submit(pdf_path) for _ in range(processes)])
+
+        start = time.perf_counter()
+        futures = [pool.submit(pdf_path) for _ in range(documents)]
+        wait(futures)
+        elapsed = time.perf_counter() - start
+        failures = sum(1 for f in futures if f.exception() is not None)
+
+        pids = [os.getpid()] + pool.worker_pids()
+        memory = [read_memory_kb(pid) for pid in pids]
+    finally:
+        pool.close()
+
+    return {
+        "processes": processes,
+        "documents": documents,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "documents_per_second": round(documents / elapsed, 3),
+        "total_rss_mb": round(sum(m[0] for m in memory) / 1024, 1),
+        "total_pss_mb": round(sum(m[1] for m in memory) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", required=True, help="PDF to convert repeatedly")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--documents", type=int, default=8, help="Conversions per process count")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    from marker.models import create_model_dict
+
+    load_start = time.perf_counter()
+    artifact_dict = create_model_dict()
+    print(f"Models loaded in {time.perf_counter() - load_start:.1f}s, parent PSS {read_memory_kb(os.getpid())[1] / 1024:.0f} MB")
+
+    results = []
+    print(f"{'procs':>5} {'docs/s':>8} {'seconds':>8} {'RSS MB':>9} {'PSS MB':>9} {'failed':>6}")
+    for processes in args.processes:
+        result = run(artifact_dict, args.pdf, processes, args.documents)
+        results.append(result)
+        print(f"{result['processes']:>5} {result['documents_per_second']:>8} {result['seconds']:>8} "
+              f"{result['total_rss_mb']:>9} {result['total_pss_mb']:>9} {result['failures']:>6}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
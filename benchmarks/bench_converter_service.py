@@ -0,0 +1,93 @@
+"""
+Throughput of the converter service with and without micro-batching.
+
+    python benchmarks/bench_converter_service.py --pdf page1.pdf page2.pdf --documents 16 --batch-pages 0 8 16 32
+
+The PDFs are submitted `--documents` times in total, all at once as
+concurrent requests would, for every batch size; 0 converts them one at a
+time and is the baseline for the speedup. Every result is parsed with
+extract_tables and compared with the one-at-a-time conversion of the same
+PDF: `differ` counts documents whose members are not identical.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converter_pool import count_pdf_pages
+from converter_service import ConverterService
+from extract_tables import extract_tables
+
+
+def run(artifact_dict, pdf_paths, documents, batch_pages, wait_seconds):
+    service = ConverterService(artifact_dict, max_batch_pages=batch_pages, max_wait_seconds=wait_seconds).start()
+    try:
+        # First use builds the converters; keep that out of the timing
+        service.convert(pdf_paths[0])
+        if batch_pages:
+            wait([service.submit(pdf_paths[0]), service.submit(pdf_paths[-1])])
+
+        sources = [pdf_paths[i % len(pdf_paths)] for i in range(documents)]
+        start = time.perf_counter()
+        futures = [service.submit(pdf_path) for pdf_path in sources]
+        wait(futures)
+        elapsed = time.perf_counter() - start
+        stats = service.stats()
+    finally:
+        service.close()
+
+    outputs = [(pdf_path, None if f.exception() else f.result()) for pdf_path, f in zip(sources, futures)]
+    pages = sum(count_pdf_pages(pdf_path) for pdf_path in sources)
+    return {
+        "batch_pages": batch_pages,
+        "documents": documents,
+        "pages": pages,
+        "failures": sum(1 for _, markdown in outputs if markdown is None),
+        "batches": stats["batches"],
+        "fallbacks": stats["fallbacks"],
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 3),
+    }, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", required=True, nargs="+", help="PDFs to convert, used in turn")
+    parser.add_argument("--documents", type=int, default=16, help="Conversions per batch size")
+    parser.add_argument("--batch-pages", type=int, nargs="+", default=[0, 8, 16, 32])
+    parser.add_argument("--wait-ms", type=float, default=50)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    from marker.models import create_model_dict
+
+    load_start = time.perf_counter()
+    artifact_dict = create_model_dict()
+    print(f"Models loaded in {time.perf_counter() - load_start:.1f}s")
+
+    batch_sizes = [0] + [b for b in args.batch_pages if b > 0]
+    results, reference = [], {}
+    print(f"{'batch pages':>11} {'pages/s':>8} {'seconds':>8} {'speedup':>8} {'batches':>8} {'fallback':>8} "
+          f"{'failed':>6} {'differ':>6}")
+    for batch_pages in batch_sizes:
+        result, outputs = run(artifact_dict, args.pdf, args.documents, batch_pages, args.wait_ms / 1000)
+        members = [(pdf_path, None if markdown is None else extract_tables(markdown)) for pdf_path, markdown in outputs]
+        if not batch_pages:
+            reference = dict(members)
+        result["differ"] = sum(1 for pdf_path, parsed in members if parsed != reference.get(pdf_path))
+        result["speedup"] = round(result["pages_per_second"] / results[0]["pages_per_second"], 2) if results else 1.0
+        results.append(result)
+        print(f"{batch_pages or 'off':>11} {result['pages_per_second']:>8} {result['seconds']:>8} {result['speedup']:>8} "
+              f"{result['batches']:>8} {result['fallbacks']:>8} {result['failures']:>6} {result['differ']:>6}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of re-extracting a reissued remittance with the incremental store.
+
+    python benchmarks/bench_incremental.py --members 2000 --changed 2 --appended 5
+    python benchmarks/bench_incremental.py --pdf remittance.pdf
+
+Parses a synthetic document once to fill the store, then parses three
+reissues of it: one with `--changed` pages corrected (an amount changed
+on each), one with `--appended` pages added at the end, and the original
+again. For each the blocks taken from the store, the blocks parsed again
+and the time are compared with a full `parse_table_blocks`, and the
+members must be identical. With --pdf, also times the page fingerprints
+that decide which pages of a PDF need converting again.
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract_tables import extract_individual_tables_from_file, parse_table_blocks
+from incremental import IncrementalStore, page_fingerprints, parse_blocks_incremental
+from synthetic_remittance import generate_markdown
+
+AMOUNT_RE = re.compile(r"\| (\d+\.\d\d) \|")
+
+
+def correct_amount(block: str) -> str:
+    """The block with its last claim amount changed, as a payer's correction would."""
+    matches = list(AMOUNT_RE.finditer(block))
+    if not matches:
+        return block + "\n"
+    last = matches[-1]
+    corrected = f"| {float(last.group(1)) + 1:.2f} |"
+    return block[:last.start()] + corrected + block[last.end():]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=2000, help="Members in the synthetic document")
+    parser.add_argument("--changed", type=int, default=2, help="Pages corrected in the reissue")
+    parser.add_argument("--appended", type=int, default=5, help="Pages added to the end of the reissue")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pdf", help="Also time page fingerprints of this PDF")
+    args = parser.parse_args()
+
+    original = extract_individual_tables_from_file(generate_markdown(args.members, seed=args.seed))
+    rng = random.Random(args.seed)
+    corrected = list(original)
+    for index in rng.sample(range(len(original)), min(args.changed, len(original))):
+        corrected[index] = correct_amount(corrected[index])
+    extra = extract_individual_tables_from_file(generate_markdown(args.members, seed=args.seed + 1))
+    appended = original + extra[:args.appended]
+
+    store = IncrementalStore(":memory:")
+    (_, reused), seconds = timed(parse_blocks_incremental, original, store)
+    print(f"{len(original)} pages; first parse filling the store took {seconds * 1000:.1f} ms")
+
+    print(f"{'reissue':>10} {'pages':>6} {'reused':>7} {'parsed':>7} {'full ms':>8} {'incr ms':>8} {'speedup':>8} {'same':>5}")
+    for name, blocks in (("corrected", corrected), ("appended", appended), ("unchanged", original)):
+        expected, full_seconds = timed(parse_table_blocks, blocks)
+        (members, reused), seconds = timed(parse_blocks_incremental, blocks, store)
+        parsed = sum(1 for block in blocks if block.strip()) - reused
+        print(f"{name:>10} {len(blocks):>6} {reused:>7} {parsed:>7} {full_seconds * 1000:>8.1f} {seconds * 1000:>8.1f} "
+              f"{full_seconds / seconds:>8.1f} {str(members == expected):>5}")
+        if members != expected:
+            sys.exit(f"{name}: incremental parse differs from a full parse")
+
+    if args.pdf:
+        fingerprints, seconds = timed(page_fingerprints, args.pdf)
+        print(f"Fingerprinted {len(fingerprints)} pages of {args.pdf} in {seconds * 1000:.1f} ms "
+              f"({seconds * 1000 / max(1, len(fingerprints)):.1f} ms/page)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Scaling of parse_eob_table with the number of members in one table block.
+
+    python benchmarks/bench_member_scaling.py --members 1000 5000 10000 20000 40000
+
+Every size is rendered as a single page block (no page breaks) of small
+members, the case where per-member bookkeeping that scans the members seen
+so far goes quadratic. With linear bookkeeping the time per member stays flat
+as the block grows; the last column is the time per member relative to the
+smallest size.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract_tables import parse_eob_table
+from synthetic_remittance import generate_members, render_markdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, nargs="+", default=[1000, 5000, 10000, 20000, 40000])
+    parser.add_argument("--claims", type=int, default=1, help="Claims per member")
+    parser.add_argument("--table-type", type=int, choices=[1, 2], default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'members':>8} {'lines':>8} {'best ms':>10} {'us/member':>10} {'relative':>9}")
+    baseline = None
+    for n_members in sorted(args.members):
+        members = generate_members(n_members, args.claims, args.claims, seed=args.seed)
+        block = render_markdown(members, table_type=args.table_type, rows_per_page=10 ** 9, seed=args.seed)
+        lines = block.count("\n") + 1
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            completed, still_open = parse_eob_table(block)
+            best = min(best, time.perf_counter() - start)
+        parsed = len(completed) + (1 if still_open else 0)
+        if parsed != n_members:
+            print(f"warning: parsed {parsed} of {n_members} members", file=sys.stderr)
+        per_member = best / n_members
+        baseline = baseline or per_member
+        print(f"{n_members:>8} {lines:>8} {best * 1000:>10.1f} {per_member * 1e6:>10.1f} {per_member / baseline:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Time and peak memory of each output format for a range of claim row counts.
+
+    python benchmarks/bench_output_formats.py --rows 10000 100000 1000000
+
+Every (format, rows) pair is serialized in a forked child so the peak RSS of
+one run does not hide the next. Peak memory is the child's high-water RSS
+above its RSS before serializing (the members are already in memory). The
+pandas-based "xlsx" format needs several GB at 1M rows; leave it out with
+--formats when memory is tight.
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_formats import FORMATS, available_formats
+from synthetic_remittance import generate_members
+
+CLAIMS_PER_MEMBER = 4
+
+
+def rss_kib(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_one(members, fmt_name, result_queue):
+    try:
+        # Reset the high-water mark so it only covers serialization
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    baseline = rss_kib("VmRSS")
+    start = time.perf_counter()
+    size = len(FORMATS[fmt_name].serialize(members))
+    seconds = time.perf_counter() - start
+    result_queue.put((seconds, size, (rss_kib("VmHWM") - baseline) * 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--formats", nargs="+", default=available_formats(), choices=available_formats())
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    print(f"{'rows':>9} {'format':<12} {'seconds':>9} {'rows/s':>11} {'output MiB':>11} {'peak MiB':>10}")
+    for rows in args.rows:
+        members = generate_members(max(1, rows // CLAIMS_PER_MEMBER), CLAIMS_PER_MEMBER, CLAIMS_PER_MEMBER, seed=rows)
+        for fmt_name in args.formats:
+            result_queue = context.Queue()
+            child = context.Process(target=run_one, args=(members, fmt_name, result_queue))
+            child.start()
+            child.join()
+            if child.exitcode != 0:
+                print(f"{rows:>9} {fmt_name:<12} failed (exit code {child.exitcode})")
+                continue
+            seconds, size, peak = result_queue.get()
+            print(f"{rows:>9} {fmt_name:<12} {seconds:>9.2f} {rows / seconds:>11,.0f} "
+                  f"{size / 2**20:>11.1f} {peak / 2**20:>10.1f}")
+        del members
+
+
+if __name__ == "__main__":
+    main()
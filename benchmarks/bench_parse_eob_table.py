@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of the per-line parser: lines/s through parse_eob_table.
+
+    python benchmarks/bench_parse_eob_table.py --members 2000 --repeat 5
+    python benchmarks/bench_parse_eob_table.py --extra-layouts 50
+
+With --extra-layouts N the streaming parser is also timed with N more
+layout profiles loaded (copies of the default one under other page
+headers), to check that layout detection leaves the per-line cost alone.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract_tables import extract_individual_tables_from_file, parse_eob_table, iter_members, StreamingTableParser
+from layout_profiles import LayoutProfile, LayoutRegistry, default_registry
+from synthetic_remittance import generate_markdown
+
+
+def bench(blocks, repeat):
+    lines = sum(block.count("\n") + 1 for block in blocks)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        carried = None
+        for block in blocks:
+            _, carried = parse_eob_table(block, carried)
+        best = min(best, time.perf_counter() - start)
+    return lines, best
+
+
+def bench_streaming(markdown, registry, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser = StreamingTableParser(registry=registry)
+        for _ in iter_members(markdown, parser):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def registry_with_extra_layouts(count):
+    default = default_registry().default
+    extra = [
+        LayoutProfile(dict(default.definition, name=f"payer_{i}", page_start=f"^\\*\\*PAYER {i} REMITTANCE"))
+        for i in range(count)
+    ]
+    return LayoutRegistry([default] + extra)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extra-layouts", type=int, default=0, help="Also time streaming with this many more profiles")
+    args = parser.parse_args()
+
+    for table_type in (1, 2):
+        markdown = generate_markdown(args.members, table_type=table_type, seed=args.seed)
+        blocks = extract_individual_tables_from_file(markdown)
+        lines, seconds = bench(blocks, args.repeat)
+        print(f"table_type {table_type}: {lines} lines in {len(blocks)} blocks, best of {args.repeat}: "
+              f"{seconds * 1000:.1f} ms ({lines / seconds:,.0f} lines/s)")
+        if args.extra_layouts:
+            for registry in (default_registry(), registry_with_extra_layouts(args.extra_layouts)):
+                seconds = bench_streaming(markdown, registry, args.repeat)
+                print(f"  streaming with {len(registry.profiles):>3} layout(s): {seconds * 1000:.1f} ms "
+                      f"({lines / seconds:,.0f} lines/s)")
+
+
+if __name__ == "__main__":
+    main()
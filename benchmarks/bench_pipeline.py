@@ -0,0 +1,234 @@
+"""
+Stage-by-stage benchmark and golden-output regression check of the text pipeline.
+
+    python benchmarks/bench_pipeline.py --members 1000 5000 --output results.json
+    python benchmarks/bench_pipeline.py --compare results.json
+    python benchmarks/bench_pipeline.py --golden-only
+    python benchmarks/bench_pipeline.py --update-golden
+
+For every size and table_type the synthetic remittance markdown is run
+through each stage separately: `split` (extract_individual_tables_from_file),
+`parse` (parse_eob_table over the blocks, carrying members across pages),
+`extract_tables` (the streaming end-to-end parse) and `json_to_excel`. Time is
+the best of --repeat runs; peak memory comes from one extra tracemalloc run
+and counts Python allocations only.
+
+Before benchmarking, every `<case>.md` in benchmarks/golden is parsed by both
+`extract_tables` and the split + parse path, and the result must equal
+`<case>.json`. --update-golden rewrites the expected JSON (and creates
+missing cases) after an intended parser change; bump EXTRACTOR_VERSION with it.
+
+Results are written as JSON (--output, default stdout) with the extractor
+version, git commit and environment, so runs can be compared across versions
+with --compare. The exit status is 1 when a golden case fails.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extract_tables import extract_individual_tables_from_file, parse_table_blocks, extract_tables, EXTRACTOR_VERSION
+from json_to_excel import json_to_excel
+from synthetic_remittance import generate_markdown
+
+RESULTS_SCHEMA = 1
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# Small, seeded documents covering the layouts the parser has to handle
+GOLDEN_CASES = {
+    "type1_mixed": dict(n_members=40, table_type=1, seed=101),
+    "type2_mixed": dict(n_members=40, table_type=2, seed=202),
+    "type1_page_splits": dict(n_members=30, table_type=1, seed=303, rows_per_page=8),
+    "type2_carried_names": dict(n_members=30, table_type=2, seed=404, carried_name_ratio=0.9),
+    "type1_combined_rows": dict(n_members=30, table_type=1, seed=505, combined_row_ratio=0.9, allow_page_splits=False),
+}
+
+
+def measure(run: Callable, repeat: int) -> Tuple[object, float, int]:
+    """(result, best wall seconds over `repeat` runs, tracemalloc peak bytes of one more run)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def bench_document(markdown: str, repeat: int) -> List[Dict]:
+    lines = markdown.count("\n") + 1
+    size = len(markdown.encode("utf-8"))
+    results = []
+
+    def record(stage: str, seconds: float, peak: int, items: int, unit: str):
+        results.append({
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "items": items,
+            "unit": unit,
+            "per_second": round(items / seconds, 1) if seconds else None,
+            "mib_per_second": round(size / 2**20 / seconds, 3) if seconds and unit == "lines" else None,
+            "peak_bytes": peak,
+        })
+
+    blocks, seconds, peak = measure(lambda: extract_individual_tables_from_file(markdown), repeat)
+    record("split", seconds, peak, lines, "lines")
+    members, seconds, peak = measure(lambda: parse_table_blocks(blocks), repeat)
+    record("parse", seconds, peak, lines, "lines")
+    del blocks
+    _, seconds, peak = measure(lambda: extract_tables(markdown), repeat)
+    record("extract_tables", seconds, peak, lines, "lines")
+    claims = sum(len(m.get("claims", [])) for m in members)
+    _, seconds, peak = measure(lambda: json_to_excel(members, verbose=False), repeat)
+    record("json_to_excel", seconds, peak, claims, "rows")
+    for result in results:
+        result.update(members=len(members), claims=claims, lines=lines, input_bytes=size)
+    return results
+
+
+def golden_paths(name: str) -> Tuple[str, str]:
+    return os.path.join(GOLDEN_DIR, f"{name}.md"), os.path.join(GOLDEN_DIR, f"{name}.json")
+
+
+def update_golden() -> List[str]:
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for name, kwargs in GOLDEN_CASES.items():
+        markdown_path, json_path = golden_paths(name)
+        if not os.path.exists(markdown_path):
+            with open(markdown_path, "w", encoding="utf-8") as f:
+                f.write(generate_markdown(**kwargs))
+    names = sorted(f[:-3] for f in os.listdir(GOLDEN_DIR) if f.endswith(".md"))
+    for name in names:
+        markdown_path, json_path = golden_paths(name)
+        with open(markdown_path, encoding="utf-8") as f:
+            members = extract_tables(f.read())
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(members, f, indent=2)
+            f.write("\n")
+    return names
+
+
+def first_difference(expected: List[Dict], actual: List[Dict]) -> str:
+    if len(expected) != len(actual):
+        return f"{len(actual)} members instead of {len(expected)}"
+    for index, (want, got) in enumerate(zip(expected, actual)):
+        if want != got:
+            keys = sorted(k for k in set(want) | set(got) if want.get(k) != got.get(k))
+            return f"member {index} ({want.get('Member #')}) differs in {', '.join(keys)}"
+    return "identical"
+
+
+def check_golden() -> Dict:
+    names = sorted(f[:-3] for f in os.listdir(GOLDEN_DIR) if f.endswith(".md")) if os.path.isdir(GOLDEN_DIR) else []
+    failures = []
+    for name in names:
+        markdown_path, json_path = golden_paths(name)
+        with open(markdown_path, encoding="utf-8") as f:
+            markdown = f.read()
+        with open(json_path, encoding="utf-8") as f:
+            expected = json.load(f)
+        for path_name, actual in (
+            ("extract_tables", extract_tables(markdown)),
+            ("split+parse", parse_table_blocks(extract_individual_tables_from_file(markdown))),
+        ):
+            if actual != expected:
+                failures.append({"case": name, "path": path_name, "difference": first_difference(expected, actual)})
+    return {"cases": len(names), "passed": len(names) - len({f["case"] for f in failures}), "failures": failures}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path: str, report: Dict):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {(r["stage"], r["table_type"], r["members_requested"]): r for r in previous.get("results", [])}
+    print(f"vs {previous_path} (extractor {previous.get('extractor_version')}, commit {str(previous.get('git_commit'))[:10]}):",
+          file=sys.stderr)
+    for result in report["results"]:
+        old = before.get((result["stage"], result["table_type"], result["members_requested"]))
+        if old is None or not old["per_second"] or not result["per_second"]:
+            continue
+        print(f"  {result['stage']:<15} type {result['table_type']} {result['members_requested']:>7} members: "
+              f"{result['per_second'] / old['per_second']:5.2f}x throughput, "
+              f"{result['peak_bytes'] / max(1, old['peak_bytes']):5.2f}x peak memory", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--table-types", type=int, nargs="+", default=[1, 2], choices=[1, 2])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Earlier results JSON to print throughput and memory ratios against")
+    parser.add_argument("--golden-only", action="store_true", help="Only run the golden-output check")
+    parser.add_argument("--update-golden", action="store_true", help="Rewrite the expected golden JSON and exit")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        names = update_golden()
+        print(f"Wrote expected output for {len(names)} golden case(s) in {GOLDEN_DIR}", file=sys.stderr)
+        return
+
+    golden = check_golden()
+    for failure in golden["failures"]:
+        print(f"GOLDEN MISMATCH {failure['case']} via {failure['path']}: {failure['difference']}", file=sys.stderr)
+    print(f"golden: {golden['passed']}/{golden['cases']} cases match", file=sys.stderr)
+
+    report = {
+        "schema": RESULTS_SCHEMA,
+        "extractor_version": EXTRACTOR_VERSION,
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {"members": args.members, "table_types": args.table_types, "repeat": args.repeat, "seed": args.seed},
+        "golden": golden,
+        "results": [],
+    }
+    if not args.golden_only:
+        for n_members in args.members:
+            for table_type in args.table_types:
+                markdown = generate_markdown(n_members, table_type=table_type, seed=args.seed)
+                for result in bench_document(markdown, args.repeat):
+                    report["results"].append({"table_type": table_type, "members_requested": n_members, **result})
+                    print(f"  {result['stage']:<15} type {table_type} {n_members:>7} members: "
+                          f"{result['per_second']:>12,.0f} {result['unit']}/s, "
+                          f"peak {result['peak_bytes'] / 2**20:8.1f} MiB", file=sys.stderr)
+                del markdown
+
+    if args.compare:
+        compare(args.compare, report)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if golden["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
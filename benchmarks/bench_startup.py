@@ -0,0 +1,134 @@
+"""
+Cold start to first response of the service, with eager and lazy model loading.
+
+    python benchmarks/bench_startup.py --pdf remittance.pdf --runs 3
+
+Every run starts a fresh server (`flask run`) with an empty cache and reports
+the seconds from process start until /healthz answers, until /readyz answers
+200 and until the first /webhook conversion of --pdf returns. With
+PRELOAD_MODELS=1 the upload is sent once the service is ready, as a load
+balancer would; with PRELOAD_MODELS=0 it is sent as soon as the process is
+alive and pays for loading the models itself. Also reports how long the
+markdown-only modules take to import and checks they do not import marker.
+"""
+import os
+import sys
+import time
+import uuid
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT_MODULES = ["extract_tables", "json_to_excel", "claim_table", "output_formats", "batch_extract"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def post_pdf(url: str, pdf_path: str) -> int:
+    boundary = uuid.uuid4().hex
+    with open(pdf_path, "rb") as f:
+        pdf = f.read()
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{os.path.basename(pdf_path)}\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + pdf + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    try:
+        with urllib.request.urlopen(request, timeout=3600) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while get_status(url) != 200:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{url} not ready after {timeout}s")
+        time.sleep(0.05)
+
+
+def run_once(pdf_path: str, preload: bool, extra_env: dict, timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(
+            os.environ,
+            PRELOAD_MODELS="1" if preload else "0",
+            CACHE_DIR=os.path.join(data_dir, "cache"),
+            JOB_DATA_DIR=os.path.join(data_dir, "jobs"),
+            **extra_env,
+        )
+        start = time.monotonic()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for(f"{base}/healthz", process, timeout)
+            result = {"healthz": time.monotonic() - start}
+            wait_for(f"{base}/readyz", process, timeout)
+            result["readyz"] = time.monotonic() - start
+            status = post_pdf(f"{base}/webhook?format=json", pdf_path)
+            if status != 200:
+                raise RuntimeError(f"/webhook returned {status}")
+            result["first_response"] = time.monotonic() - start
+            return result
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def text_import_seconds() -> tuple:
+    code = (
+        "import sys, time; start = time.perf_counter(); "
+        + "; ".join(f"import {name}" for name in TEXT_MODULES)
+        + "; print(time.perf_counter() - start, 'marker' in sys.modules)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    seconds, marker_imported = output.split()
+    return float(seconds), marker_imported == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=os.path.join(ROOT, "assets", "warmup.pdf"))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--converter-processes", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=1800)
+    args = parser.parse_args()
+
+    seconds, marker_imported = text_import_seconds()
+    print(f"markdown-only modules import in {seconds:.2f}s; marker imported: {marker_imported}")
+
+    extra_env = {"CONVERTER_PROCESSES": str(args.converter_processes)}
+    print(f"{'mode':<8} {'run':>3} {'healthz s':>10} {'readyz s':>9} {'first response s':>17}")
+    for mode, preload in (("eager", True), ("lazy", False)):
+        for run in range(args.runs):
+            result = run_once(args.pdf, preload, extra_env, args.timeout)
+            print(f"{mode:<8} {run:>3} {result['healthz']:>10.2f} {result['readyz']:>9.2f} {result['first_response']:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Latency and throughput of a running server under concurrent load.
+
+    gunicorn -c gunicorn.conf.py app:app
+    python benchmarks/load_test.py --pdf remittance.pdf --concurrency 1 2 4 8 16 32
+    python benchmarks/load_test.py --markdown sample.md --requests 20
+
+For every concurrency level that many clients send requests back to back
+over their own keep-alive connection. Reports throughput, p50/p95/p99
+latency of the successful requests, how many were turned away by admission
+control (503) or ran past their deadline (504), and how often the server
+closed a connection. PDFs get random bytes appended after %EOF for every
+request so each one misses the result cache; pass --same-pdf to measure
+cache hits instead.
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+
+def multipart(field: str, name: str, content_type: str, data: bytes, boundary: str) -> bytes:
+    return (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{name}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[max(1, math.ceil(fraction * len(sorted_values))) - 1]
+
+
+class Client(threading.Thread):
+    def __init__(self, base_url, path, make_body, content_type, remaining, results, lock, timeout):
+        super().__init__(daemon=True)
+        url = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        self.path = path
+        self.make_body = make_body
+        self.content_type = content_type
+        self.remaining = remaining
+        self.results = results
+        self.lock = lock
+
+    def run(self):
+        while True:
+            with self.lock:
+                if self.remaining[0] <= 0:
+                    break
+                self.remaining[0] -= 1
+            body = self.make_body()
+            start = time.perf_counter()
+            try:
+                self.connection.request("POST", self.path, body=body, headers={"Content-Type": self.content_type})
+                response = self.connection.getresponse()
+                response.read()
+                status, closed = response.status, response.will_close
+            except (OSError, http.client.HTTPException) as e:
+                status, closed = type(e).__name__, True
+                self.connection.close()
+            with self.lock:
+                self.results.append((time.perf_counter() - start, status, closed))
+        self.connection.close()
+
+
+def run_level(args, concurrency: int, make_body, content_type: str) -> dict:
+    results, lock = [], threading.Lock()
+    remaining = [args.requests * concurrency]
+    clients = [
+        Client(args.url, args.path, make_body, content_type, remaining, results, lock, args.timeout)
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    ok = sorted(seconds for seconds, status, _ in results if status == 200)
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected": sum(1 for _, status, _ in results if status == 503),
+        "timed_out": sum(1 for _, status, _ in results if status == 504),
+        "errors": sum(1 for _, status, _ in results if status not in (200, 503, 504)),
+        "connections_closed": sum(1 for _, _, closed in results if closed),
+        "seconds": round(elapsed, 3),
+        "ok_per_second": round(len(ok) / elapsed, 3),
+        "p50_ms": round(percentile(ok, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(ok, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(ok, 0.99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--pdf", help="PDF posted to /webhook")
+    source.add_argument("--markdown", help="Markdown posted to /markdown, skipping conversion")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--format", default="xlsx")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=4, help="Requests per client at every level")
+    parser.add_argument("--same-pdf", action="store_true", help="Send the PDF unchanged, so repeats hit the result cache")
+    parser.add_argument("--timeout", type=float, default=3600, help="Client socket timeout in seconds")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    path = args.pdf or args.markdown
+    with open(path, "rb") as f:
+        data = f.read()
+    boundary = uuid.uuid4().hex
+    content_type = f"multipart/form-data; boundary={boundary}"
+    name = os.path.basename(path)
+    if args.pdf:
+        args.path = f"/webhook?format={args.format}"
+        if args.same_pdf:
+            body = multipart("file", name, "application/pdf", data, boundary)
+            make_body = lambda: body
+        else:
+            make_body = lambda: multipart("file", name, "application/pdf",
+                                          data + b"\n%" + uuid.uuid4().hex.encode() + b"\n", boundary)
+    else:
+        args.path = f"/markdown?format={args.format}"
+        body = multipart("file", name, "text/markdown", data, boundary)
+        make_body = lambda: body
+
+    print(f"{'clients':>7} {'requests':>8} {'ok':>5} {'503':>4} {'504':>4} {'errors':>6} {'closed':>6} "
+          f"{'ok/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    levels = []
+    for concurrency in args.concurrency:
+        level = run_level(args, concurrency, make_body, content_type)
+        levels.append(level)
+        print(f"{level['concurrency']:>7} {level['requests']:>8} {level['ok']:>5} {level['rejected']:>4} "
+              f"{level['timed_out']:>4} {level['errors']:>6} {level['connections_closed']:>6} "
+              f"{level['ok_per_second']:>8.2f} {level['p50_ms']:>9.1f} {level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "path": args.path, "source": path, "levels": levels}, f, indent=2)
+    if any(level["errors"] for level in levels):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
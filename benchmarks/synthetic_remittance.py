@@ -0,0 +1,254 @@
+"""
+Synthetic remittance markdown in the shape marker renders for our EOB PDFs.
+
+`generate_members` builds member/claim records in the `extract_tables` output
+shape and `render_markdown` lays them out as page blocks, so the parser can
+be exercised at any size without real PHI. The rendering covers the layouts
+the parser has to handle:
+
+- table_type 1 ("S T" and "Reason" columns) and 2 (merged "S T Reason")
+- member header rows on their own and member rows carrying the first claim
+  (patient name merged into the Mod, Qty or Amount Billed cell)
+- members split across page boundaries and closed on the next page
+- piped "Member Totals :" rows that carry the next member's name
+- "Medi-Cal <id>", bare and space-separated member ids
+"""
+import random
+from typing import Dict, List, Optional
+
+PROVIDER = "INSTITUTE ON AGING SOUTHERN CALIFORNIA LLC"
+CLAIM_FIELDS = [
+    "Claim #", "Line/Ver#", "Received Date", "Service From", "Service To",
+    "Proc", "Mod", "Qty", "Amount Billed", "Amount Allowed", "Not Covered",
+    "Copay/Coins", "Deduct Amount", "Withhold Amount", "Net Paid", "ST",
+    "Reason", "Interest", "Adjust"
+]
+LAST_NAMES = ["ABDELMALEK", "ABIR", "GARCIA", "NGUYEN", "O'BRIEN", "SMITH", "JOHNSON", "LEE", "MARTINEZ", "KIM", "PATEL", "BROWN"]
+FIRST_NAMES = ["MAGDA", "RON", "MARIA", "JOHN", "LINDA", "JAMES", "ROSA", "DAVID", "ANNA", "PAUL", "GRACE", "HENRY"]
+PROCS = ["G9012", "G9008", "T1019", "S5125", "99213", "T2022"]
+MODS = ["U8", "U2", "", "TT", "U1"]
+# An all-letter merged "S T Reason" cell such as "D MODRQF" reads as a patient
+# name to the parser, so every multi-code reason here contains a digit.
+STATUS_REASONS = [("P", "A1"), ("E", "A1 INCLD1"), ("D", "16 MODRQF"), ("P", ""), ("D", "N4")]
+
+
+def _date(rng: random.Random, year: int = 2025) -> str:
+    return f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{year}"
+
+
+def _money(value: float) -> str:
+    return f"{value:.2f}"
+
+
+def generate_members(
+    n_members: int,
+    min_claims: int = 1,
+    max_claims: int = 6,
+    seed: int = 0
+) -> List[Dict]:
+    rng = random.Random(seed)
+    members = []
+    claim_counter = 97770000
+    for i in range(n_members):
+        member_no = f"4000{rng.randint(0, 10**10 - 1):010d}"
+        id_style = rng.random()
+        if id_style < 0.3:
+            member_id = f"Medi-Cal {member_no}"
+        elif id_style < 0.4:
+            member_id = " ".join(member_no[j:j + 4] for j in range(0, len(member_no), 4))
+        else:
+            member_id = member_no
+        name = f"{rng.choice(LAST_NAMES)}, {rng.choice(FIRST_NAMES)}"
+        if rng.random() < 0.2:
+            name += f" {rng.choice('ABCDEFGHJKLMNPRSTW')}"
+
+        claims = []
+        for _ in range(rng.randint(min_claims, max_claims)):
+            claim_counter += rng.randint(1, 50)
+            service = _date(rng)
+            billed = rng.choice([40.0, 400.0, 125.5, 1200.0])
+            allowed = rng.choice([billed, 0.0, round(billed * 0.8, 2)])
+            st, reason = rng.choice(STATUS_REASONS)
+            claims.append({
+                "Claim #": f"00{claim_counter:08d}",
+                "Line/Ver#": f"00{rng.randint(1, 9)}00{rng.randint(1, 9)}",
+                "Received Date": _date(rng),
+                "Service From": service,
+                "Service To": service,
+                "Proc": rng.choice(PROCS),
+                "Mod": rng.choice(MODS),
+                "Qty": _money(rng.choice([1, 1, 2, 4])),
+                "Amount Billed": _money(billed),
+                "Amount Allowed": _money(allowed),
+                "Not Covered": _money(billed - allowed),
+                "Copay/Coins": "0.00",
+                "Deduct Amount": "0.00",
+                "Withhold Amount": "0.00",
+                "Net Paid": _money(allowed),
+                "ST": st,
+                "Reason": reason,
+                "Interest": "",
+                "Adjust": "",
+            })
+        members.append({
+            "Member #": member_id,
+            "Line of Business": "Medi-Cal",
+            "Patient Name": name,
+            "Provider Name": PROVIDER,
+            "claims": claims,
+        })
+    return members
+
+
+def _row(cells: List[str]) -> str:
+    return "| " + " | ".join(cells) + " |"
+
+
+def _header_lines(table_type: int, page_no: int) -> List[str]:
+    status_headers = ["S T", "Reason"] if table_type == 1 else ["S T Reason"]
+    claim_header = [
+        "Claim#", "Line/<br>Ver#", "Received<br>Date", "Service Period/Date<br>From", "To",
+        "Proc", "Mod", "Qty", "Amount<br>Billed", "Amount<br>Allowed", "Not<br>Covered",
+        "Copay/<br>Coins", "Deduct<br>Amount", "Withhold<br>Amount", "Net Paid",
+        *status_headers, "Interest", "Adjust"
+    ]
+    return [
+        f"**{PROVIDER}**",
+        "",
+        "EFT-000123456 Check No.: 0001234 Check Date: 03/01/2025",
+        "",
+        f"Remittance Advice Page No.: {page_no}",
+        "",
+        _row(["Member #", "Line of Business", "Patient Name", "Provider Name"]),
+        _row(claim_header),
+        "|" + "---|" * len(claim_header),
+    ]
+
+
+def _claim_cells(claim: Dict, table_type: int) -> List[str]:
+    cells = [claim[field] for field in CLAIM_FIELDS[:15]]
+    if table_type == 1:
+        cells += [claim["ST"], claim["Reason"]]
+    else:
+        cells.append(f"{claim['ST']} {claim['Reason']}".strip())
+    return cells + [claim["Interest"], claim["Adjust"]]
+
+
+def _member_claim_cells(member: Dict, claim: Dict, table_type: int, style: str, show_name: bool) -> List[str]:
+    """First claim rendered on the member row: id and claim number share a cell."""
+    cells = _claim_cells(claim, table_type)
+    member_no = member["Member #"]
+    cells[0] = f"{member_no} {claim['Claim #']}"
+    name = member["Patient Name"]
+    if style == "medi-cal-dates":
+        cells[3] = "Medi-Cal"
+        cells[4] = f"{claim['Service From']} {claim['Service To']}"
+    if show_name:
+        if style == "name-in-mod" and claim["Mod"]:
+            cells[6] = f"{name} {claim['Mod']}"
+        elif style == "name-in-billed":
+            cells[8] = f"{name} {claim['Amount Billed']}"
+        else:
+            cells[7] = f"{name} {claim['Qty']}"
+    return cells
+
+
+def _claim_totals(member_claims: List[Dict]) -> Dict[str, str]:
+    return {
+        field: _money(sum(float(c[field]) for c in member_claims))
+        for field in ("Amount Billed", "Amount Allowed", "Not Covered", "Net Paid")
+    }
+
+
+def render_markdown(
+    members: List[Dict],
+    table_type: int = 1,
+    rows_per_page: int = 40,
+    seed: int = 0,
+    combined_row_ratio: float = 0.3,
+    carried_name_ratio: float = 0.2,
+    allow_page_splits: bool = True
+) -> str:
+    """
+    Render members as marker-style markdown pages.
+
+    Members rendered with their first claim on the member row must have a bare
+    (all-digit) id; `Medi-Cal <id>` ids always get their own header row, which
+    is how marker lays those out.
+    """
+    rng = random.Random(seed)
+    pages: List[List[str]] = []
+    page: List[str] = []
+    rows_on_page = 0
+    next_name_from_totals: Optional[str] = None
+
+    def new_page():
+        nonlocal page, rows_on_page
+        if page:
+            pages.append(page)
+        page = _header_lines(table_type, len(pages) + 1)
+        rows_on_page = 0
+
+    def add_row(line: str):
+        nonlocal rows_on_page
+        page.append(line)
+        rows_on_page += 1
+
+    new_page()
+    for index, member in enumerate(members):
+        # Keep a member's header row and first claim together; split later claims.
+        if rows_on_page >= rows_per_page or (not allow_page_splits and rows_on_page + len(member["claims"]) + 2 > rows_per_page):
+            new_page()
+            # The parser only carries a totals-row name within a page block.
+            next_name_from_totals = None
+
+        name = member["Patient Name"]
+        name_was_carried = next_name_from_totals == name
+        member_no = member["Member #"]
+        claims = member["claims"]
+        combined = member_no.isdigit() and claims and rng.random() < combined_row_ratio
+
+        if combined:
+            style = rng.choice(["name-in-mod", "name-in-qty", "name-in-billed", "medi-cal-dates"])
+            add_row(_row(_member_claim_cells(member, claims[0], table_type, style, show_name=not name_was_carried)))
+            remaining = claims[1:]
+        else:
+            add_row(_row([member_no, "Medi-Cal", "" if name_was_carried else name, PROVIDER]))
+            remaining = claims
+
+        for claim in remaining:
+            if allow_page_splits and rows_on_page >= rows_per_page:
+                new_page()
+            add_row(_row(_claim_cells(claim, table_type)))
+
+        totals = _claim_totals(claims)
+        next_member = members[index + 1] if index + 1 < len(members) else None
+        carry = next_member is not None and rng.random() < carried_name_ratio
+        if carry:
+            add_row(_row([f"Member Totals : {next_member['Patient Name']}", "", "", "", "", "", "", "",
+                          totals["Amount Billed"], totals["Amount Allowed"], totals["Not Covered"],
+                          "0.00", "0.00", "0.00", totals["Net Paid"]]))
+            next_name_from_totals = next_member["Patient Name"]
+        else:
+            add_row("Member Totals :")
+            next_name_from_totals = None
+
+    pages.append(page)
+    return "\n\n".join("\n".join(lines) for lines in pages) + "\n"
+
+
+def generate_markdown(n_members: int, table_type: int = 1, seed: int = 0, **render_kwargs) -> str:
+    return render_markdown(generate_members(n_members, seed=seed), table_type=table_type, seed=seed, **render_kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic remittance markdown file")
+    parser.add_argument("output")
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--table-type", type=int, choices=[1, 2], default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(generate_markdown(args.members, table_type=args.table_type, seed=args.seed))
@@ -0,0 +1,475 @@
+"""
+Persistent, queryable index of every claim the service has extracted,
+deduplicated across pages and documents.
+
+    python claim_index.py claims.sqlite3 --add out/*.json
+    python claim_index.py claims.sqlite3 --member "Medi-Cal 40000105343100"
+    python claim_index.py claims.sqlite3 --filter proc=G9012 received_from=2025-01-01 --group-by month
+
+--add indexes result files of batch_extract.py (.json or .jsonl members)
+in one transaction, each under the SHA-256 of the file; --member prints the
+claims of a member across all indexed documents as JSON. --filter takes
+CLAIM_FILTERS as name=value and prints the first page of matching claims,
+or with --group-by the claim count and Net Paid per member or month.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from extract_tables import MEMBER_HEADERS, TARGET_CLAIM_HEADERS
+from claim_validation import NUMERIC_HEADERS, DATE_HEADERS, DATE_FORMAT, parse_amounts, parse_dates
+
+# A claim line is the same claim wherever it appears: a member split over
+# pages or a re-sent remittance repeats it under the same key. "Member #" is
+# normalized by `member_key`, so "Medi-Cal 4000 0195 2962 34" and
+# "40000195296234" match.
+CLAIM_KEY_FIELDS = ("Member #", "Claim #", "Line/Ver#", "Service From")
+_WHITESPACE_RE = re.compile(r"\s+")
+MEDI_CAL_PREFIX = "Medi-Cal"
+
+
+def _column(field: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", field.lower().replace("#", " no")).strip("_")
+
+
+# Table column of every member and claim field: "Claim #" -> claim_no, "Net Paid" -> net_paid
+MEMBER_COLUMNS = {field: _column(field) for field in MEMBER_HEADERS if field != "Member #"}
+CLAIM_COLUMNS = {field: _column(field) for field in TARGET_CLAIM_HEADERS}
+KEY_COLUMNS = [_column(field) for field in CLAIM_KEY_FIELDS]
+VALUE_FIELDS = [field for field in CLAIM_COLUMNS if _column(field) not in KEY_COLUMNS]
+VALUE_COLUMNS = list(MEMBER_COLUMNS.values()) + [CLAIM_COLUMNS[field] for field in VALUE_FIELDS]
+# Typed copies of the amount and date columns for range filters, sorting and
+# sums: "Net Paid" -> net_paid_value REAL, "Received Date" -> received_date_iso
+AMOUNT_COLUMNS = {field: CLAIM_COLUMNS[field] + "_value" for field in NUMERIC_HEADERS}
+DATE_COLUMNS = {field: CLAIM_COLUMNS[field] + "_iso" for field in DATE_HEADERS}
+TYPED_COLUMNS = list(AMOUNT_COLUMNS.values()) + list(DATE_COLUMNS.values())
+_POSITIONS = {column: i for i, column in enumerate(KEY_COLUMNS + VALUE_COLUMNS)}
+
+# Bumped whenever columns, indexes or key normalization change; older index files are migrated on open
+SCHEMA_VERSION = 3
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    document TEXT NOT NULL UNIQUE,
+    source TEXT,
+    indexed_at REAL NOT NULL,
+    members INTEGER NOT NULL,
+    claims INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{column} TEXT NOT NULL" for column in KEY_COLUMNS)},
+    {", ".join(f"{column} TEXT" for column in VALUE_COLUMNS)},
+    {", ".join(f"{column} REAL" for column in AMOUNT_COLUMNS.values())},
+    {", ".join(f"{column} TEXT" for column in DATE_COLUMNS.values())},
+    first_document INTEGER NOT NULL REFERENCES documents (id),
+    last_document INTEGER NOT NULL REFERENCES documents (id),
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    UNIQUE ({", ".join(KEY_COLUMNS)})
+);
+CREATE TABLE IF NOT EXISTS claim_documents (
+    claim_id INTEGER NOT NULL REFERENCES claims (id),
+    document_id INTEGER NOT NULL REFERENCES documents (id),
+    PRIMARY KEY (claim_id, document_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS claim_documents_document ON claim_documents (document_id)
+"""
+
+# Member lookups use the unique key, which starts with member_no. Patient
+# names are matched by case-insensitive prefix, which the NOCASE index
+# serves. The received date and procedure indexes carry what the Net Paid
+# totals per member and month read, so those never visit the table.
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS claims_patient_name ON claims (patient_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS claims_claim_no ON claims (claim_no);
+CREATE INDEX IF NOT EXISTS claims_received ON claims (received_date_iso, member_no, net_paid_value);
+CREATE INDEX IF NOT EXISTS claims_proc_mod ON claims (proc, mod, received_date_iso, member_no, net_paid_value)
+"""
+
+# Query string filters accepted by `ClaimIndex.query` and `ClaimIndex.summarize`
+CLAIM_FILTERS = ("member", "patient", "claim", "proc", "mod", "received_from", "received_to", "document")
+GROUP_BY = ("member", "month")
+MAX_PAGE_SIZE = 1000
+
+_KEY_ORDER = ", ".join(f"c.{column}" for column in KEY_COLUMNS)
+_KEY_MATCH = " AND ".join(f"{column} = ?" for column in KEY_COLUMNS)
+_UPSERT = (
+    f"INSERT INTO claims ({', '.join(KEY_COLUMNS + VALUE_COLUMNS + TYPED_COLUMNS)}, "
+    "first_document, last_document, first_seen, last_seen) "
+    f"VALUES ({', '.join('?' * (len(KEY_COLUMNS) + len(VALUE_COLUMNS) + len(TYPED_COLUMNS) + 4))}) "
+    f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET "
+    f"{', '.join(f'{column} = excluded.{column}' for column in VALUE_COLUMNS + TYPED_COLUMNS)}, "
+    "last_document = excluded.last_document, last_seen = excluded.last_seen "
+    # Indexing a document again leaves its claims as any later document left them
+    "WHERE claims.first_document != excluded.first_document"
+)
+
+
+class ClaimQueryError(ValueError):
+    """Raised for a claim query with an unknown or malformed filter, grouping or page size."""
+
+
+def member_key(member_no: Optional[str]) -> str:
+    """A member number as the index keys it: without whitespace and without the "Medi-Cal " prefix."""
+    compact = _WHITESPACE_RE.sub("", member_no or "")
+    return compact[len(MEDI_CAL_PREFIX):] if compact.startswith(MEDI_CAL_PREFIX) else compact
+
+
+def claim_key(member_no: str, claim: Dict) -> Tuple[str, ...]:
+    return (member_no,) + tuple((claim.get(field) or "").strip() for field in CLAIM_KEY_FIELDS[1:])
+
+
+def typed_values(rows: Sequence[Tuple]) -> List[Tuple]:
+    """
+    The TYPED_COLUMNS of claim rows laid out as KEY_COLUMNS + VALUE_COLUMNS,
+    parsed a column at a time with the claim_validation rules.
+    """
+    if not rows:
+        return []
+    columns = []
+    for field in AMOUNT_COLUMNS:
+        position = _POSITIONS[CLAIM_COLUMNS[field]]
+        amounts, _ = parse_amounts([row[position] for row in rows])
+        columns.append(np.where(np.isnan(amounts), None, amounts).tolist())
+    for field in DATE_COLUMNS:
+        position = _POSITIONS[CLAIM_COLUMNS[field]]
+        dates, _ = parse_dates([row[position] for row in rows])
+        columns.append(np.where(np.isnat(dates), None, np.datetime_as_string(dates, unit="D")).tolist())
+    return list(zip(*columns))
+
+
+def _iso_date(name: str, value: str) -> str:
+    for date_format in ("%Y-%m-%d", DATE_FORMAT):
+        try:
+            return datetime.strptime(value.strip(), date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ClaimQueryError(f"{name} must be a date as YYYY-MM-DD or MM/DD/YYYY, not {value!r}")
+
+
+def claim_filters(filters: Dict[str, str]) -> Tuple[List[str], List]:
+    """SQL conditions on `claims c` and their parameters for CLAIM_FILTERS given as name -> value."""
+    unknown = sorted(set(filters) - set(CLAIM_FILTERS))
+    if unknown:
+        raise ClaimQueryError(f"Unknown filter {', '.join(unknown)}; expected {', '.join(CLAIM_FILTERS)}")
+    where, params = [], []
+    if filters.get("member"):
+        where.append("c.member_no = ?")
+        params.append(member_key(filters["member"]))
+    if filters.get("patient"):
+        # A case-insensitive prefix, as a range the NOCASE index can serve (LIKE cannot on a BINARY column)
+        prefix = filters["patient"].strip()
+        where.append("c.patient_name COLLATE NOCASE >= ? AND c.patient_name COLLATE NOCASE < ?")
+        params.extend([prefix, prefix + "\U0010ffff"])
+    for name, column in (("claim", "claim_no"), ("proc", "proc"), ("mod", "mod")):
+        if filters.get(name):
+            where.append(f"c.{column} = ?")
+            params.append(filters[name].strip())
+    if filters.get("received_from"):
+        where.append("c.received_date_iso >= ?")
+        params.append(_iso_date("received_from", filters["received_from"]))
+    if filters.get("received_to"):
+        where.append("c.received_date_iso <= ?")
+        params.append(_iso_date("received_to", filters["received_to"]))
+    if filters.get("document"):
+        where.append("c.id IN (SELECT claim_id FROM claim_documents "
+                     "WHERE document_id = (SELECT id FROM documents WHERE document = ?))")
+        params.append(filters["document"].strip())
+    return where, params
+
+
+def _page_size(limit: int) -> int:
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ClaimQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+class ClaimIndex:
+    """
+    SQLite index of claims keyed on CLAIM_KEY_FIELDS, with a column per
+    member and claim field.
+
+    Adding a document upserts its claims: a claim seen before keeps one
+    row, takes the values of the latest document and gains that document in
+    `claim_documents`, so every claim records each document it came from.
+    `add_documents` writes a whole batch in one transaction. Amounts and
+    dates are also kept parsed, in the TYPED_COLUMNS, so `query` and
+    `summarize` filter, page and sum in SQL over indexes and take
+    milliseconds however many documents are indexed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db_lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            self._migrate()
+            self._db.executescript(_INDEXES)
+
+    def _migrate(self):
+        """Add the columns of later schema versions to an index file written by an earlier one."""
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version < 2:
+            existing = {row["name"] for row in self._db.execute("PRAGMA table_info(claims)")}
+            missing = [column for column in TYPED_COLUMNS if column not in existing]
+            for column in missing:
+                kind = "REAL" if column in AMOUNT_COLUMNS.values() else "TEXT"
+                self._db.execute(f"ALTER TABLE claims ADD COLUMN {column} {kind}")
+            if missing:
+                rows = self._db.execute(f"SELECT id, {', '.join(KEY_COLUMNS + VALUE_COLUMNS)} FROM claims").fetchall()
+                self._db.executemany(
+                    f"UPDATE claims SET {', '.join(f'{column} = ?' for column in TYPED_COLUMNS)} WHERE id = ?",
+                    [typed + (row[0],) for row, typed in zip(rows, typed_values([tuple(row)[1:] for row in rows]))]
+                )
+        if version < 3:
+            self._merge_member_numbers()
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _merge_member_numbers(self):
+        """Rekey claims stored under member numbers with whitespace, merging them into the same claim without it."""
+        members = [row[0] for row in self._db.execute("SELECT DISTINCT member_no FROM claims")]
+        for member_no in members:
+            normalized = member_key(member_no)
+            if normalized == member_no:
+                continue
+            for row in self._db.execute("SELECT * FROM claims WHERE member_no = ?", (member_no,)).fetchall():
+                key = (normalized,) + tuple(row[column] for column in KEY_COLUMNS[1:])
+                existing = self._db.execute(f"SELECT * FROM claims WHERE {_KEY_MATCH}", key).fetchone()
+                if existing is None:
+                    self._db.execute("UPDATE claims SET member_no = ? WHERE id = ?", (normalized, row["id"]))
+                    continue
+                # The same claim was also indexed without spaces: keep that row, with the values of whichever
+                # was seen last, the first sighting of either and every document of both
+                if row["last_seen"] > existing["last_seen"]:
+                    columns = VALUE_COLUMNS + TYPED_COLUMNS + ["last_document", "last_seen"]
+                    self._db.execute(
+                        f"UPDATE claims SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                        [row[column] for column in columns] + [existing["id"]]
+                    )
+                if row["first_seen"] < existing["first_seen"]:
+                    self._db.execute("UPDATE claims SET first_document = ?, first_seen = ? WHERE id = ?",
+                                     (row["first_document"], row["first_seen"], existing["id"]))
+                self._db.execute(
+                    "INSERT OR IGNORE INTO claim_documents (claim_id, document_id) "
+                    "SELECT ?, document_id FROM claim_documents WHERE claim_id = ?",
+                    (existing["id"], row["id"])
+                )
+                self._db.execute("DELETE FROM claim_documents WHERE claim_id = ?", (row["id"],))
+                self._db.execute("DELETE FROM claims WHERE id = ?", (row["id"],))
+
+    def add_document(self, document: str, members: List[Dict], source: Optional[str] = None) -> Dict[str, int]:
+        """Index the members of one document (e.g. the SHA-256 of its PDF); see `add_documents`."""
+        return self.add_documents([(document, members, source)])
+
+    def add_documents(self, documents: Iterable[Tuple[str, List[Dict], Optional[str]]]) -> Dict[str, int]:
+        """
+        Index (document, members, source) tuples in one transaction. Returns
+        the number of documents, claims read, claims new to the index and
+        duplicates collapsed (within the batch or with earlier documents).
+        """
+        counts = {"documents": 0, "claims": 0, "new_claims": 0, "duplicates": 0}
+        now = time.time()
+        with self._db_lock, self._db:
+            for document, members, source in documents:
+                rows = {}
+                read = 0
+                for member in members:
+                    member_no = member_key(member.get("Member #"))
+                    member_values = tuple(member.get(field) for field in MEMBER_COLUMNS)
+                    for claim in member.get("claims", []):
+                        key = claim_key(member_no, claim)
+                        rows[key] = key + member_values + tuple(claim.get(field) for field in VALUE_FIELDS)
+                        read += 1
+                values = list(rows.values())
+                document_id = self._db.execute(
+                    "INSERT INTO documents (document, source, indexed_at, members, claims) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (document) DO UPDATE SET source = COALESCE(excluded.source, source), "
+                    "indexed_at = excluded.indexed_at, members = excluded.members, claims = excluded.claims "
+                    "RETURNING id",
+                    (document, source, now, len(members), read)
+                ).fetchone()[0]
+
+                # Rowids only grow, so the claims new to the index are the ones above the current maximum
+                last_id = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM claims").fetchone()[0]
+                self._db.executemany(_UPSERT, [
+                    row + typed + (document_id, document_id, now, now) for row, typed in zip(values, typed_values(values))
+                ])
+                new = self._db.execute("SELECT COUNT(*) FROM claims WHERE id > ?", (last_id,)).fetchone()[0]
+                self._db.executemany(
+                    f"INSERT OR IGNORE INTO claim_documents (claim_id, document_id) "
+                    f"SELECT id, ? FROM claims WHERE {_KEY_MATCH}",
+                    [(document_id,) + key for key in rows]
+                )
+                counts["documents"] += 1
+                counts["claims"] += read
+                counts["new_claims"] += new
+                counts["duplicates"] += read - new
+        return counts
+
+    def _claim_rows(self, where: List[str], params: List, order_by: str):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT c.*, group_concat(d.document, char(10)) AS documents "
+                "FROM claims c "
+                "JOIN claim_documents cd ON cd.claim_id = c.id "
+                "JOIN documents d ON d.id = cd.document_id "
+                f"WHERE {' AND '.join(where)} "
+                "GROUP BY c.id "
+                f"ORDER BY {order_by}",
+                params
+            ).fetchall()
+
+    def claims_for_member(self, member_no: str) -> List[Dict]:
+        """Every claim of a member across all indexed documents, with the documents it appeared in."""
+        where, params = claim_filters({"member": member_no})
+        return [claim_record(row) for row in self._claim_rows(where, params, _KEY_ORDER)]
+
+    def claims_for_document(self, document: str) -> List[Dict]:
+        where, params = claim_filters({"document": document})
+        return [claim_record(row) for row in self._claim_rows(where, params, _KEY_ORDER)]
+
+    def query(self, filters: Dict[str, str], after: int = 0, limit: int = 100) -> Tuple[List[Dict], Optional[int]]:
+        """
+        A page of the claims matching `filters` (see CLAIM_FILTERS), in the
+        order they were first indexed. Returns the claims and the `after`
+        value of the next page, None on the last one. Pages are read from
+        where the previous one ended, so deep pages cost no more than the first.
+        """
+        limit = _page_size(limit)
+        where, params = claim_filters(filters)
+        # The page is picked from the indexes alone; only its claims are joined to their documents
+        page = (f"c.id IN (SELECT c.id FROM claims c WHERE {' AND '.join(where + ['c.id > ?'])} "
+                f"ORDER BY c.id LIMIT {limit + 1})")
+        rows = self._claim_rows([page], params + [after], "c.id")
+        next_after = rows[limit - 1]["id"] if len(rows) > limit else None
+        return [claim_record(row) for row in rows[:limit]], next_after
+
+    def summarize(self, group_by: str, filters: Dict[str, str], total: str = "net_paid",
+                  after: Optional[str] = None, limit: int = 100) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Claim count and sum of the amount column `total` (e.g. net_paid,
+        amount_billed) per member or per month of the received date, over
+        the claims matching `filters`, a page of groups at a time in group
+        order. Returns the groups and the `after` value of the next page.
+        """
+        limit = _page_size(limit)
+        if group_by not in GROUP_BY:
+            raise ClaimQueryError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        amount_columns = {column[:-len("_value")]: column for column in AMOUNT_COLUMNS.values()}
+        if total not in amount_columns:
+            raise ClaimQueryError(f"sum must be one of {', '.join(amount_columns)}")
+        where, params = claim_filters(filters)
+        amount = amount_columns[total]
+        if group_by == "member":
+            if after is not None:
+                where.append("c.member_no > ?")
+                params.append(after)
+            # In member_no order the groups come off the key's index and the scan stops after the page
+            sql = (f"SELECT c.member_no AS grp, COUNT(*) AS claims, SUM(c.{amount}) AS total "
+                   f"FROM claims c WHERE {' AND '.join(where) or '1'} GROUP BY grp")
+        else:
+            where.append("c.received_date_iso IS NOT NULL")
+            if after is not None:
+                # Every day of month `after` sorts below "<after>-99"
+                where.append("c.received_date_iso > ?")
+                params.append(after + "-99")
+            # Days come off the received date index in order; the few day groups are then summed by month
+            sql = (f"SELECT substr(day, 1, 7) AS grp, SUM(claims) AS claims, SUM(total) AS total FROM ("
+                   f"SELECT c.received_date_iso AS day, COUNT(*) AS claims, SUM(c.{amount}) AS total "
+                   f"FROM claims c WHERE {' AND '.join(where)} GROUP BY day) GROUP BY grp")
+        with self._db_lock:
+            rows = self._db.execute(f"{sql} ORDER BY grp LIMIT {limit + 1}", params).fetchall()
+        groups = [
+            {group_by: row["grp"], "claims": row["claims"], total: None if row["total"] is None else round(row["total"], 2)}
+            for row in rows[:limit]
+        ]
+        return groups, rows[limit - 1]["grp"] if len(rows) > limit else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._db_lock:
+            documents = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            claims = self._db.execute("SELECT COUNT(*) FROM claims").fetchone()[0]
+            occurrences = self._db.execute("SELECT COUNT(*) FROM claim_documents").fetchone()[0]
+            members = self._db.execute("SELECT COUNT(DISTINCT member_no) FROM claims").fetchone()[0]
+        return {"documents": documents, "members": members, "claims": claims, "claim_documents": occurrences}
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+
+
+def claim_record(row: sqlite3.Row) -> Dict:
+    """A claims row as the flattened row json_to_excel writes, plus the documents it came from."""
+    record = {"Member #": row["member_no"]}
+    record.update((field, row[column]) for field, column in MEMBER_COLUMNS.items())
+    record.update((field, row[column]) for field, column in CLAIM_COLUMNS.items() if row[column] is not None)
+    record["Documents"] = row["documents"].split("\n")
+    return record
+
+
+def read_members(path: str) -> List[Dict]:
+    """Members from a .json list or .jsonl file written by batch_extract.py."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("index", help="Index database path")
+    parser.add_argument("--add", nargs="+", default=[], metavar="FILE", help="Result files to index")
+    parser.add_argument("--member", help="Print the claims of this member")
+    parser.add_argument("--filter", nargs="+", default=[], metavar="NAME=VALUE", help="Print claims matching these filters")
+    parser.add_argument("--group-by", choices=list(GROUP_BY), help="Print totals per group of the filtered claims")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    index = ClaimIndex(args.index)
+    try:
+        if args.add:
+            start = time.perf_counter()
+            counts = index.add_documents((_file_sha256(path), read_members(path), path) for path in args.add)
+            print(json.dumps({**counts, "seconds": round(time.perf_counter() - start, 3)}))
+        if args.member:
+            print(json.dumps(index.claims_for_member(args.member), indent=2, ensure_ascii=False))
+        if args.filter or args.group_by:
+            filters = dict(item.split("=", 1) for item in args.filter)
+            if args.group_by:
+                result, _ = index.summarize(args.group_by, filters, limit=args.limit)
+            else:
+                result, _ = index.query(filters, limit=args.limit)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        if not args.add and not args.member and not args.filter and not args.group_by:
+            print(json.dumps(index.stats()))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import math
+from array import array
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from extract_tables import MEMBER_HEADERS, TARGET_CLAIM_HEADERS, NUMERIC_FINANCIAL_HEADERS
+
+TEXT_CLAIM_HEADERS = [h for h in TARGET_CLAIM_HEADERS if h not in NUMERIC_FINANCIAL_HEADERS]
+# Claim numbers are unique; every other text column repeats heavily across
+# claims (dates, codes, status) and is worth interning.
+UNIQUE_TEXT_HEADERS = {"Claim #"}
+
+_MEMBER_KEYS = tuple(MEMBER_HEADERS) + ("claims",)
+_CLAIM_KEYS = tuple(TARGET_CLAIM_HEADERS)
+
+
+def parse_amount(raw: str) -> float:
+    """Numeric value of a money cell, NaN when it is blank or not a finite number."""
+    if not raw:
+        return math.nan
+    try:
+        value = float(raw.replace(",", ""))
+    except ValueError:
+        return math.nan
+    return value if math.isfinite(value) else math.nan
+
+
+def format_amount(value: float) -> str:
+    return "" if value != value else f"{value:.2f}"
+
+
+class ClaimTable:
+    """
+    Column-oriented store for extracted members and their claims.
+
+    Member fields are kept once per member and claim fields as one column per
+    header instead of a 19-key dict per claim. The financial columns in
+    NUMERIC_FINANCIAL_HEADERS are `array('d')` of parsed amounts; the few cells
+    whose text is not the plain "%.2f" of their amount (blank cells are NaN)
+    keep their original text in a sparse per-column override, so `to_members()`
+    gives back exactly the JSON the parser produced.
+
+    Only records in the parser's output shape are accepted; `from_members`
+    raises ValueError for anything else.
+    """
+
+    def __init__(self):
+        self.member_columns: Dict[str, List[str]] = {h: [] for h in MEMBER_HEADERS}
+        self.claim_counts = array("l")
+        self.text_columns: Dict[str, List[str]] = {h: [] for h in TEXT_CLAIM_HEADERS}
+        self.amount_columns: Dict[str, array] = {h: array("d") for h in NUMERIC_FINANCIAL_HEADERS}
+        self.amount_text: Dict[str, Dict[int, str]] = {h: {} for h in NUMERIC_FINANCIAL_HEADERS}
+        self._interned: Dict[str, str] = {}
+
+    @classmethod
+    def from_members(cls, members: Iterable[Dict]) -> "ClaimTable":
+        """Build a table from member dicts, e.g. `extract_tables.iter_members(markdown)`."""
+        table = cls()
+        for member in members:
+            table.append_member(member)
+        return table
+
+    @property
+    def n_members(self) -> int:
+        return len(self.claim_counts)
+
+    @property
+    def n_claims(self) -> int:
+        return len(self.text_columns["Claim #"])
+
+    def _intern(self, value: str) -> str:
+        return self._interned.setdefault(value, value)
+
+    def append_member(self, member: Dict):
+        if not isinstance(member, dict) or tuple(member) != _MEMBER_KEYS or not isinstance(member["claims"], list):
+            raise ValueError("Member record is not in the extract_tables output shape")
+        claims = member["claims"]
+        for claim in claims:
+            if not isinstance(claim, dict) or tuple(claim) != _CLAIM_KEYS or \
+               not all(isinstance(claim[h], str) for h in NUMERIC_FINANCIAL_HEADERS):
+                raise ValueError(f"Claim of member {member.get('Member #')!r} is not in the extract_tables output shape")
+
+        for header in MEMBER_HEADERS:
+            self.member_columns[header].append(self._intern(member[header]))
+        row = self.n_claims
+        for claim in claims:
+            for header in TEXT_CLAIM_HEADERS:
+                value = claim[header]
+                self.text_columns[header].append(value if header in UNIQUE_TEXT_HEADERS else self._intern(value))
+            for header in NUMERIC_FINANCIAL_HEADERS:
+                raw = claim[header]
+                value = parse_amount(raw)
+                self.amount_columns[header].append(value)
+                if format_amount(value) != raw:
+                    self.amount_text[header][row] = raw
+            row += 1
+        self.claim_counts.append(len(claims))
+
+    def _amount_strings(self, header: str, start: int, stop: int) -> List[str]:
+        overrides = self.amount_text[header]
+        values = self.amount_columns[header][start:stop]
+        if not overrides:
+            return [format_amount(value) for value in values]
+        return [overrides[row] if row in overrides else format_amount(value) for row, value in enumerate(values, start)]
+
+    def _amount_text_column(self, header: str) -> np.ndarray:
+        # Amounts repeat a lot, so format each distinct value once.
+        values = np.frombuffer(self.amount_columns[header], dtype=np.float64)
+        distinct, inverse = np.unique(values, return_inverse=True)
+        column = np.array([format_amount(value) for value in distinct.tolist()], dtype=object)[inverse]
+        for row, raw in self.amount_text[header].items():
+            column[row] = raw
+        return column
+
+    def iter_members(self) -> Iterator[Dict]:
+        """Yield members in the original JSON shape, one at a time."""
+        row = 0
+        for index, count in enumerate(self.claim_counts):
+            stop = row + count
+            columns = {h: self.text_columns[h][row:stop] for h in TEXT_CLAIM_HEADERS}
+            columns.update({h: self._amount_strings(h, row, stop) for h in NUMERIC_FINANCIAL_HEADERS})
+            claims = [{h: columns[h][i] for h in TARGET_CLAIM_HEADERS} for i in range(count)]
+            member = {h: self.member_columns[h][index] for h in MEMBER_HEADERS}
+            member["claims"] = claims
+            yield member
+            row = stop
+
+    def to_members(self) -> List[Dict]:
+        return list(self.iter_members())
+
+    def to_dataframe(self, numeric: bool = True) -> pd.DataFrame:
+        """
+        One row per claim (members without claims get one row of member
+        fields), laid out like `pd.DataFrame(flatten_records(members))`.
+
+        With `numeric` the financial columns are float64 (NaN where blank or
+        not a number); otherwise they hold the original text, which is what
+        the Excel export writes.
+        """
+        if not self.n_members:
+            return pd.DataFrame()
+        counts = np.frombuffer(self.claim_counts, dtype=self.claim_counts.typecode)
+        rows_per_member = np.maximum(counts, 1)
+
+        data = {}
+        for header in MEMBER_HEADERS:
+            values = self.member_columns[header]
+            if header == "Member #":
+                values = [v.replace("Medi-Cal ", "").strip() if isinstance(v, str) and v.startswith("Medi-Cal ") else v
+                          for v in values]
+            data[header] = np.repeat(np.array(values, dtype=object), rows_per_member)
+
+        if self.n_claims:
+            # Rows of members without claims have no claim fields at all.
+            claim_rows = None
+            if (counts == 0).any():
+                claim_rows = np.flatnonzero(np.repeat(counts > 0, rows_per_member))
+            total_rows = int(rows_per_member.sum())
+
+            def place(values, dtype):
+                column = np.array(values, dtype=dtype)
+                if claim_rows is None:
+                    return column
+                padded = np.full(total_rows, np.nan, dtype=dtype)
+                padded[claim_rows] = column
+                return padded
+
+            for header in TARGET_CLAIM_HEADERS:
+                if header in self.text_columns:
+                    data[header] = place(self.text_columns[header], object)
+                elif numeric:
+                    data[header] = place(np.frombuffer(self.amount_columns[header], dtype=np.float64), np.float64)
+                else:
+                    data[header] = place(self._amount_text_column(header), object)
+        return pd.DataFrame(data)
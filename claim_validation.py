@@ -0,0 +1,173 @@
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from extract_tables import NUMERIC_FINANCIAL_HEADERS, MEMBER_TOTALS_KEY, without_member_totals
+from json_to_excel import members_to_dataframe
+
+# Claim columns converted to float64 and to datetime64
+NUMERIC_HEADERS = NUMERIC_FINANCIAL_HEADERS + ["Qty"]
+DATE_HEADERS = ["Received Date", "Service From", "Service To"]
+DATE_FORMAT = "%m/%d/%Y"
+# Amounts are printed to the cent, so anything closer than half a cent agrees
+TOLERANCE = 0.005
+
+# Columns added by validate_claim_frame
+UNPARSED_FIELDS = "Unparsed Fields"
+ALLOWED_EXCEEDS_BILLED = "Allowed Exceeds Billed"
+PAID_EXCEEDS_ALLOWED = "Net Paid Exceeds Allowed"
+TOTALS_CHECKED = "Member Totals Checked"
+TOTALS_MISMATCH = "Member Totals Mismatch"
+TOTALS_MISMATCH_FIELDS = "Member Totals Mismatch Fields"
+FLAG_COLUMNS = [ALLOWED_EXCEEDS_BILLED, PAID_EXCEEDS_ALLOWED, TOTALS_MISMATCH]
+
+# "(1,234.50)", "-$5.00", "$5.00-" and the like; plain numbers never get here
+_AMOUNT_PATTERN = r"^(?P<open>\()?(?P<minus>-)?\$?(?P<minus_after_sign>-)?(?P<number>\d[\d,]*(?:\.\d*)?|\.\d+)(?P<trailing_minus>-)?(?P<close>\))?$"
+_NEGATIVE_GROUPS = ["open", "minus", "minus_after_sign", "trailing_minus"]
+
+
+def parse_amounts(values: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse money text into float64: plain and negative numbers, thousands
+    separators, a "$" sign, trailing minus and parentheses for negatives.
+    Returns (amounts, unparsed): blank cells are NaN, and `unparsed` marks
+    the non-blank ones that are not an amount.
+
+    Amount columns repeat heavily, so every distinct text is parsed once:
+    all of them in one `pd.to_numeric` call, then only the few that are not
+    plain numbers with a regex.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    if not len(uniques):
+        return np.full(len(codes), np.nan), np.zeros(len(codes), dtype=bool)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    parsed = pd.to_numeric(text, errors="coerce").to_numpy(dtype=np.float64)
+    parsed[~np.isfinite(parsed)] = np.nan
+    blank = (text == "").to_numpy()
+
+    rest = np.flatnonzero(np.isnan(parsed) & ~blank)
+    if len(rest):
+        parts = text.iloc[rest].str.extract(_AMOUNT_PATTERN)
+        balanced = parts["open"].isna().to_numpy() == parts["close"].isna().to_numpy()
+        number = pd.to_numeric(parts["number"].str.replace(",", "", regex=False), errors="coerce").to_numpy(dtype=np.float64)
+        sign = np.where(parts[_NEGATIVE_GROUPS].notna().any(axis=1).to_numpy(), -1.0, 1.0)
+        parsed[rest] = np.where(balanced, number * sign, np.nan)
+
+    unparsed = np.isnan(parsed) & ~blank
+    missing = codes < 0
+    amounts = parsed[codes]
+    amounts[missing] = np.nan
+    return amounts, unparsed[codes] & ~missing
+
+
+def parse_dates(values: Iterable, date_format: str = DATE_FORMAT) -> Tuple[np.ndarray, np.ndarray]:
+    """(datetime64[ns] array with NaT for blanks, unparsed mask), parsing each distinct text once."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    if not len(uniques):
+        return np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]"), np.zeros(len(codes), dtype=bool)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    parsed = pd.to_datetime(text, format=date_format, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    unparsed = np.isnat(parsed) & (text != "").to_numpy()
+    missing = codes < 0
+    dates = parsed[codes]
+    dates[missing] = np.datetime64("NaT")
+    return dates, unparsed[codes] & ~missing
+
+
+def _append_names(labels: np.ndarray, mask: np.ndarray, name: str) -> np.ndarray:
+    return np.where(mask, labels + (name + ", "), labels)
+
+
+def validate_claim_frame(
+    frame: pd.DataFrame,
+    member_index: np.ndarray,
+    member_totals: Sequence[Optional[Dict[str, str]]],
+    tolerance: float = TOLERANCE
+) -> pd.DataFrame:
+    """
+    Convert the text claim columns of `frame` (as `members_to_dataframe`
+    builds it) in place to typed columns and add the check columns.
+
+    `member_index` gives the member of every row and `member_totals` the
+    captured "Member Totals :" amounts of every member (None when there were
+    none). Amount comparisons use absolute values, so reversal lines with
+    all-negative amounts are checked the same way.
+    """
+    n_rows = len(frame)
+    unparsed_fields = np.full(n_rows, "", dtype=object)
+    for header in NUMERIC_HEADERS:
+        if header in frame:
+            frame[header], unparsed = parse_amounts(frame[header])
+            unparsed_fields = _append_names(unparsed_fields, unparsed, header)
+    for header in DATE_HEADERS:
+        if header in frame:
+            frame[header], unparsed = parse_dates(frame[header])
+            unparsed_fields = _append_names(unparsed_fields, unparsed, header)
+    frame[UNPARSED_FIELDS] = pd.Series(unparsed_fields, index=frame.index, dtype=object).str.rstrip(", ")
+
+    def amounts(header):
+        if header not in frame:
+            return np.full(n_rows, np.nan)
+        return np.abs(frame[header].to_numpy(dtype=np.float64))
+
+    billed, allowed, paid = amounts("Amount Billed"), amounts("Amount Allowed"), amounts("Net Paid")
+    # NaN compares as False, so a missing amount is never flagged
+    frame[ALLOWED_EXCEEDS_BILLED] = allowed - billed > tolerance
+    frame[PAID_EXCEEDS_ALLOWED] = paid - allowed > tolerance
+
+    n_members = len(member_totals)
+    checked = np.zeros(n_members, dtype=bool)
+    mismatch = np.zeros(n_members, dtype=bool)
+    mismatch_fields = np.full(n_members, "", dtype=object)
+    for header in NUMERIC_FINANCIAL_HEADERS:
+        totals, _ = parse_amounts([t.get(header, "") if t else "" for t in member_totals])
+        has_total = ~np.isnan(totals)
+        if not has_total.any():
+            continue
+        column = frame[header].to_numpy(dtype=np.float64) if header in frame else np.zeros(n_rows)
+        sums = np.bincount(member_index, weights=np.nan_to_num(column), minlength=n_members)
+        differs = has_total & (np.abs(sums - np.nan_to_num(totals)) > tolerance)
+        checked |= has_total
+        mismatch |= differs
+        mismatch_fields = _append_names(mismatch_fields, differs, header)
+    frame[TOTALS_CHECKED] = checked[member_index]
+    frame[TOTALS_MISMATCH] = mismatch[member_index]
+    frame[TOTALS_MISMATCH_FIELDS] = pd.Series(mismatch_fields[member_index], index=frame.index, dtype=object).str.rstrip(", ")
+    return frame
+
+
+def validate_members(members: Iterable[Dict], tolerance: float = TOLERANCE) -> pd.DataFrame:
+    """
+    One row per claim like `members_to_dataframe`, with typed amount, quantity
+    and date columns and the check columns of `validate_claim_frame`. Member
+    totals are only checked for members parsed with `capture_totals`.
+    """
+    members = list(members)
+    if not members:
+        return pd.DataFrame()
+    frame = members_to_dataframe(without_member_totals(members), verbose=False)
+    rows_per_member = np.array([max(len(m.get("claims") or []), 1) for m in members])
+    if frame is None or len(frame) != rows_per_member.sum():
+        raise ValueError("Members are not in the extract_tables output shape")
+    member_index = np.repeat(np.arange(len(members)), rows_per_member)
+    return validate_claim_frame(frame, member_index, [m.get(MEMBER_TOTALS_KEY) for m in members], tolerance)
+
+
+def validation_summary(frame: pd.DataFrame) -> Dict[str, int]:
+    """Row counts of every check column of a validated frame."""
+    if frame.empty:
+        return {"rows": 0}
+    summary = {"rows": len(frame), "rows_with_unparsed_fields": int((frame[UNPARSED_FIELDS] != "").sum())}
+    for column in FLAG_COLUMNS + [TOTALS_CHECKED]:
+        summary[column] = int(frame[column].sum())
+    return summary
+
+
+def validated_workbook(members: List[Dict]) -> bytes:
+    """Excel workbook of `validate_members` with real numbers and dates."""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl", date_format="MM/DD/YYYY", datetime_format="MM/DD/YYYY") as writer:
+        validate_members(members).to_excel(writer, index=False)
+    return buffer.getvalue()
@@ -0,0 +1,288 @@
+import os
+import math
+import itertools
+import multiprocessing
+import queue
+import logging
+import time
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Set in the parent right before forking so every converter process inherits
+# the already-loaded marker/surya weights copy-on-write instead of loading its own.
+_shared_artifact_dict = None
+
+
+def _worker_main(task_queue, result_queue, converter_config, threads_per_process, warmup_pdf=None):
+    from marker.converters.pdf import PdfConverter
+    from marker.output import text_from_rendered
+
+    if threads_per_process:
+        try:
+            import torch
+            torch.set_num_threads(threads_per_process)
+        except ImportError:
+            pass
+
+    pid = os.getpid()
+    default_converter = None
+    status = "ready"
+    if warmup_pdf:
+        # Pay for the first inference (lazy kernel and allocator setup) before taking real work
+        try:
+            default_converter = PdfConverter(artifact_dict=_shared_artifact_dict, config=dict(converter_config))
+            text_from_rendered(default_converter(warmup_pdf))
+        except Exception:
+            logger.exception("Warm-up conversion of %s failed", warmup_pdf)
+            status = "warmup_failed"
+    result_queue.put((status, None, pid))
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, pdf_path, page_range, expires_at = task
+        if expires_at is not None and time.time() >= expires_at:
+            # Whoever submitted it has stopped waiting; don't spend the CPU on it
+            result_queue.put(("expired", task_id, None))
+            continue
+        result_queue.put(("started", task_id, pid))
+        try:
+            if page_range:
+                config = dict(converter_config, page_range=list(page_range))
+                converter = PdfConverter(artifact_dict=_shared_artifact_dict, config=config)
+            else:
+                if default_converter is None:
+                    default_converter = PdfConverter(artifact_dict=_shared_artifact_dict, config=dict(converter_config))
+                converter = default_converter
+            rendered = converter(pdf_path)
+            text, _, _ = text_from_rendered(rendered)
+            result_queue.put(("done", task_id, text))
+        except Exception as e:
+            logger.exception("Conversion of task %s failed", task_id)
+            result_queue.put(("error", task_id, f"{type(e).__name__}: {e}"))
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    import pypdfium2
+
+    doc = pypdfium2.PdfDocument(pdf_path)
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def split_page_ranges(page_count: int, chunk_pages: int) -> List[List[int]]:
+    chunk_pages = max(1, chunk_pages)
+    return [list(range(start, min(start + chunk_pages, page_count))) for start in range(0, page_count, chunk_pages)]
+
+
+class ConverterPoolError(Exception):
+    """Raised for conversions that failed inside, or were lost with, a converter process."""
+
+
+class ConverterPool:
+    """
+    A fixed set of forked converter processes sharing one loaded model set.
+
+    Tasks go onto a single shared queue, so whichever process is idle picks up
+    the next PDF. A dispatcher thread in the parent routes results back to the
+    `Future` returned by `submit` and replaces processes that die mid-task.
+    With a `warmup_pdf` every process converts it once before taking tasks;
+    `wait_ready` blocks until all of the first processes have done so.
+    """
+
+    def __init__(
+        self,
+        artifact_dict: Dict[str, Any],
+        processes: int,
+        threads_per_process: Optional[int] = None,
+        converter_config: Optional[Dict[str, Any]] = None,
+        warmup_pdf: Optional[str] = None
+    ):
+        self.artifact_dict = artifact_dict
+        self.processes = max(1, processes)
+        if threads_per_process is None:
+            threads_per_process = max(1, (os.cpu_count() or 1) // self.processes)
+        self.threads_per_process = threads_per_process
+        # pdftext spawns its own workers per conversion; one per process is enough here.
+        self.converter_config = {"pdftext_workers": 1, **(converter_config or {})}
+        self.warmup_pdf = os.path.abspath(warmup_pdf) if warmup_pdf else None
+
+        self._ctx = multiprocessing.get_context("fork")
+        self._task_queue = None
+        self._result_queue = None
+        self._workers: List[multiprocessing.Process] = []
+        self._futures: Dict[int, Future] = {}
+        self._running_on: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._dispatcher = None
+        self._closed = False
+        self._ready_pids = set()
+        self._ready = threading.Event()
+        self.warmup_error = None
+
+    def start(self):
+        global _shared_artifact_dict
+        if self._dispatcher is not None:
+            return self
+        _shared_artifact_dict = self.artifact_dict
+        self._task_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        for _ in range(self.processes):
+            self._spawn_worker()
+        self._dispatcher = threading.Thread(target=self._dispatch_results, name="converter-pool-dispatcher", daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def _spawn_worker(self):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._task_queue, self._result_queue, self.converter_config, self.threads_per_process, self.warmup_pdf),
+            daemon=True
+        )
+        process.start()
+        self._workers.append(process)
+
+    def worker_pids(self) -> List[int]:
+        return [p.pid for p in self._workers if p.is_alive()]
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every process started by `start` has warmed up. Raises
+        ConverterPoolError when a warm-up conversion failed.
+        """
+        ready = self._ready.wait(timeout)
+        if self.warmup_error:
+            raise ConverterPoolError(self.warmup_error)
+        return ready
+
+    def submit(self, pdf_path: str, page_range: Optional[List[int]] = None, expires_at: Optional[float] = None) -> Future:
+        """
+        Queue a conversion. A task still queued at `expires_at` (a time.time()
+        value) is skipped by the process that takes it, failing its future.
+        """
+        if self._dispatcher is None or self._closed:
+            raise ConverterPoolError("Converter pool is not running")
+        future = Future()
+        task_id = next(self._ids)
+        with self._lock:
+            self._futures[task_id] = future
+        self._task_queue.put((task_id, os.path.abspath(pdf_path), list(page_range) if page_range else None, expires_at))
+        return future
+
+    def convert(self, pdf_path: str, page_range: Optional[List[int]] = None, timeout: Optional[float] = None) -> str:
+        """
+        Convert a PDF in one of the pool's processes and return its markdown.
+        Raises concurrent.futures.TimeoutError after `timeout` seconds; a
+        conversion that has not started by then is dropped from the queue.
+        """
+        expires_at = None if timeout is None else time.time() + timeout
+        future = self.submit(pdf_path, page_range, expires_at)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def convert_pages(self, pdf_path: str, chunk_pages: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """
+        Convert a PDF as page ranges spread over the pool and return the
+        markdown stitched back together in page order.
+
+        By default the pages are split evenly across the processes. Each
+        remittance page starts with its own provider header, so the stitched
+        markdown splits into the same table blocks as a whole-document
+        conversion and extract_tables still carries members across pages.
+        """
+        page_count = count_pdf_pages(pdf_path)
+        if chunk_pages is None:
+            chunk_pages = math.ceil(page_count / self.processes)
+        page_ranges = split_page_ranges(page_count, chunk_pages)
+        if len(page_ranges) <= 1:
+            return self.convert(pdf_path, timeout=timeout)
+
+        expires_at = None if timeout is None else time.time() + timeout
+        futures = [self.submit(pdf_path, page_range, expires_at) for page_range in page_ranges]
+        try:
+            return "\n\n".join(
+                f.result(timeout=None if expires_at is None else max(0.0, expires_at - time.time()))
+                for f in futures
+            )
+        finally:
+            for f in futures:
+                f.cancel()
+
+    def _dispatch_results(self):
+        while not self._closed:
+            try:
+                kind, task_id, payload = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                self._reap_dead_workers()
+                continue
+
+            if kind in ("ready", "warmup_failed"):
+                self._worker_ready(kind, payload)
+                continue
+            with self._lock:
+                if kind == "started":
+                    self._running_on[task_id] = payload
+                    continue
+                self._running_on.pop(task_id, None)
+                future = self._futures.pop(task_id, None)
+            if future is None or future.cancelled():
+                continue
+            if kind == "done":
+                future.set_result(payload)
+            elif kind == "expired":
+                future.set_exception(ConverterPoolError(f"Task {task_id} expired before a converter process took it"))
+            else:
+                future.set_exception(ConverterPoolError(payload))
+
+    def _worker_ready(self, kind: str, pid: int):
+        if kind == "warmup_failed":
+            self.warmup_error = f"Warm-up conversion of {self.warmup_pdf} failed in converter process {pid}"
+            self._ready.set()
+            return
+        self._ready_pids.add(pid)
+        if len(self._ready_pids) >= self.processes:
+            self._ready.set()
+
+    def _reap_dead_workers(self):
+        dead = [p for p in self._workers if not p.is_alive()]
+        if not dead or self._closed:
+            return
+        dead_pids = {p.pid for p in dead}
+        with self._lock:
+            lost = [task_id for task_id, pid in self._running_on.items() if pid in dead_pids]
+            lost_futures = [(task_id, self._futures.pop(task_id, None)) for task_id in lost]
+            for task_id in lost:
+                self._running_on.pop(task_id, None)
+        for p in dead:
+            logger.error("Converter process %d exited with code %s; starting a replacement", p.pid, p.exitcode)
+            self._workers.remove(p)
+            self._spawn_worker()
+        for task_id, future in lost_futures:
+            if future is not None and not future.cancelled():
+                future.set_exception(ConverterPoolError(f"Converter process died while handling task {task_id}"))
+
+    def close(self, timeout: float = 10.0):
+        if self._dispatcher is None or self._closed:
+            return
+        for _ in self._workers:
+            self._task_queue.put(None)
+        for p in self._workers:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._closed = True
+        with self._lock:
+            pending = list(self._futures.values())
+            self._futures.clear()
+        for future in pending:
+            if not future.cancelled():
+                future.set_exception(ConverterPoolError("Converter pool was closed"))
@@ -0,0 +1,320 @@
+import os
+import re
+import time
+import queue
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from converter_pool import count_pdf_pages
+from metrics import CONVERTER_BATCH_DOCUMENTS, CONVERTER_BATCH_PAGES
+
+logger = logging.getLogger(__name__)
+
+# marker's paginate_output puts "{page_id}" followed by 48 dashes, on a paragraph of its own, before every page
+PAGE_SEPARATOR_RE = re.compile(r"(?:^|\n\n)\{(\d+)\}-{48}\n\n")
+
+
+class ConverterServiceError(Exception):
+    """Raised for conversions that failed or expired in the converter service."""
+
+
+def merge_pdfs(pdf_paths: List[str], output_path: str) -> List[int]:
+    """Write the pages of `pdf_paths` into one PDF, in order, and return each document's page count."""
+    import pypdfium2
+
+    merged = pypdfium2.PdfDocument.new()
+    page_counts = []
+    try:
+        for pdf_path in pdf_paths:
+            source = pypdfium2.PdfDocument(pdf_path)
+            try:
+                before = len(merged)
+                merged.import_pages(source)
+                page_counts.append(len(merged) - before)
+            finally:
+                source.close()
+        merged.save(output_path)
+    finally:
+        merged.close()
+    return page_counts
+
+
+def extract_pages(pdf_path: str, page_indexes: List[int], output_dir: str) -> List[str]:
+    """Write each of the given pages of `pdf_path` to a one-page PDF in `output_dir` and return their paths."""
+    import pypdfium2
+
+    source = pypdfium2.PdfDocument(pdf_path)
+    paths = []
+    try:
+        for index in page_indexes:
+            page_pdf = pypdfium2.PdfDocument.new()
+            try:
+                page_pdf.import_pages(source, pages=[index])
+                path = os.path.join(output_dir, f"page_{index:05d}.pdf")
+                page_pdf.save(path)
+            finally:
+                page_pdf.close()
+            paths.append(path)
+    finally:
+        source.close()
+    return paths
+
+
+def split_paginated_markdown(markdown: str, page_count: int) -> Optional[List[str]]:
+    """
+    Split paginate_output markdown into the text of each page, or return
+    None unless it has exactly the separators of pages 0..page_count-1.
+    """
+    parts = PAGE_SEPARATOR_RE.split(markdown)
+    page_ids = [int(page_id) for page_id in parts[1::2]]
+    if parts[0].strip() or page_ids != list(range(page_count)):
+        return None
+    return parts[2::2]
+
+
+def marker_convert_function(artifact_dict: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Callable[[str], str]:
+    """A PdfConverter over the loaded models, wrapped to return the rendered markdown."""
+    from marker.converters.pdf import PdfConverter
+    from marker.output import text_from_rendered
+
+    converter = PdfConverter(artifact_dict=artifact_dict, config=dict(config or {}))
+
+    def convert(pdf_path: str) -> str:
+        text, _, _ = text_from_rendered(converter(pdf_path))
+        return text
+    return convert
+
+
+class _Request:
+    __slots__ = ("pdf_path", "pages", "expires_at", "future")
+
+    def __init__(self, pdf_path: str, pages: int, expires_at: Optional[float]):
+        self.pdf_path = pdf_path
+        self.pages = pages
+        self.expires_at = expires_at
+        self.future = Future()
+
+
+class ConverterService:
+    """
+    Owns the in-process marker converter. Every conversion runs on the
+    service's one thread, so PdfConverter is never entered from two request
+    threads at once.
+
+    With `max_batch_pages`, documents submitted while the thread is busy or
+    within `max_wait_seconds` of each other are converted together: their
+    pages are merged into one PDF of at most `max_batch_pages` pages and
+    converted once with paginate_output, and the markdown is split back per
+    document at the page separators. marker runs its layout, OCR and table
+    models over the pages in batches, so one call over many small documents
+    costs much less than a call per document. If a batch fails, or its
+    output does not split into the expected pages, its documents are
+    converted one at a time instead.
+
+    marker's document-level processors (header and footer removal, heading
+    levels) still run over the whole merged PDF, so a document's markdown
+    can depend on the others in its batch. With `verify_every`, every Nth
+    batch is also converted one document at a time and the requests get
+    that markdown; the first document whose batched markdown differs turns
+    batching off for the rest of the service's life.
+    """
+
+    def __init__(
+        self,
+        artifact_dict: Dict[str, Any],
+        converter_config: Optional[Dict[str, Any]] = None,
+        max_batch_pages: int = 0,
+        max_wait_seconds: float = 0.05,
+        verify_every: int = 0,
+        convert_function: Callable[..., Callable[[str], str]] = marker_convert_function
+    ):
+        self.artifact_dict = artifact_dict
+        self.converter_config = dict(converter_config or {})
+        self.max_batch_pages = max(0, max_batch_pages)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self.verify_every = max(0, verify_every)
+        self._convert_function = convert_function
+        self._converters: Dict[bool, Callable[[str], str]] = {}
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._carried: Optional[_Request] = None
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._counts = {"documents": 0, "batches": 0, "batched_documents": 0, "fallbacks": 0, "expired": 0,
+                        "verified_batches": 0, "verify_mismatches": 0}
+
+    def start(self) -> "ConverterService":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="converter-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, pdf_path: str, expires_at: Optional[float] = None) -> Future:
+        """
+        Queue a conversion. A request still queued at `expires_at` (a
+        time.time() value) is skipped, failing its future.
+        """
+        if self._thread is None or self._closed:
+            raise ConverterServiceError("Converter service is not running")
+        pages = count_pdf_pages(pdf_path) if self.max_batch_pages else 0
+        request = _Request(os.path.abspath(pdf_path), pages, expires_at)
+        self._queue.put(request)
+        return request.future
+
+    def convert(self, pdf_path: str, timeout: Optional[float] = None) -> str:
+        """
+        Convert a PDF on the service thread and return its markdown. Raises
+        concurrent.futures.TimeoutError after `timeout` seconds; a conversion
+        that has not started by then is skipped.
+        """
+        expires_at = None if timeout is None else time.time() + timeout
+        future = self.submit(pdf_path, expires_at)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def close(self, timeout: float = 10.0):
+        if self._thread is None or self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch_pages": self.max_batch_pages,
+                "max_wait_seconds": self.max_wait_seconds,
+                "verify_every": self.verify_every,
+                "queued": self._queue.qsize(),
+                **self._counts,
+            }
+
+    def _count(self, **items: int):
+        with self._lock:
+            for name, value in items.items():
+                self._counts[name] += value
+
+    def _converter(self, paginate: bool) -> Callable[[str], str]:
+        converter = self._converters.get(paginate)
+        if converter is None:
+            config = dict(self.converter_config, paginate_output=True) if paginate else self.converter_config
+            converter = self._converters[paginate] = self._convert_function(self.artifact_dict, config)
+        return converter
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Cancelled and expired requests are dropped before any work is done for them
+            now = time.time()
+            live = []
+            for request in batch:
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                if request.expires_at is not None and now >= request.expires_at:
+                    self._count(expired=1)
+                    request.future.set_exception(ConverterServiceError("Conversion expired before it started"))
+                    continue
+                live.append(request)
+            if len(live) == 1:
+                self._convert_one(live[0])
+            elif live:
+                self._convert_batch(live)
+
+    def _next_batch(self) -> Optional[List[_Request]]:
+        """Block for the next request, then gather more until the batch is full or the wait is over."""
+        first, self._carried = self._carried, None
+        if first is None:
+            first = self._queue.get()
+            if first is None:
+                return None
+        batch = [first]
+        if not self.max_batch_pages or first.pages >= self.max_batch_pages:
+            return batch
+        pages = first.pages
+        wait_until = time.monotonic() + self.max_wait_seconds
+        while pages < self.max_batch_pages:
+            remaining = wait_until - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            if pages + request.pages > self.max_batch_pages:
+                self._carried = request
+                break
+            batch.append(request)
+            pages += request.pages
+        return batch
+
+    def _convert_one(self, request: _Request):
+        self._count(documents=1)
+        try:
+            request.future.set_result(self._converter(paginate=False)(request.pdf_path))
+        except Exception as e:
+            logger.exception("Conversion of %s failed", request.pdf_path)
+            request.future.set_exception(e)
+
+    def _convert_batch(self, batch: List[_Request]):
+        try:
+            with tempfile.TemporaryDirectory(prefix="converter_batch_") as batch_dir:
+                merged_path = os.path.join(batch_dir, "batch.pdf")
+                page_counts = merge_pdfs([request.pdf_path for request in batch], merged_path)
+                pages = split_paginated_markdown(self._converter(paginate=True)(merged_path), sum(page_counts))
+            if pages is None:
+                logger.warning("Batch of %d documents did not split back into its pages; converting them one at a time",
+                               len(batch))
+        except Exception:
+            logger.exception("Batch conversion of %d documents failed; converting them one at a time", len(batch))
+            pages = None
+        if pages is None:
+            self._count(fallbacks=1)
+            for request in batch:
+                self._convert_one(request)
+            return
+
+        CONVERTER_BATCH_DOCUMENTS.observe(len(batch))
+        CONVERTER_BATCH_PAGES.observe(len(pages))
+        self._count(documents=len(batch), batches=1, batched_documents=len(batch))
+        batched = []
+        start = 0
+        for page_count in page_counts:
+            batched.append("\n\n".join(pages[start:start + page_count]))
+            start += page_count
+        if self.verify_every and (self._counts["batches"] - 1) % self.verify_every == 0:
+            self._verify_batch(batch, batched)
+            return
+        for request, markdown in zip(batch, batched):
+            request.future.set_result(markdown)
+
+    def _verify_batch(self, batch: List[_Request], batched: List[str]):
+        """Convert the documents of a batch one at a time, answer with that and compare it to `batched`."""
+        self._count(verified_batches=1)
+        single = self._converter(paginate=False)
+        mismatches = 0
+        for request, markdown in zip(batch, batched):
+            try:
+                expected = single(request.pdf_path)
+            except Exception as e:
+                logger.exception("Conversion of %s failed", request.pdf_path)
+                request.future.set_exception(e)
+                continue
+            if expected.strip() != markdown.strip():
+                mismatches += 1
+                logger.warning("Batched markdown of %s differs from converting it alone", request.pdf_path)
+            request.future.set_result(expected)
+        if mismatches:
+            self._count(verify_mismatches=mismatches)
+            if self.max_batch_pages:
+                logger.error("%d of %d documents in a verified batch converted differently alone; "
+                             "turning batching off", mismatches, len(batch))
+                self.max_batch_pages = 0
@@ -0,0 +1,32 @@
+"""
+Production server settings: gunicorn -c gunicorn.conf.py app:app
+
+The service runs as exactly one worker process with threads. The job
+queue, result cache and admission control keep their state in that
+process, and a second worker would recover and run the same jobs and
+race on cache entries; add converter processes to convert more PDFs at
+once. Keep
+GUNICORN_THREADS above ADMISSION_CONCURRENCY + ADMISSION_MAX_WAITING so
+/healthz, /metrics and job polling are still answered while the converter
+is saturated.
+"""
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+if os.environ.get("GUNICORN_WORKERS", "1") != "1":
+    raise RuntimeError("GUNICORN_WORKERS must be 1; use CONVERTER_PROCESSES to convert more PDFs at once")
+workers = 1
+# gthread workers keep idle connections open between requests; the sync worker closes every one
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+# Heartbeat timeout of a worker process, not a request limit (that is REQUEST_TIMEOUT_SECONDS)
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+# The app loads models and starts background threads on import, which must happen after the fork
+preload_app = False
+# Heartbeat files on tmpfs, so a slow disk never gets a busy worker killed
+worker_tmp_dir = "/dev/shm"
+# Logging is configured by log_config; only gunicorn's own messages go to stderr
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
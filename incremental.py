@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from extract_tables import parse_eob_table
+from layout_profiles import default_registry, resolve_layout
+
+logger = logging.getLogger(__name__)
+
+# Pages are rendered this small for fingerprinting; together with the page
+# text it is enough to tell a corrected amount apart, at a few milliseconds a page
+FINGERPRINT_SCALE = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    markdown BLOB NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    key TEXT PRIMARY KEY,
+    members BLOB NOT NULL,
+    state BLOB NOT NULL,
+    stored_at REAL NOT NULL
+)
+"""
+
+
+def page_fingerprints(pdf_path: str, scale: float = FINGERPRINT_SCALE) -> List[str]:
+    """
+    SHA-256 of every page of a PDF, over its size, its text layer and a
+    grayscale rendering, so both born-digital and scanned pages change
+    fingerprint when their content does.
+    """
+    import pypdfium2
+
+    doc = pypdfium2.PdfDocument(pdf_path)
+    fingerprints = []
+    try:
+        for index in range(len(doc)):
+            page = doc[index]
+            try:
+                digest = hashlib.sha256(repr(page.get_size()).encode("ascii"))
+                textpage = page.get_textpage()
+                try:
+                    digest.update(textpage.get_text_range().encode("utf-8", "surrogatepass"))
+                finally:
+                    textpage.close()
+                bitmap = page.render(scale=scale, grayscale=True)
+                try:
+                    digest.update(f"{bitmap.width}x{bitmap.height}/{bitmap.stride}".encode("ascii"))
+                    digest.update(bytes(bitmap.buffer))
+                finally:
+                    bitmap.close()
+                fingerprints.append(digest.hexdigest())
+            finally:
+                page.close()
+    finally:
+        doc.close()
+    return fingerprints
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class IncrementalStore:
+    """
+    What incremental re-extraction remembers between documents, in one
+    SQLite file.
+
+    `pages` maps a page fingerprint to the markdown marker rendered for
+    that page. `blocks` maps a page block and the parser state it was
+    entered with (the member still open from the previous page) to what
+    `parse_eob_table` made of it: the members it completed and the state
+    it left. Both are content-addressed, so a reissued remittance finds
+    the pages and parser snapshots of the original no matter where in the
+    document they moved. Every key includes `version`, so a marker,
+    extractor or layout change starts afresh.
+    """
+
+    def __init__(self, path: str, version: str = ""):
+        self.path = path
+        self.version = version
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db_lock, self._db:
+            self._db.executescript(_SCHEMA)
+        self._counts = {"pages_reused": 0, "pages_stored": 0, "blocks_reused": 0, "blocks_parsed": 0}
+
+    def _key(self, *parts: str) -> str:
+        digest = hashlib.sha256(self.version.encode("utf-8"))
+        for part in parts:
+            digest.update(b"\0" + part.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _count(self, **items: int):
+        with self._db_lock:
+            for name, value in items.items():
+                self._counts[name] += value
+
+    def get_pages(self, fingerprints: Sequence[str]) -> Dict[str, str]:
+        """Markdown of the pages already converted, by fingerprint."""
+        keys = {self._key("page", fp): fp for fp in set(fingerprints)}
+        found = {}
+        with self._db_lock:
+            items = list(keys)
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, markdown FROM pages WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[keys[key]] = zlib.decompress(blob).decode("utf-8")
+        self._count(pages_reused=sum(1 for fp in fingerprints if fp in found))
+        return found
+
+    def put_pages(self, pages: Iterable[Tuple[str, str]]):
+        """Remember the markdown of pages, given as (fingerprint, markdown)."""
+        now = time.time()
+        rows = [(self._key("page", fp), zlib.compress(markdown.encode("utf-8")), now) for fp, markdown in pages]
+        with self._db_lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO pages (key, markdown, stored_at) VALUES (?, ?, ?)", rows)
+        self._count(pages_stored=len(rows))
+
+    def block_key(self, block: str, state_json: str, layout_name: str, capture_totals: bool) -> str:
+        return self._key("block", layout_name, "totals" if capture_totals else "", state_json, block)
+
+    def get_block(self, key: str) -> Optional[Tuple[List[Dict], Optional[Dict]]]:
+        with self._db_lock:
+            row = self._db.execute("SELECT members, state FROM blocks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return _unpack(row[0]), _unpack(row[1])
+
+    def put_blocks(self, blocks: Iterable[Tuple[str, bytes, bytes]]):
+        """Remember parsed blocks, given as (key, packed members, packed state)."""
+        now = time.time()
+        rows = [(key, members, state, now) for key, members, state in blocks]
+        with self._db_lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO blocks (key, members, state, stored_at) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Forget pages and blocks stored more than `max_age_seconds` ago; returns how many."""
+        cutoff = time.time() - max_age_seconds
+        with self._db_lock, self._db:
+            removed = self._db.execute("DELETE FROM pages WHERE stored_at < ?", (cutoff,)).rowcount
+            removed += self._db.execute("DELETE FROM blocks WHERE stored_at < ?", (cutoff,)).rowcount
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._db_lock:
+            pages = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blocks = self._db.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+            return {"pages": pages, "blocks": blocks, **self._counts}
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+
+
+def parse_blocks_incremental(table_strings: List[str], store: IncrementalStore, layout=None,
+                             capture_totals: bool = False) -> Tuple[List[Dict], int]:
+    """
+    `parse_table_blocks` that reuses the parser snapshots in `store`.
+
+    A block is looked up by its text and the state carried into it; on a
+    hit its completed members and outgoing state come from the store
+    instead of `parse_eob_table`. Parsing is a function of exactly those
+    two inputs, so the result is identical to a full parse: an unchanged
+    page after a corrected one is reused only if the correction left the
+    carried member as it was. Returns the members and how many blocks were
+    reused.
+    """
+    layout = resolve_layout(layout)
+    if layout is None and table_strings:
+        registry = default_registry()
+        layout = registry.detect(table_strings[0]) or registry.default
+    all_members_data = []
+    carried_over_member_info_state = None
+    last_block_completed_members_count = 0
+    reused = 0
+    new_blocks = []
+
+    for i, table_str in enumerate(table_strings):
+        if not table_str.strip():
+            logger.debug("Skipping empty table block %d", i + 1)
+            continue
+
+        key = store.block_key(table_str, json.dumps(carried_over_member_info_state, ensure_ascii=False),
+                              layout.name, capture_totals)
+        snapshot = store.get_block(key)
+        if snapshot is not None:
+            completed_members_in_block, carried_over_member_info_state = snapshot
+            reused += 1
+        else:
+            completed_members_in_block, carried_over_member_info_state = parse_eob_table(
+                table_str, carried_over_member_info_state, layout, capture_totals
+            )
+            # Packed now: the next block keeps appending to the carried member
+            new_blocks.append((key, _pack(completed_members_in_block), _pack(carried_over_member_info_state)))
+        all_members_data.extend(completed_members_in_block)
+        last_block_completed_members_count = len(completed_members_in_block)
+
+    if new_blocks:
+        store.put_blocks(new_blocks)
+    store._count(blocks_reused=reused, blocks_parsed=len(new_blocks))
+
+    if carried_over_member_info_state:
+        if carried_over_member_info_state.get("claims") or \
+           (last_block_completed_members_count == 0 and len(all_members_data) == 0 and len(table_strings) > 0):
+            all_members_data.append(carried_over_member_info_state)
+    return all_members_data, reused
@@ -0,0 +1,258 @@
+import os
+import json
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from log_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    queue_seconds REAL,
+    run_seconds REAL,
+    members INTEGER,
+    claims INTEGER
+)
+"""
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when the pending queue is at capacity."""
+
+
+class JobQueue:
+    """
+    Local submit-and-poll queue for PDF extraction jobs.
+
+    Job metadata lives in a SQLite file and inputs/results on the filesystem
+    under `data_dir`, so a restart picks up jobs that were still queued.
+    A fixed number of worker threads drain the queue; each one calls
+    `handler(pdf_path)` which must return `(members, excel_bytes)`. With
+    `max_age_seconds`, finished jobs older than that are deleted, files and
+    all, at start and every `prune_interval_seconds`.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str], Tuple[List[Dict], Optional[bytes]]],
+        data_dir: str,
+        workers: int = 1,
+        max_pending: int = 16,
+        max_age_seconds: Optional[float] = None,
+        prune_interval_seconds: float = 600
+    ):
+        self.handler = handler
+        # Absolute, so result paths handed to send_file do not depend on the working directory
+        self.data_dir = os.path.abspath(data_dir)
+        self.inputs_dir = os.path.join(self.data_dir, "inputs")
+        self.results_dir = os.path.join(self.data_dir, "results")
+        os.makedirs(self.inputs_dir, exist_ok=True)
+        os.makedirs(self.results_dir, exist_ok=True)
+
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._pending = queue.Queue(maxsize=self.max_pending)
+        self._db_lock = threading.Lock()
+        self.max_age_seconds = max_age_seconds
+        self.prune_interval_seconds = prune_interval_seconds
+        self._db = sqlite3.connect(os.path.join(self.data_dir, "jobs.sqlite3"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db_lock, self._db:
+            self._db.execute(_SCHEMA)
+        self._threads = []
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return self
+        self._started = True
+        self._recover()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.max_age_seconds:
+            t = threading.Thread(target=self._prune_loop, name="job-pruner", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete jobs that finished more than `max_age_seconds` ago, with their files; returns how many."""
+        cutoff = time.time() - max_age_seconds
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (JOB_DONE, JOB_FAILED, cutoff)
+            ).fetchall()
+        for row in rows:
+            self._remove_files(row["id"])
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+        if rows:
+            logger.info("Pruned %d finished jobs", len(rows))
+        return len(rows)
+
+    def _prune_loop(self):
+        while True:
+            try:
+                self.prune(self.max_age_seconds)
+            except Exception as e:
+                logger.exception("Job pruner error: %s", e)
+            time.sleep(self.prune_interval_seconds)
+
+    def _recover(self):
+        # Jobs interrupted by a restart go back on the queue in submission order.
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        for row in rows:
+            try:
+                self._pending.put_nowait(row["id"])
+                self._update(row["id"], status=JOB_QUEUED, started_at=None)
+            except queue.Full:
+                self._update(row["id"], status=JOB_FAILED, error="Dropped on restart: queue full", finished_at=time.time())
+
+    def input_path(self, job_id: str) -> str:
+        return os.path.join(self.inputs_dir, f"{job_id}.pdf")
+
+    def result_path(self, job_id: str, fmt: str) -> str:
+        return os.path.join(self.results_dir, f"{job_id}.{fmt}")
+
+    def submit(self, source, filename: str) -> str:
+        """
+        Move `source` (a file path, or an upload object with a `move_to`
+        method) into the queue's storage and enqueue it.
+        """
+        if self._pending.full():
+            raise QueueFullError(f"Job queue is full ({self.max_pending} pending)")
+
+        job_id = uuid.uuid4().hex
+        if hasattr(source, "move_to"):
+            source.move_to(self.input_path(job_id))
+        else:
+            shutil.move(source, self.input_path(job_id))
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (id, filename, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, filename, JOB_QUEUED, time.time())
+            )
+        try:
+            self._pending.put_nowait(job_id)
+        except queue.Full:
+            # Lost the race for the last slot between the check and the put.
+            self._remove_files(job_id)
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            raise QueueFullError(f"Job queue is full ({self.max_pending} pending)")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._db_lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job["status"] == JOB_QUEUED:
+            job["queue_seconds"] = round(time.time() - job["created_at"], 3)
+        elif job["status"] == JOB_RUNNING:
+            job["run_seconds"] = round(time.time() - job["started_at"], 3)
+        return job
+
+    def stats(self) -> Dict:
+        with self._db_lock:
+            counts = {
+                row["status"]: row["n"]
+                for row in self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            }
+            timing = self._db.execute(
+                "SELECT AVG(queue_seconds) AS avg_queue, MAX(queue_seconds) AS max_queue, "
+                "AVG(run_seconds) AS avg_run, MAX(run_seconds) AS max_run "
+                "FROM jobs WHERE status = ?",
+                (JOB_DONE,)
+            ).fetchone()
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending.qsize(),
+            "counts": counts,
+            "avg_queue_seconds": timing["avg_queue"],
+            "max_queue_seconds": timing["max_queue"],
+            "avg_run_seconds": timing["avg_run"],
+            "max_run_seconds": timing["max_run"],
+        }
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._db_lock, self._db:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _remove_files(self, job_id: str):
+        for path in (self.input_path(job_id), self.result_path(job_id, "xlsx"), self.result_path(job_id, "json")):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _worker_loop(self):
+        while True:
+            job_id = self._pending.get()
+            # Log lines of a job carry its id, like those of a request carry the request id
+            token = request_id_var.set(job_id)
+            try:
+                self._run(job_id)
+            finally:
+                request_id_var.reset(token)
+                self._pending.task_done()
+
+    def _run(self, job_id: str):
+        job = self.get(job_id)
+        if job is None:
+            return
+        started_at = time.time()
+        self._update(job_id, status=JOB_RUNNING, started_at=started_at,
+                     queue_seconds=round(started_at - job["created_at"], 3))
+        pdf_path = self.input_path(job_id)
+        try:
+            members, excel_bytes = self.handler(pdf_path)
+            if excel_bytes is None:
+                raise RuntimeError("Failed to create Excel file")
+
+            with open(self.result_path(job_id, "json"), "w", encoding="utf-8") as json_file:
+                json.dump(members, json_file, indent=2)
+            with open(self.result_path(job_id, "xlsx"), "wb") as excel_file:
+                excel_file.write(excel_bytes)
+
+            finished_at = time.time()
+            self._update(
+                job_id, status=JOB_DONE, finished_at=finished_at,
+                run_seconds=round(finished_at - started_at, 3),
+                members=len(members),
+                claims=sum(len(m.get("claims", [])) for m in members)
+            )
+        except Exception as e:
+            logger.exception("Job %s failed: %s - %s", job_id, type(e).__name__, e)
+            finished_at = time.time()
+            self._update(job_id, status=JOB_FAILED, error=str(e), finished_at=finished_at,
+                         run_seconds=round(finished_at - started_at, 3))
+        finally:
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
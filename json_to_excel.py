@@ -1,15 +1,258 @@
+import os
+import re
+import csv
+import logging
 import pandas as pd
 import json
-from typing import List, Dict, Union, Optional, Tuple
+from typing import Iterable, Iterator, List, Dict, Union, Optional, Tuple
 from pathlib import Path
 from io import BytesIO
 
+from extract_tables import MEMBER_HEADERS, TARGET_CLAIM_HEADERS, MEMBER_TOTALS_KEY, output_member_no
+from claim_table import ClaimTable
+
+logger = logging.getLogger(__name__)
+
+# Column layout of the flattened rows: member fields followed by the claim fields.
+FLAT_COLUMNS = MEMBER_HEADERS + TARGET_CLAIM_HEADERS
+
+
+def member_rows(record, record_index: int = 0, verbose: bool = True) -> Iterator[Dict]:
+    """Yield the flattened rows (one per claim) of a single member record"""
+    if not isinstance(record, dict):
+        if verbose:
+            logger.warning("Item at index %d in JSON data is not a dictionary. Skipping.", record_index)
+        return
+
+    base_info = {}
+    for key, value in record.items():
+        if key != "claims" and key != MEMBER_TOTALS_KEY:
+            if key == "Member #":
+                base_info[key] = output_member_no(value)
+            else:
+                base_info[key] = value
+
+    claims_data = record.get("claims", [])
+    if isinstance(claims_data, list) and claims_data:
+        for claim_index, claim in enumerate(claims_data):
+            if not isinstance(claim, dict):
+                if verbose:
+                    logger.warning("Claim at index %d for record %d is not a dictionary. Skipping claim.", claim_index, record_index + 1)
+                continue
+            
+            row_data = base_info.copy()
+            row_data.update(claim)
+            yield row_data
+    elif base_info:
+        if verbose:
+            logger.info("Record %d has no 'claims' data or it's not a list. Adding a row with base information only.", record_index + 1)
+        yield base_info
+    elif not base_info and not claims_data:
+        if verbose:
+            logger.warning("Record %d is empty or has an unexpected structure. Skipping.", record_index + 1)
+
+
+def flatten_records(json_data, verbose: bool = True) -> Optional[List[Dict]]:
+    """Flatten member records into one row per claim, or None if the data is not a list"""
+    if not isinstance(json_data, list):
+        if verbose:
+            logger.error("JSON data is not a list of records as expected")
+        return None
+
+    all_rows = []
+    for record_index, record in enumerate(json_data):
+        all_rows.extend(member_rows(record, record_index, verbose))
+    return all_rows
+
+
+def members_to_dataframe(json_data, verbose: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Same frame as pd.DataFrame(flatten_records(json_data)). Parser output goes
+    through the columnar ClaimTable, which builds it without a dict per row;
+    anything else takes the row-by-row path.
+    """
+    if isinstance(json_data, list):
+        try:
+            return ClaimTable.from_members(json_data).to_dataframe(numeric=False)
+        except ValueError:
+            pass
+    all_rows = flatten_records(json_data, verbose)
+    if all_rows is None:
+        return None
+    return pd.DataFrame(all_rows)
+
+
+class MemberWriter:
+    """
+    Base class for writers that take members one at a time, so an output can
+    be produced from `extract_tables.iter_members` without holding the whole
+    result in memory. `output` is a path or an open file object; paths are
+    opened here and closed by `close()`.
+    """
+    binary = False
+
+    def __init__(self, output):
+        if isinstance(output, (str, os.PathLike)):
+            Path(output).parent.mkdir(parents=True, exist_ok=True)
+            if self.binary:
+                self._file = open(output, "wb")
+            else:
+                self._file = open(output, "w", encoding="utf-8", newline="")
+            self._owns_file = True
+        else:
+            self._file = output
+            self._owns_file = False
+        self.members = 0
+        self.rows = 0
+
+    def write_member(self, member: Dict):
+        raise NotImplementedError
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonArrayWriter(MemberWriter):
+    """Writes the same text as json.dump(members, f, indent=2), one member at a time."""
+
+    def write_member(self, member: Dict):
+        body = json.dumps(member, indent=2).replace("\n", "\n  ")
+        self._file.write(("[\n  " if self.members == 0 else ",\n  ") + body)
+        self.members += 1
+
+    def close(self):
+        self._file.write("[]" if self.members == 0 else "\n]")
+        super().close()
+
+
+class JsonLinesWriter(MemberWriter):
+    """One member object per line."""
+
+    def write_member(self, member: Dict):
+        self._file.write(json.dumps(member) + "\n")
+        self.members += 1
+
+
+class CsvWriter(MemberWriter):
+    """Flattened rows, one per claim, with a fixed column layout (extra keys are dropped)."""
+
+    def __init__(self, output, columns: List[str] = FLAT_COLUMNS):
+        super().__init__(output)
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+        self._writer.writeheader()
+
+    def write_member(self, member: Dict):
+        for row in member_rows(member, self.members, verbose=False):
+            self._writer.writerow(row)
+            self.rows += 1
+        self.members += 1
+
+
+class ExcelStreamWriter(MemberWriter):
+    """
+    Flattened rows written through openpyxl's write-only mode, which keeps a
+    constant amount of memory regardless of the row count.
+    """
+    binary = True
+
+    def __init__(self, output, columns: List[str] = FLAT_COLUMNS, sheet_name: str = "Sheet1"):
+        super().__init__(output)
+        from openpyxl import Workbook
+
+        self.columns = columns
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(sheet_name)
+        self._sheet.append(columns)
+
+    def write_member(self, member: Dict):
+        for row in member_rows(member, self.members, verbose=False):
+            self._sheet.append([row.get(column) for column in self.columns])
+            self.rows += 1
+        self.members += 1
+
+    def close(self):
+        self._workbook.save(self._file)
+        super().close()
+
+
+def write_members(members: Iterable[Dict], writers: List[MemberWriter]) -> int:
+    """Feed every member to all writers in one pass and close them; returns the member count."""
+    count = 0
+    try:
+        for member in members:
+            for writer in writers:
+                writer.write_member(member)
+            count += 1
+    finally:
+        for writer in writers:
+            writer.close()
+    return count
+
+
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def unique_sheet_name(name: str, used: set) -> str:
+    """Excel sheet names are at most 31 characters, unique case-insensitively and cannot contain []:*?/\\"""
+    base = INVALID_SHEET_CHARS.sub("_", name).strip("'") or "Sheet"
+    candidate = base[:31]
+    counter = 2
+    while candidate.lower() in used:
+        suffix = f" ({counter})"
+        candidate = base[:31 - len(suffix)] + suffix
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def members_to_workbook(
+    named_results: List[Tuple[str, List[Dict]]],
+    errors: Optional[List[Dict]] = None,
+    verbose: bool = True
+) -> bytes:
+    """
+    Build one workbook from several extraction results: a "Combined" sheet with
+    a "Source File" column, one sheet per source file and, when any file
+    failed, an "Errors" sheet listing them.
+    """
+    used_names = set()
+    combined_name = unique_sheet_name("Combined", used_names)
+    per_file = []
+    combined_frames = []
+    for source_name, members in named_results:
+        df = members_to_dataframe(members, verbose)
+        if df is None:
+            df = pd.DataFrame()
+        per_file.append((unique_sheet_name(os.path.splitext(source_name)[0], used_names), df))
+        if not df.empty:
+            combined_frames.append(df.assign(**{"Source File": source_name}))
+
+    combined_df = pd.concat(combined_frames, ignore_index=True) if combined_frames else pd.DataFrame()
+    if not combined_df.empty:
+        combined_df = combined_df[["Source File"] + [c for c in combined_df.columns if c != "Source File"]]
+
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer) as writer:
+        combined_df.to_excel(writer, sheet_name=combined_name, index=False)
+        for sheet_name, df in per_file:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        if errors:
+            pd.DataFrame(errors).to_excel(writer, sheet_name=unique_sheet_name("Errors", used_names), index=False)
+    return excel_buffer.getvalue()
+
+
 def json_to_excel(
     input_json_string: str,
     output_excel_path: Optional[str] = None,
     verbose: bool = True
 ) -> Tuple[Optional[pd.DataFrame], Optional[bytes]]:
-    print("input_json_string", input_json_string)
     try:
         # Handle both string and list inputs
         if isinstance(input_json_string, str):
@@ -18,61 +261,22 @@ def json_to_excel(
             json_data = input_json_string  # Already a Python object
     except json.JSONDecodeError:
         if verbose:
-            print(f"Error: input is not a valid JSON")
+            logger.error("Input is not valid JSON")
         return None, None
     except Exception as e:
         if verbose:
-            print(f"An error occurred while reading the JSON file: {e}")
+            logger.error("An error occurred while reading the JSON input: %s", e)
         return None, None
 
-    # Prepare data for the Excel file by flattening the structure
-    all_rows = []
-    if not isinstance(json_data, list):
-        if verbose:
-            print("Error: JSON data is not a list of records as expected")
+    output_df = members_to_dataframe(json_data, verbose)
+    if output_df is None:
         return None, None
 
-    for record_index, record in enumerate(json_data):
-        if not isinstance(record, dict):
-            if verbose:
-                print(f"Warning: Item at index {record_index} in JSON data is not a dictionary. Skipping.")
-            continue
-
-        base_info = {}
-        for key, value in record.items():
-            if key != "claims": 
-                if key == "Member #" and isinstance(value, str) and value.startswith("Medi-Cal "):
-                    base_info[key] = value.replace("Medi-Cal ", "").strip()
-                else:
-                    base_info[key] = value
-
-        claims_data = record.get("claims", [])
-        if isinstance(claims_data, list) and claims_data:
-            for claim_index, claim in enumerate(claims_data):
-                if not isinstance(claim, dict):
-                    if verbose:
-                        print(f"Warning: Claim at index {claim_index} for record {record_index+1} is not a dictionary. Skipping claim.")
-                    continue
-                
-                row_data = base_info.copy()
-                row_data.update(claim)
-                all_rows.append(row_data)
-        elif base_info:
-            if verbose:
-                print(f"Note: Record {record_index+1} (Member #: {base_info.get('Member #', 'N/A')}) has no 'claims' data or it's not a list. Adding a row with base information only.")
-            all_rows.append(base_info)
-        elif not base_info and not claims_data:
-            if verbose:
-                print(f"Warning: Record {record_index+1} is empty or has an unexpected structure. Skipping.")
-
-    if not all_rows:
+    if output_df.empty:
         if verbose:
-            print("No data was processed or extracted from the JSON")
+            logger.warning("No data was processed or extracted from the JSON")
         return None, None
 
-    # Create a DataFrame from all processed rows
-    output_df = pd.DataFrame(all_rows)
-
     try:
         # Create Excel file in memory
         excel_buffer = BytesIO()
@@ -83,21 +287,19 @@ def json_to_excel(
         if output_excel_path:
             # Ensure the output directory exists
             Path(output_excel_path).parent.mkdir(parents=True, exist_ok=True)
-            # Save the DataFrame to Excel
-            output_df.to_excel(output_excel_path, index=False)
+            # Reuse the serialized workbook instead of rendering it a second time
+            with open(output_excel_path, "wb") as excel_file:
+                excel_file.write(excel_bytes)
             
             if verbose:
-                print(f"\nData successfully written to Excel file: {output_excel_path}")
-                print(f"The Excel file contains {len(output_df)} rows of data")
-                print("\nSample of first 5 rows:")
-                print(output_df.head())
-                if len(output_df) > 5:
-                    print("...")
-                    print(f"(Note: The above is just a sample. The actual Excel file contains all {len(output_df)} rows.)")
+                logger.info("Wrote %d rows to Excel file %s", len(output_df), output_excel_path)
+                # Row contents are claim data; only shown when debugging.
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("First rows:\n%s", output_df.head())
         
         return output_df, excel_bytes
 
     except Exception as e:
         if verbose:
-            print(f"An error occurred while creating Excel: {e}")
+            logger.error("An error occurred while creating Excel: %s", e)
         return None, None
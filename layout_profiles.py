@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+LAYOUTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts")
+DEFAULT_LAYOUT = "institute_on_aging"
+PROFILE_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# Claim keys of the extracted output, in order, whatever the payer prints.
+TARGET_CLAIM_HEADERS = [
+    "Claim #", "Line/Ver#", "Received Date", "Service From", "Service To",
+    "Proc", "Mod", "Qty", "Amount Billed", "Amount Allowed", "Not Covered",
+    "Copay/Coins", "Deduct Amount", "Withhold Amount", "Net Paid", "ST",
+    "Reason", "Interest", "Adjust"
+]
+# The parser locates these columns itself (dates and procedure codes shift
+# cells around), so every table type has to start with them in this order.
+# The columns after them are assigned positionally as the profile lists them.
+LEADING_CLAIM_COLUMNS = TARGET_CLAIM_HEADERS[:TARGET_CLAIM_HEADERS.index("Qty") + 1]
+# Target for a column printing status and reason together, split on the first space
+COMBINED_ST_REASON = "ST Reason"
+# Labels of the member header row, never taken for a patient name
+MEMBER_FIELD_LABELS = ("Patient Name", "Line of Business", "Provider Name")
+
+
+class LayoutProfileError(ValueError):
+    """Raised for a layout profile that cannot be loaded or compiled, or an unknown layout name."""
+
+
+class TableLayout:
+    """Claim columns of one table type of a layout, mapped onto TARGET_CLAIM_HEADERS."""
+
+    def __init__(self, type_id: int, columns: List[str], financial_columns: List[str]):
+        self.type_id = type_id
+        self.columns = columns
+        self.financial_columns = financial_columns
+        self.combined_st_reason = COMBINED_ST_REASON in financial_columns
+
+
+class LayoutProfile:
+    """
+    One payer's remittance layout, compiled from its declarative definition.
+
+    Everything the per-line parser tests is precomputed here (regexes,
+    prefix tuples, token lists, sets), so a document parsed with this
+    profile costs the same no matter how many other profiles are loaded.
+    """
+
+    def __init__(self, definition: Dict, source: Optional[str] = None):
+        self.definition = definition
+        self.source = source
+        try:
+            self.name = definition["name"]
+            self.description = definition.get("description", "")
+            self.page_start_re = re.compile(_alternatives(definition["page_start"]), re.MULTILINE)
+            self.provider_name = definition["provider_name"]
+            self.provider_ids = frozenset(definition.get("provider_ids", []))
+            self.line_of_business = definition["line_of_business"]
+            self.member_totals_label = definition.get("member_totals_label", "Member Totals :")
+            self.claim_totals_label = definition.get("claim_totals_label", "Claim Totals :")
+            self.table_markers = tuple(definition.get("table_markers", []))
+            self.is_skip_line = _compile_skip_test(
+                definition.get("skip_prefixes", []),
+                definition.get("skip_containing", []),
+                definition.get("skip_rows", []),
+            )
+            self.claim_header = list(definition["claim_header"])
+            # Cleaning only collapses <br> and whitespace, so every word of
+            # the header is a cheap prefilter on the raw line.
+            self.claim_header_tokens = list(dict.fromkeys(w for s in self.claim_header for w in s.split()))
+            self.table_types, self.table_type_markers, self.default_table_type = self._compile_table_types(
+                definition["table_types"], definition.get("column_map", {})
+            )
+        except (KeyError, TypeError) as e:
+            raise LayoutProfileError(f"Layout {definition.get('name', source)!r} is missing or has an invalid {e}") from None
+        except re.error as e:
+            raise LayoutProfileError(f"Layout {definition.get('name', source)!r} has an invalid pattern: {e}") from None
+        self.non_name_values = frozenset(
+            MEMBER_FIELD_LABELS + (self.line_of_business, self.claim_totals_label, self.member_totals_label)
+        ).union(TARGET_CLAIM_HEADERS)
+
+    def _compile_table_types(self, table_types: List[Dict], column_map: Dict[str, str]):
+        compiled = {}
+        markers = []
+        default = None
+        for table_type in table_types:
+            type_id = table_type["id"]
+            if type_id in compiled:
+                raise LayoutProfileError(f"Layout {self.name!r} defines table type {type_id} twice")
+            columns = list(table_type["columns"])
+            targets = [column_map.get(column, column) for column in columns]
+            leading = targets[:len(LEADING_CLAIM_COLUMNS)]
+            if leading != LEADING_CLAIM_COLUMNS:
+                raise LayoutProfileError(
+                    f"Layout {self.name!r} table type {type_id} must start with columns mapped to "
+                    f"{', '.join(LEADING_CLAIM_COLUMNS)}; got {', '.join(leading)}"
+                )
+            financial = targets[len(LEADING_CLAIM_COLUMNS):]
+            allowed = set(TARGET_CLAIM_HEADERS[len(LEADING_CLAIM_COLUMNS):]) | {COMBINED_ST_REASON}
+            unknown = [t for t in financial if t not in allowed]
+            if unknown or len(set(financial)) != len(financial):
+                raise LayoutProfileError(
+                    f"Layout {self.name!r} table type {type_id} maps columns to unknown or repeated "
+                    f"targets: {', '.join(unknown) or ', '.join(financial)}"
+                )
+            compiled[type_id] = TableLayout(type_id, columns, financial)
+            if table_type.get("header_contains"):
+                markers.append((table_type["header_contains"], type_id))
+            elif default is None:
+                default = type_id
+            else:
+                raise LayoutProfileError(f"Layout {self.name!r} has more than one table type without header_contains")
+        if default is None:
+            raise LayoutProfileError(f"Layout {self.name!r} needs one table type without header_contains as the default")
+        return compiled, markers, default
+
+    def matches_single_table(self, content: str) -> bool:
+        """Fallback for markdown without page headers: is it one table block of this layout?"""
+        return "|" in content and any(marker in content for marker in self.table_markers)
+
+    def __repr__(self):
+        return f"<LayoutProfile {self.name}>"
+
+
+def _alternatives(patterns: Union[str, List[str]]) -> str:
+    if isinstance(patterns, str):
+        return patterns
+    return "|".join(f"(?:{p})" for p in patterns)
+
+
+def _compile_skip_test(prefixes: List[str], containing: List[str], rows: List[List[Union[str, List[str]]]]):
+    """
+    Build `test(line)`, true for a line starting with one of `prefixes`,
+    containing one of `containing` or containing every item of one of `rows`
+    (an item may list alternative spellings). The lists are frozen into
+    tuples once, so each call is a `startswith` and a few `in` tests.
+    """
+    prefixes = tuple(prefixes)
+    containing = tuple(containing)
+    rows = tuple(
+        tuple((item,) if isinstance(item, str) else tuple(item) for item in row)
+        for row in rows
+    )
+
+    def test(line: str) -> bool:
+        if prefixes and line.startswith(prefixes):
+            return True
+        for s in containing:
+            if s in line:
+                return True
+        for row in rows:
+            if all(any(v in line for v in variants) for variants in row):
+                return True
+        return False
+
+    return test
+
+
+def read_definition(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            try:
+                return json.load(f)
+            except json.JSONDecodeError as e:
+                raise LayoutProfileError(f"{path} is not valid JSON: {e}") from None
+        try:
+            import yaml
+        except ImportError:
+            raise LayoutProfileError(f"{path} needs the PyYAML package, which is not installed") from None
+        return yaml.safe_load(f)
+
+
+class LayoutRegistry:
+    """
+    The loaded layout profiles, with the default one first.
+
+    Each document is matched against all of them only until its layout is
+    known: `match_page_start` tests one line against a single regex joining
+    every profile's page-start pattern, and `detect` searches a whole text.
+    """
+
+    def __init__(self, profiles: Iterable[LayoutProfile], default: Optional[str] = None):
+        profiles = list(profiles)
+        if not profiles:
+            raise LayoutProfileError("No layout profiles loaded")
+        by_name = {}
+        for profile in profiles:
+            if profile.name in by_name:
+                raise LayoutProfileError(f"Layout {profile.name!r} is defined in both "
+                                         f"{by_name[profile.name].source} and {profile.source}")
+            by_name[profile.name] = profile
+        if default is not None and default not in by_name:
+            raise LayoutProfileError(f"Default layout {default!r} is not among {', '.join(sorted(by_name))}")
+        self.default = by_name[default] if default else profiles[0]
+        self.profiles = [self.default] + [p for p in profiles if p is not self.default]
+        self._by_name = by_name
+        self._by_group = {f"layout{i}": profile for i, profile in enumerate(self.profiles)}
+        self._page_start_re = re.compile(
+            "|".join(f"(?P<{group}>{profile.page_start_re.pattern})" for group, profile in self._by_group.items()),
+            re.MULTILINE
+        )
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [profile.definition for profile in self.profiles], sort_keys=True
+        ).encode("utf-8")).hexdigest()[:12]
+
+    def names(self) -> List[str]:
+        return [profile.name for profile in self.profiles]
+
+    def get(self, name: str) -> LayoutProfile:
+        profile = self._by_name.get(name)
+        if profile is None:
+            raise LayoutProfileError(f"Unknown layout {name!r}; expected one of {', '.join(self.names())}")
+        return profile
+
+    def _profile_for(self, match) -> LayoutProfile:
+        for group, value in match.groupdict().items():
+            if value is not None and group in self._by_group:
+                return self._by_group[group]
+        return self.default
+
+    def match_page_start(self, line: str) -> Optional[LayoutProfile]:
+        match = self._page_start_re.match(line)
+        return self._profile_for(match) if match else None
+
+    def detect(self, text: str) -> Optional[LayoutProfile]:
+        """Layout of the first page header in `text`, else of a header-less single table, else None."""
+        match = self._page_start_re.search(text)
+        if match:
+            return self._profile_for(match)
+        for profile in self.profiles:
+            if profile.matches_single_table(text):
+                return profile
+        return None
+
+
+def load_registry(directory: str = LAYOUTS_DIR, default: Optional[str] = None) -> LayoutRegistry:
+    """
+    Compile every profile in `directory`. Without `default` the built-in
+    default layout is the default if it is there, else the first by file name.
+    """
+    if not os.path.isdir(directory):
+        raise LayoutProfileError(f"No layout directory at {directory}")
+    profiles = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(PROFILE_EXTENSIONS):
+            path = os.path.join(directory, name)
+            definition = read_definition(path)
+            if not isinstance(definition, dict):
+                raise LayoutProfileError(f"{path} does not define a layout object")
+            profiles.append(LayoutProfile(definition, source=path))
+    if default is None and DEFAULT_LAYOUT in {p.name for p in profiles}:
+        default = DEFAULT_LAYOUT
+    registry = LayoutRegistry(profiles, default)
+    logger.info("Loaded %d layout profile(s) from %s: %s (default %s)",
+                len(registry.profiles), directory, ", ".join(registry.names()), registry.default.name)
+    return registry
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def default_registry() -> LayoutRegistry:
+    """The registry from LAYOUTS_DIR (default: layouts/ next to this module), compiled on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_registry(os.environ.get("LAYOUTS_DIR", LAYOUTS_DIR), os.environ.get("DEFAULT_LAYOUT"))
+    return _registry
+
+
+def resolve_layout(layout: Union[str, LayoutProfile, None]) -> Optional[LayoutProfile]:
+    """A profile given by name or as a LayoutProfile; None means detect it per document."""
+    if layout is None or isinstance(layout, LayoutProfile):
+        return layout
+    return default_registry().get(layout)
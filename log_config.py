@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextvars
+from typing import Dict, Optional, Tuple
+
+# Correlation id of the request or job being handled; set by the app for
+# every request and by the job queue for every job.
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamp every record with the current request id."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limit repetitive records at WARNING and below.
+
+    Records are grouped by logger and unformatted message template. In every
+    `window_seconds` the first `burst` records of a group pass, after that
+    only one in `every`; the next record that passes carries the number of
+    records dropped since the previous one as `suppressed`. ERROR and above
+    always pass.
+    """
+
+    def __init__(self, burst: int = 10, every: int = 100, window_seconds: float = 60.0):
+        super().__init__()
+        self.burst = max(1, burst)
+        self.every = max(1, every)
+        self.window_seconds = window_seconds
+        self._groups: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None or now - group[0] > self.window_seconds:
+                # [window start, records seen in window, dropped since last pass]
+                group = self._groups[key] = [now, 0, group[2] if group else 0]
+            group[1] += 1
+            seen = group[1]
+            if seen > self.burst and (seen - self.burst) % self.every != 0:
+                group[2] += 1
+                return False
+            if group[2]:
+                record.suppressed = group[2]
+                group[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, level, logger, request id and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        return f"{message} ({suppressed} similar suppressed)" if suppressed else message
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    log_format: Optional[str] = None,
+    sample_burst: Optional[int] = None,
+    sample_every: Optional[int] = None
+):
+    """
+    Configure the root logger from arguments or LOG_LEVEL (default INFO),
+    LOG_FORMAT (`json` or `text`, default json), LOG_SAMPLE_BURST and
+    LOG_SAMPLE_EVERY. Safe to call more than once.
+    """
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    log_format = (log_format or os.environ.get("LOG_FORMAT", "json")).lower()
+    sample_burst = sample_burst if sample_burst is not None else int(os.environ.get("LOG_SAMPLE_BURST", "10"))
+    sample_every = sample_every if sample_every is not None else int(os.environ.get("LOG_SAMPLE_EVERY", "100"))
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    handler.addFilter(CorrelationFilter())
+    handler.addFilter(SamplingFilter(burst=sample_burst, every=sample_every))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if getattr(existing, "_extractor_handler", False):
+            root.removeHandler(existing)
+    handler._extractor_handler = True
+    root.addHandler(handler)
+    root.setLevel(level)
@@ -0,0 +1,182 @@
+import os
+import gzip
+import tarfile
+import zipfile
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from extract_tables import iter_members, StreamingTableParser
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown", ".txt")
+
+# Read in chunks of this size so one huge document never has to be a single bytes object
+_READ_CHUNK = 1024 * 1024
+
+
+class MarkdownInputError(ValueError):
+    """Raised for input that is neither markdown nor a readable archive of markdown files."""
+
+
+class MarkdownLimitError(Exception):
+    """Raised when the markdown of a request, taken together, is larger than its `ByteBudget`."""
+
+
+class ByteBudget:
+    """Uncompressed bytes left for all the markdown of one request, counted as it is read."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+
+    def take(self, size: int):
+        self.used += size
+        if self.max_bytes and self.used > self.max_bytes:
+            raise MarkdownLimitError(f"Markdown is larger than {self.max_bytes} bytes uncompressed in total")
+
+
+def is_markdown_name(name: str) -> bool:
+    return name.lower().endswith(MARKDOWN_EXTENSIONS)
+
+
+def is_archive(path: str) -> bool:
+    """True for zip, tar (plain or compressed) and gzip files, judged by content."""
+    if zipfile.is_zipfile(path):
+        return True
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b" or tarfile.is_tarfile(path)
+
+
+def _read_text(fileobj: BinaryIO, name: str, max_bytes: int, budget: Optional[ByteBudget] = None) -> str:
+    chunks = []
+    size = 0
+    while True:
+        chunk = fileobj.read(_READ_CHUNK)
+        if not chunk:
+            break
+        if budget is not None:
+            budget.take(len(chunk))
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise MarkdownInputError(f"{name} is larger than {max_bytes} bytes uncompressed")
+        chunks.append(chunk)
+    try:
+        return b"".join(chunks).decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise MarkdownInputError(f"{name} is not UTF-8 text: {e}") from None
+
+
+def _is_zip_markdown(info: zipfile.ZipInfo) -> bool:
+    return not info.is_dir() and not info.filename.startswith("__MACOSX/") and is_markdown_name(info.filename)
+
+
+def list_markdown_files(path: str, name: Optional[str] = None) -> List[Tuple[str, Optional[int]]]:
+    """
+    (source name, declared uncompressed size) of every document
+    `iter_markdown_files` would yield for `path`, without reading any of
+    them. The size is None for a gzip file, whose header does not give it.
+    Sizes in a zip directory are only claims; reading still counts bytes.
+    """
+    name = name or os.path.basename(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return [(info.filename, info.file_size) for info in archive.infolist() if _is_zip_markdown(info)]
+    if tarfile.is_tarfile(path):
+        # Listing a compressed tar decompresses it, but holds none of it in memory
+        with tarfile.open(path, "r:*") as archive:
+            return [(info.name, info.size) for info in archive if info.isfile() and is_markdown_name(info.name)]
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if gzipped:
+        return [(name[:-3] if name.lower().endswith(".gz") else name, None)]
+    return [(name, os.path.getsize(path))]
+
+
+def iter_markdown_files(
+    path: str,
+    name: Optional[str] = None,
+    max_bytes: int = 0,
+    budget: Optional[ByteBudget] = None
+) -> Iterator[Tuple[str, Union[str, MarkdownInputError]]]:
+    """
+    Yield (source name, markdown) for the markdown file at `path`, or for
+    every .md/.markdown/.txt member of a zip, tar, tar.gz or single-file
+    gzip archive there. The archive type is detected from the content;
+    `name` (default: the file name) only names the sources. A member that is
+    too large or not UTF-8 is yielded with a MarkdownInputError instead of
+    its text so the other members are still processed. Every byte read is
+    also taken from `budget`, which raises MarkdownLimitError once spent.
+    """
+    name = name or os.path.basename(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not _is_zip_markdown(info):
+                    continue
+                if max_bytes and info.file_size > max_bytes:
+                    yield info.filename, MarkdownInputError(f"{info.filename} is larger than {max_bytes} bytes uncompressed")
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, _read_or_error(member, info.filename, max_bytes, budget)
+        return
+
+    if tarfile.is_tarfile(path):
+        with tarfile.open(path, "r:*") as archive:
+            for info in archive:
+                if not info.isfile() or not is_markdown_name(info.name):
+                    continue
+                if max_bytes and info.size > max_bytes:
+                    yield info.name, MarkdownInputError(f"{info.name} is larger than {max_bytes} bytes uncompressed")
+                    continue
+                yield info.name, _read_or_error(archive.extractfile(info), info.name, max_bytes, budget)
+        return
+
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if gzipped:
+        inner_name = name[:-3] if name.lower().endswith(".gz") else name
+        with gzip.open(path, "rb") as f:
+            yield inner_name, _read_or_error(f, inner_name, max_bytes, budget)
+        return
+
+    with open(path, "rb") as f:
+        yield name, _read_or_error(f, name, max_bytes, budget)
+
+
+def _read_or_error(fileobj: BinaryIO, name: str, max_bytes: int,
+                   budget: Optional[ByteBudget] = None) -> Union[str, MarkdownInputError]:
+    try:
+        return _read_text(fileobj, name, max_bytes, budget)
+    except MarkdownInputError as e:
+        return e
+    except (OSError, EOFError) as e:
+        return MarkdownInputError(f"{name} could not be read: {e}")
+
+
+def extract_markdown(markdown: str, capture_totals: bool = False) -> List[Dict]:
+    """Members from one marker markdown document; the text half of the PDF pipeline."""
+    return list(iter_members(markdown, StreamingTableParser(capture_totals=capture_totals)))
+
+
+def extract_markdown_files(
+    path: str,
+    name: Optional[str] = None,
+    max_bytes: int = 0,
+    capture_totals: bool = False,
+    budget: Optional[ByteBudget] = None
+) -> Tuple[List[Tuple[str, List[Dict]]], List[Dict]]:
+    """
+    Parse a markdown file or every markdown file in an archive. Returns
+    ([(source name, members)], [{"Source File", "Error"}]), the shape
+    `members_to_workbook` takes, so a failing file never fails the rest.
+    Running out of `budget` fails them all with MarkdownLimitError.
+    """
+    results = []
+    errors = []
+    for source_name, markdown in iter_markdown_files(path, name, max_bytes, budget):
+        if isinstance(markdown, MarkdownInputError):
+            errors.append({"Source File": source_name, "Error": str(markdown)})
+            continue
+        try:
+            results.append((source_name, extract_markdown(markdown, capture_totals)))
+        except Exception as e:
+            errors.append({"Source File": source_name, "Error": f"{type(e).__name__}: {e}"})
+    return results, errors
@@ -0,0 +1,222 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Buckets for stage and request durations: conversion takes seconds to
+# minutes, parsing and serialization milliseconds to seconds.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(2 ** p * 1024 * 1024 for p in range(4, 15))  # 16 MiB .. 16 GiB
+COUNT_BUCKETS = tuple(2 ** p for p in range(0, 10))  # 1 .. 512
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = SECONDS_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "extractor_stage_seconds", "Wall time per pipeline stage", ["stage"])
+STAGE_CPU_SECONDS = REGISTRY.histogram(
+    "extractor_stage_cpu_seconds", "CPU time of the calling thread per pipeline stage", ["stage"])
+STAGE_PEAK_RSS_BYTES = REGISTRY.histogram(
+    "extractor_stage_peak_rss_bytes", "Peak resident memory of the process during a pipeline stage",
+    ["stage"], buckets=BYTES_BUCKETS)
+STAGE_ITEMS = REGISTRY.counter(
+    "extractor_stage_items_total", "Pages, lines, members and claims handled per pipeline stage", ["stage", "kind"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "extractor_request_seconds", "HTTP request duration", ["endpoint", "method", "status"])
+CONVERTER_BATCH_DOCUMENTS = REGISTRY.histogram(
+    "extractor_converter_batch_documents", "Documents converted together in one micro-batch", buckets=COUNT_BUCKETS)
+CONVERTER_BATCH_PAGES = REGISTRY.histogram(
+    "extractor_converter_batch_pages", "Pages converted together in one micro-batch", buckets=COUNT_BUCKETS)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "extractor_admission_rejected_total", "Conversions turned away because too many were already waiting")
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "extractor_deadline_exceeded_total", "Requests abandoned because their deadline passed, by the stage it was noticed in",
+    ["stage"])
+
+
+def _read_status_kib(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class _PeakRssTracker:
+    """
+    Process peak RSS between `start()` and `stop()` from /proc/self/status.
+
+    The kernel's high-water mark (VmHWM) is reset when the first of several
+    overlapping stages starts, so a stage that overlaps another one reports
+    the process peak over the overlap, an upper bound for its own usage.
+    Returns None where /proc is not available.
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self._active += 1
+            if self._active == 1:
+                try:
+                    with open("/proc/self/clear_refs", "w") as f:
+                        f.write("5")
+                except OSError:
+                    pass
+
+    def stop(self) -> Optional[int]:
+        with self._lock:
+            self._active -= 1
+        peak_kib = _read_status_kib("VmHWM")
+        return None if peak_kib is None else peak_kib * 1024
+
+
+_peak_rss = _PeakRssTracker()
+
+
+class StageTrace:
+    """
+    Timings of the pipeline stages run for one request or job.
+
+    Each `stage()` block records wall time, CPU time of the calling thread
+    and peak RSS, both into the process-wide histograms above and into this
+    trace for the per-response `Server-Timing` header. Work done in the
+    converter processes or in torch's worker threads is not part of the CPU
+    time.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        record = {"stage": name}
+        _peak_rss.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.thread_time() - cpu_start
+            peak = _peak_rss.stop()
+            STAGE_SECONDS.observe(record["seconds"], stage=name)
+            STAGE_CPU_SECONDS.observe(record["cpu_seconds"], stage=name)
+            if peak is not None:
+                record["peak_rss_bytes"] = peak
+                STAGE_PEAK_RSS_BYTES.observe(peak, stage=name)
+            self.stages.append(record)
+
+    def count(self, record: Dict, **items: int):
+        """Attach item counts (pages, lines, members, claims) to a stage record."""
+        for kind, amount in items.items():
+            record[kind] = record.get(kind, 0) + amount
+            STAGE_ITEMS.inc(amount, stage=record["stage"], kind=kind)
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header."""
+        return ", ".join(
+            f"{record['stage']};dur={record['seconds'] * 1000:.1f}" +
+            (f';desc="cpu={record["cpu_seconds"] * 1000:.1f}ms"' if "cpu_seconds" in record else "")
+            for record in self.stages
+        )
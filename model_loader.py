@@ -0,0 +1,143 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from converter_pool import ConverterPool
+from converter_service import ConverterService
+from metrics import StageTrace
+
+logger = logging.getLogger(__name__)
+
+# One-page PDF converted once at startup so the first real request does not
+# pay for lazy model and kernel initialization.
+DEFAULT_WARMUP_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "warmup.pdf")
+
+
+class ModelLoader:
+    """
+    Loads the marker models on first use, exactly once across threads.
+
+    Nothing from marker is imported until `load` runs, so modules that only
+    parse markdown never pull in torch or the model weights. With
+    `converter_processes` the converter pool is forked right after loading,
+    so its processes share the weights copy-on-write; otherwise a
+    `ConverterService` runs every conversion on one thread, micro-batching
+    concurrent documents up to `batch_pages` pages. `warm_up` additionally
+    converts `warmup_pdf` once (in every converter process when there is a pool).
+    """
+
+    def __init__(
+        self,
+        converter_processes: int = 0,
+        warmup_pdf: Optional[str] = None,
+        batch_pages: int = 0,
+        batch_wait_seconds: float = 0.05,
+        batch_verify_every: int = 0
+    ):
+        self.converter_processes = converter_processes
+        self.warmup_pdf = warmup_pdf or None
+        self.batch_pages = batch_pages
+        self.batch_wait_seconds = batch_wait_seconds
+        self.batch_verify_every = batch_verify_every
+        self.artifact_dict: Optional[Dict[str, Any]] = None
+        self.service: Optional[ConverterService] = None
+        self.pool: Optional[ConverterPool] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._warmed = threading.Event()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded.is_set()
+
+    @property
+    def ready(self) -> bool:
+        return self._warmed.is_set()
+
+    def load(self) -> "ModelLoader":
+        """Load the models and start the converter service or pool; later calls return at once."""
+        if self._loaded.is_set():
+            return self
+        with self._lock:
+            if self._loaded.is_set():
+                return self
+            start = time.perf_counter()
+            try:
+                with StageTrace().stage("model_load"):
+                    from marker.models import create_model_dict
+
+                    self.artifact_dict = create_model_dict()
+                    if self.converter_processes > 0:
+                        self.pool = ConverterPool(
+                            self.artifact_dict, self.converter_processes, warmup_pdf=self.warmup_pdf
+                        ).start()
+                    else:
+                        self.service = ConverterService(
+                            self.artifact_dict,
+                            max_batch_pages=self.batch_pages,
+                            max_wait_seconds=self.batch_wait_seconds,
+                            verify_every=self.batch_verify_every,
+                        ).start()
+            except Exception as e:
+                self.error = f"Loading models failed: {type(e).__name__}: {e}"
+                logger.exception("Loading models failed")
+                raise
+            self.load_seconds = time.perf_counter() - start
+            self.error = None
+            self._loaded.set()
+            logger.info("Loaded models in %.1fs", self.load_seconds)
+        return self
+
+    def warm_up(self) -> "ModelLoader":
+        """Load the models if needed and run the warm-up conversion once."""
+        self.load()
+        if self._warmed.is_set():
+            return self
+        with self._warmup_lock:
+            if self._warmed.is_set():
+                return self
+            start = time.perf_counter()
+            try:
+                with StageTrace().stage("warmup"):
+                    if self.pool is not None:
+                        self.pool.wait_ready()
+                    elif self.warmup_pdf:
+                        self.service.convert(self.warmup_pdf)
+            except Exception as e:
+                self.error = f"Warm-up failed: {type(e).__name__}: {e}"
+                logger.exception("Warm-up failed")
+                raise
+            self.warmup_seconds = time.perf_counter() - start
+            self._warmed.set()
+            logger.info("Warm-up finished in %.1fs", self.warmup_seconds)
+        return self
+
+    def start_background(self) -> threading.Thread:
+        """Load and warm up on a daemon thread; failures are logged and kept in `error`."""
+        def run():
+            try:
+                self.warm_up()
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=run, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "ready": self.ready,
+            "converter_processes": self.converter_processes,
+            "converter_service": None if self.service is None else self.service.stats(),
+            "warmup_pdf": self.warmup_pdf,
+            "load_seconds": None if self.load_seconds is None else round(self.load_seconds, 3),
+            "warmup_seconds": None if self.warmup_seconds is None else round(self.warmup_seconds, 3),
+            "error": self.error,
+        }
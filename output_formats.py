@@ -0,0 +1,101 @@
+import io
+import json
+import importlib.util
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List
+
+from json_to_excel import (
+    json_to_excel, JsonLinesWriter, CsvWriter, ExcelStreamWriter, write_members
+)
+from claim_table import ClaimTable
+from claim_validation import validated_workbook
+
+
+class UnknownFormatError(ValueError):
+    """Raised for an output format that is not registered or not installed."""
+
+
+class OutputFormat:
+    """How one result format is serialized and served."""
+
+    def __init__(
+        self,
+        name: str,
+        extension: str,
+        mimetype: str,
+        serialize: Callable[[List[Dict]], bytes],
+        requires: str = None,
+        capture_totals: bool = False
+    ):
+        self.name = name
+        self.extension = extension
+        self.mimetype = mimetype
+        self.serialize = serialize
+        self.requires = requires
+        # Parse with extract_tables' capture_totals so members carry their "Member Totals :" amounts
+        self.capture_totals = capture_totals
+
+    @property
+    def available(self) -> bool:
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+
+def _write_to_bytes(writer_class, members: Iterable[Dict]) -> bytes:
+    buffer = BytesIO()
+    if writer_class.binary:
+        write_members(members, [writer_class(buffer)])
+    else:
+        text = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+        write_members(members, [writer_class(text)])
+        text.flush()
+        text.detach()
+    return buffer.getvalue()
+
+
+def _xlsx(members: List[Dict]) -> bytes:
+    _, excel_bytes = json_to_excel(members, verbose=False)
+    if excel_bytes is None:
+        raise ValueError("Failed to create Excel file")
+    return excel_bytes
+
+
+def _parquet(members: List[Dict]) -> bytes:
+    buffer = BytesIO()
+    ClaimTable.from_members(members).to_dataframe().to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+FORMATS: Dict[str, OutputFormat] = {
+    fmt.name: fmt for fmt in [
+        # pandas + openpyxl with styled headers; what /webhook has always returned
+        OutputFormat("xlsx", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _xlsx),
+        # openpyxl write-only mode: plain header row, much less time and memory on large results
+        OutputFormat("xlsx-stream", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                     lambda members: _write_to_bytes(ExcelStreamWriter, members)),
+        # Typed amounts and dates plus reconciliation check columns, see claim_validation
+        OutputFormat("xlsx-validated", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                     validated_workbook, capture_totals=True),
+        OutputFormat("csv", "csv", "text/csv", lambda members: _write_to_bytes(CsvWriter, members)),
+        OutputFormat("jsonl", "jsonl", "application/x-ndjson", lambda members: _write_to_bytes(JsonLinesWriter, members)),
+        OutputFormat("json", "json", "application/json", lambda members: json.dumps(members, indent=2).encode("utf-8")),
+        # One row per claim with float64 amounts
+        OutputFormat("parquet", "parquet", "application/vnd.apache.parquet", _parquet, requires="pyarrow"),
+    ]
+}
+
+
+def available_formats() -> List[str]:
+    return [name for name, fmt in FORMATS.items() if fmt.available]
+
+
+def get_format(name: str) -> OutputFormat:
+    fmt = FORMATS.get((name or "").lower())
+    if fmt is None:
+        raise UnknownFormatError(f"Unknown format {name!r}; expected one of {', '.join(available_formats())}")
+    if not fmt.available:
+        raise UnknownFormatError(f"Format {fmt.name!r} needs the {fmt.requires} package, which is not installed")
+    return fmt
+
+
+def serialize(members: List[Dict], name: str) -> bytes:
+    return get_format(name).serialize(members)
@@ -0,0 +1,178 @@
+"""
+Re-run the current parser over every document in the artifact store and diff
+the results against the previous replay, without converting any PDF again.
+
+    python replay.py --store artifacts --runs-dir replay_runs --workers 8
+
+Every run writes `<runs-dir>/<UTC timestamp>-v<EXTRACTOR_VERSION>/` with one
+`<sha256>.json` of members per document, `manifest.jsonl` (members, claims
+and a digest of the result per document) and, once finished, `summary.json`.
+A document whose result digest matches the previous run is unchanged; for
+the others the members are compared as multisets and the members that
+appeared or disappeared are written to `diff.jsonl`. The previous run is the
+latest finished one in --runs-dir unless --previous names another.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from log_config import configure_logging
+from artifact_store import ArtifactStore
+from extract_tables import iter_members, EXTRACTOR_VERSION
+
+SUMMARY_FILE = "summary.json"
+MANIFEST_FILE = "manifest.jsonl"
+DIFF_FILE = "diff.jsonl"
+
+
+def latest_run(runs_dir: str) -> Optional[str]:
+    """The most recent run directory with a summary, i.e. one that finished."""
+    if not os.path.isdir(runs_dir):
+        return None
+    finished = [
+        name for name in os.listdir(runs_dir)
+        if os.path.exists(os.path.join(runs_dir, name, SUMMARY_FILE))
+    ]
+    return os.path.join(runs_dir, max(finished)) if finished else None
+
+
+def load_run_manifest(run_dir: Optional[str]) -> Dict[str, Dict]:
+    entries = {}
+    if run_dir is None:
+        return entries
+    with open(os.path.join(run_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            entries[entry["sha256"]] = entry
+    return entries
+
+
+def diff_members(old: List[Dict], new: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Members only in `new` and members only in `old`, compared as multisets."""
+    old_counts = Counter(json.dumps(m, sort_keys=True) for m in old)
+    new_counts = Counter(json.dumps(m, sort_keys=True) for m in new)
+    added = [json.loads(m) for m in (new_counts - old_counts).elements()]
+    removed = [json.loads(m) for m in (old_counts - new_counts).elements()]
+    return added, removed
+
+
+def replay_document(
+    store_root: str,
+    sha256: str,
+    run_dir: str,
+    previous_run_dir: Optional[str],
+    previous_result_sha256: Optional[str]
+) -> Dict:
+    start = time.perf_counter()
+    store = ArtifactStore(store_root)
+    with store.open_markdown(sha256) as f:
+        members = list(iter_members(f))
+    encoded = json.dumps(members).encode("utf-8")
+    with open(os.path.join(run_dir, f"{sha256}.json"), "wb") as f:
+        f.write(encoded)
+    result = {
+        "sha256": sha256,
+        "members": len(members),
+        "claims": sum(len(m.get("claims", [])) for m in members),
+        "result_sha256": hashlib.sha256(encoded).hexdigest(),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    if previous_result_sha256 is None:
+        result["status"] = "new"
+    elif previous_result_sha256 == result["result_sha256"]:
+        result["status"] = "unchanged"
+    else:
+        with open(os.path.join(previous_run_dir, f"{sha256}.json"), encoding="utf-8") as f:
+            previous_members = json.load(f)
+        added, removed = diff_members(previous_members, members)
+        result.update(status="changed", added=added, removed=removed)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=os.environ.get("ARTIFACT_DIR", "artifacts"), help="Artifact store directory")
+    parser.add_argument("--runs-dir", default="replay_runs", help="Where replay runs are written")
+    parser.add_argument("--previous", help="Run directory to diff against (default: latest finished run)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--fail-on-diff", action="store_true", help="Exit with status 1 when any result changed")
+    args = parser.parse_args()
+    configure_logging(log_format=os.environ.get("LOG_FORMAT", "text"))
+
+    if not os.path.isdir(args.store):
+        parser.error(f"No artifact store at {args.store}")
+    store = ArtifactStore(args.store)
+    previous_run_dir = args.previous or latest_run(args.runs_dir)
+    previous = load_run_manifest(previous_run_dir)
+
+    run_name = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + f"-v{EXTRACTOR_VERSION}"
+    run_dir = os.path.join(args.runs_dir, run_name)
+    os.makedirs(run_dir)
+    digests = list(store.iter_digests())
+    print(f"Replaying {len(digests)} document(s) into {run_dir}, diffing against {previous_run_dir or 'nothing'}")
+
+    totals = Counter()
+    run_start = time.perf_counter()
+    with open(os.path.join(run_dir, MANIFEST_FILE), "w", encoding="utf-8") as manifest, \
+            open(os.path.join(run_dir, DIFF_FILE), "w", encoding="utf-8") as diff_file, \
+            ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                replay_document, args.store, sha256, run_dir, previous_run_dir,
+                previous.get(sha256, {}).get("result_sha256")
+            ): sha256
+            for sha256 in digests
+        }
+        for future in as_completed(futures):
+            sha256 = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"sha256": sha256, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+                print(f"FAILED {sha256}: {result['error']}")
+            added = result.pop("added", None)
+            removed = result.pop("removed", None)
+            if result["status"] == "changed":
+                source = (store.get_meta(sha256) or {}).get("source")
+                diff_file.write(json.dumps({"sha256": sha256, "source": source, "added": added, "removed": removed}) + "\n")
+                totals["members_added"] += len(added)
+                totals["members_removed"] += len(removed)
+            manifest.write(json.dumps(result) + "\n")
+            totals[result["status"]] += 1
+            totals["members"] += result.get("members", 0)
+            totals["claims"] += result.get("claims", 0)
+
+    missing = len(set(previous) - set(digests))
+    summary = {
+        "run": run_name,
+        "extractor_version": EXTRACTOR_VERSION,
+        "previous": os.path.basename(previous_run_dir) if previous_run_dir else None,
+        "documents": len(digests),
+        **{key: totals[key] for key in ("unchanged", "changed", "new", "failed")},
+        "missing": missing,
+        "members": totals["members"],
+        "claims": totals["claims"],
+        "members_added": totals["members_added"],
+        "members_removed": totals["members_removed"],
+        "seconds": round(time.perf_counter() - run_start, 3),
+    }
+    with open(os.path.join(run_dir, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n{summary['documents']} document(s) in {summary['seconds']:.1f}s: {summary['unchanged']} unchanged, "
+          f"{summary['changed']} changed, {summary['new']} new, {summary['failed']} failed, {missing} no longer stored")
+    if summary["changed"]:
+        print(f"{summary['members_added']} member(s) added and {summary['members_removed']} removed; "
+              f"see {os.path.join(run_dir, DIFF_FILE)}")
+    if summary["failed"] or (args.fail_on_diff and summary["changed"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+MARKDOWN_FILE = "markdown.md"
+MEMBERS_FILE = "members.json"
+EXCEL_FILE = "result.xlsx"
+META_FILE = "meta.json"
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of conversion results.
+
+    Entries are keyed on the SHA-256 of the uploaded PDF bytes combined with
+    `version` (extractor and converter versions), so a parser or marker
+    upgrade never serves stale results. Each entry is a directory holding the
+    rendered markdown, the parsed members JSON and optionally the XLSX bytes.
+    Entries older than `max_age_seconds` are dropped and the least recently
+    used ones are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str, version: str, max_bytes: int, max_age_seconds: float):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+        self._load_index()
+
+    def key_for_digest(self, content_sha256: str) -> str:
+        return hashlib.sha256(f"{self.version}:{content_sha256}".encode("utf-8")).hexdigest()
+
+    def key_for_file(self, pdf_path: str) -> str:
+        return self.key_for_digest(sha256_file(pdf_path))
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _load_index(self):
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                entry_dir = os.path.join(shard_dir, key)
+                if key.startswith(".") or not os.path.exists(os.path.join(entry_dir, META_FILE)):
+                    # Leftover from an interrupted write.
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    continue
+                meta_path = os.path.join(entry_dir, META_FILE)
+                # get() touches the meta file, which moves its ctime, so the age comes from its contents
+                try:
+                    with open(meta_path, encoding="utf-8") as f:
+                        created_at = float(json.load(f)["created_at"])
+                except (OSError, ValueError, KeyError, TypeError):
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    continue
+                size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+                self._entries[key] = {
+                    "size": size,
+                    "created_at": created_at,
+                    "last_used": os.path.getmtime(meta_path),
+                }
+                self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def get(self, key: str, want_excel: bool = False) -> Optional[Dict]:
+        """Return {'markdown', 'members', 'excel_bytes', 'meta'} for a fresh entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created_at"] > self.max_age_seconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, META_FILE), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(os.path.join(entry_dir, MARKDOWN_FILE), encoding="utf-8") as f:
+                markdown = f.read()
+            with open(os.path.join(entry_dir, MEMBERS_FILE), encoding="utf-8") as f:
+                members = json.load(f)
+            excel_bytes = None
+            excel_path = os.path.join(entry_dir, EXCEL_FILE)
+            if want_excel and os.path.exists(excel_path):
+                with open(excel_path, "rb") as f:
+                    excel_bytes = f.read()
+            # mtime of the meta file doubles as the persisted last-used time.
+            os.utime(os.path.join(entry_dir, META_FILE))
+        except (OSError, ValueError):
+            # Evicted by another thread or corrupted on disk; treat as a miss.
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += meta.get("convert_seconds", 0.0)
+        return {"markdown": markdown, "members": members, "excel_bytes": excel_bytes, "meta": meta}
+
+    def put(
+        self,
+        key: str,
+        markdown: str,
+        members: List[Dict],
+        excel_bytes: Optional[bytes] = None,
+        convert_seconds: float = 0.0
+    ):
+        entry_dir = self._entry_dir(key)
+        tmp_dir = os.path.join(os.path.dirname(entry_dir), f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            with open(os.path.join(tmp_dir, MARKDOWN_FILE), "w", encoding="utf-8") as f:
+                f.write(markdown)
+            with open(os.path.join(tmp_dir, MEMBERS_FILE), "w", encoding="utf-8") as f:
+                json.dump(members, f)
+            if excel_bytes is not None:
+                with open(os.path.join(tmp_dir, EXCEL_FILE), "wb") as f:
+                    f.write(excel_bytes)
+            with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "created_at": time.time(), "convert_seconds": convert_seconds}, f)
+            size = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir))
+
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                elif os.path.isdir(entry_dir):
+                    # Written by another process sharing the cache directory; the same key holds the same result
+                    now = time.time()
+                    self._entries[key] = {"size": size, "created_at": now, "last_used": now}
+                    self._total_bytes += size
+                    self._evict()
+                    return
+                os.replace(tmp_dir, entry_dir)
+                now = time.time()
+                self._entries[key] = {"size": size, "created_at": now, "last_used": now}
+                self._total_bytes += size
+                self._evict()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry["size"]
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if now - e["created_at"] > self.max_age_seconds]:
+            self._remove(key)
+            self.evictions += 1
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_used"]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "convert_seconds_saved": round(self.seconds_saved, 3),
+            }
@@ -0,0 +1,194 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Iterable, Optional, Tuple
+
+from flask import Request, current_app
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PREFIX = "upload_"
+# Per-request staging directories created under the upload folder (unpacked
+# batches and archives, single pages of a reissued PDF)
+BATCH_STAGING_PREFIX = ".batch_"
+MARKDOWN_STAGING_PREFIX = ".markdown_"
+PAGES_STAGING_PREFIX = ".pages_"
+STAGING_PREFIXES = (BATCH_STAGING_PREFIX, MARKDOWN_STAGING_PREFIX, PAGES_STAGING_PREFIX)
+# tmpfs is memory-backed and, unlike a memfd, visible by path to the forked
+# converter processes; the converter reads the spooled file straight from there.
+MEMORY_SPOOL_DIR = "/dev/shm"
+
+
+class SpooledUpload:
+    """
+    Writable/readable file that an upload is streamed into while it is parsed.
+
+    Uploads start out in `memory_dir` (tmpfs) and are moved to `disk_dir` as
+    soon as they grow past `memory_limit`, so only large PDFs touch the disk.
+    The SHA-256 of the content is computed on the way in. The backing file is
+    deleted on `close()`, which Flask calls when the request is torn down,
+    including when the handler raised.
+    """
+
+    def __init__(self, disk_dir: str, memory_limit: int, memory_dir: Optional[str] = MEMORY_SPOOL_DIR,
+                 expected_size: Optional[int] = None):
+        self.disk_dir = disk_dir
+        self.memory_limit = memory_limit
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._owned = True
+
+        use_memory = bool(memory_dir) and os.path.isdir(memory_dir) and \
+            (expected_size is None or expected_size <= memory_limit)
+        self.in_memory = use_memory
+        self._file = tempfile.NamedTemporaryFile(
+            prefix=SPOOL_PREFIX, suffix=".pdf", dir=memory_dir if use_memory else disk_dir, delete=False
+        )
+        self.path = self._file.name
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def _roll_to_disk(self):
+        disk_file = tempfile.NamedTemporaryFile(prefix=SPOOL_PREFIX, suffix=".pdf", dir=self.disk_dir, delete=False)
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, disk_file)
+        self._file.close()
+        os.remove(self.path)
+        self._file = disk_file
+        self.path = disk_file.name
+        self.in_memory = False
+
+    def write(self, data: bytes) -> int:
+        if self.in_memory and self.size + len(data) > self.memory_limit:
+            self._roll_to_disk()
+        self._sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._file.readline(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # Werkzeug seeks back to 0 once the part is complete; flush so the
+        # converter sees every byte when it opens `path`.
+        self._file.flush()
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def move_to(self, dest_path: str):
+        """Hand the spooled file over to `dest_path`; it is no longer deleted on close."""
+        self._file.flush()
+        shutil.move(self.path, dest_path)
+        self.path = dest_path
+        self._owned = False
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if self._owned:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._owned = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SpoolingRequest(Request):
+    """Flask request whose file uploads are streamed into `SpooledUpload`s."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        return SpooledUpload(
+            disk_dir=config.get("UPLOAD_FOLDER", tempfile.gettempdir()),
+            memory_limit=config.get("SPOOL_MEMORY_LIMIT", 32 * 1024 * 1024),
+            memory_dir=config.get("SPOOL_MEMORY_DIR", MEMORY_SPOOL_DIR),
+            expected_size=content_length or total_content_length,
+        )
+
+
+def sweep_stale_uploads(directories: Iterable[Tuple[str, Optional[str]]], max_age_seconds: float) -> int:
+    """
+    Delete files older than `max_age_seconds` from each `(directory, prefix)`
+    pair, skipping dotfiles and names not starting with `prefix` (when given).
+    Staging directories (STAGING_PREFIXES) left behind by a crashed worker
+    are removed with everything in them. Returns how many entries were removed.
+    """
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    for directory, prefix in directories:
+        if not directory or not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith(STAGING_PREFIXES):
+                try:
+                    if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                        shutil.rmtree(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+                continue
+            if name.startswith(".") or (prefix and not name.startswith(prefix)):
+                continue
+            try:
+                if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    if removed:
+        logger.info("Removed %d stale upload file(s) and staging directories", removed)
+    return removed
+
+
+def start_upload_sweeper(
+    directories: Iterable[Tuple[str, Optional[str]]],
+    max_age_seconds: float,
+    interval_seconds: float
+) -> threading.Thread:
+    directories = list(directories)
+
+    def sweep_forever():
+        while True:
+            try:
+                sweep_stale_uploads(directories, max_age_seconds)
+            except Exception as e:
+                logger.exception("Upload sweeper error: %s", e)
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=sweep_forever, name="upload-sweeper", daemon=True)
+    thread.start()
+    return thread